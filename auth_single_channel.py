@@ -9,6 +9,8 @@ import google_auth_oauthlib.flow
 import googleapiclient.discovery
 import googleapiclient.errors
 
+import retry_policy
+
 # Define scopes needed for the API
 SCOPES = [
     'https://www.googleapis.com/auth/youtube',
@@ -76,7 +78,7 @@ def get_channel_info(youtube):
         part="snippet,statistics",
         mine=True
     )
-    response = request.execute()
+    response = retry_policy.execute(request, 'youtube.channels')
     
     if not response.get('items'):
         return None
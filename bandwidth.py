@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""Process-wide byte-rate limits shared by every Drive download and YouTube upload."""
+
+import time
+import threading
+
+INGRESS = 'ingress'  # Drive downloads
+EGRESS = 'egress'    # YouTube uploads
+
+_UNITS = {'': 1, 'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+
+def parse_rate(value):
+    """Parse a byte rate such as '500K', '8M' or '1.5G' (bytes per second)."""
+    if value is None or str(value).strip() == '':
+        return None
+    text = str(value).strip().upper()
+    for suffix in ('/S', 'B'):
+        if text.endswith(suffix):
+            text = text[:-len(suffix)]
+    unit = text[-1] if text and text[-1] in _UNITS else ''
+    number = text[:-1] if unit else text
+    try:
+        rate = float(number) * _UNITS[unit]
+    except ValueError:
+        raise ValueError(f"Invalid byte rate '{value}', expected something like 500K, 8M or 1G")
+    return rate if rate > 0 else None
+
+def parse_channel_shares(values):
+    """Parse ['MagicMap Tales=0.5', 'Tiny Trailblazers=0.25'] into {name: fraction}."""
+    shares = {}
+    for value in values or []:
+        for pair in value.split(','):
+            if not pair.strip():
+                continue
+            name, sep, share = pair.rpartition('=')
+            if not sep or not name.strip():
+                raise ValueError(f"Invalid channel share '{pair}', expected 'Channel Name=0.5'")
+            share = float(share)
+            if not 0 < share <= 1:
+                raise ValueError(f"Channel share for '{name.strip()}' must be between 0 and 1")
+            shares[name.strip()] = share
+    return shares
+
+class TokenBucket:
+    """Byte token bucket. Callers may overdraw it and then wait off the debt,
+    so large reads are paced instead of rejected."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self, amount):
+        """Take amount tokens now and return how many seconds the caller must wait."""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= amount
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+    def consume(self, amount):
+        delay = self.reserve(amount)
+        if delay > 0:
+            time.sleep(delay)
+
+class BandwidthLimiter:
+    """Separate ingress and egress budgets, each optionally split into per-channel shares."""
+
+    def __init__(self, ingress_rate=None, egress_rate=None, channel_shares=None):
+        self.buckets = {}
+        self.channel_buckets = {}
+        for direction, rate in ((INGRESS, ingress_rate), (EGRESS, egress_rate)):
+            if not rate:
+                continue
+            self.buckets[direction] = TokenBucket(rate)
+            for channel, share in (channel_shares or {}).items():
+                self.channel_buckets[(direction, channel.lower())] = TokenBucket(rate * share)
+
+    def rate(self, direction):
+        bucket = self.buckets.get(direction)
+        return bucket.rate if bucket else None
+
+    def throttle(self, direction, nbytes, channel=None):
+        """Block until nbytes fit in the direction's budget (and the channel's share, if any)."""
+        delays = []
+        if channel:
+            channel_bucket = self.channel_buckets.get((direction, channel.lower()))
+            if channel_bucket:
+                delays.append(channel_bucket.reserve(nbytes))
+        bucket = self.buckets.get(direction)
+        if bucket:
+            delays.append(bucket.reserve(nbytes))
+        delay = max(delays, default=0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+_limiter = BandwidthLimiter()
+
+def configure(ingress_rate=None, egress_rate=None, channel_shares=None):
+    """Install the process-wide limiter (rates in bytes per second, None for unlimited)."""
+    global _limiter
+    _limiter = BandwidthLimiter(ingress_rate, egress_rate, channel_shares)
+    return _limiter
+
+def get_limiter():
+    return _limiter
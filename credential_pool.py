@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""Per-channel YouTube OAuth credentials, loaded once and refreshed ahead of expiry.
+
+A daemon thread refreshes each channel's access token shortly before it
+expires and writes the refreshed token to .videopost/channel_tokens, so
+uploads never wait on an OAuth refresh and later runs start with a live
+token instead of downloading and refreshing again.
+"""
+
+import os
+import json
+import datetime
+import threading
+
+import google.oauth2.credentials
+from google.auth.exceptions import RefreshError
+from google.auth.transport.requests import Request
+
+import retry_policy
+import state_file
+
+CACHE_DIR = os.path.join(state_file.STATE_DIR, 'channel_tokens')
+
+# Refresh this long before the access token expires
+REFRESH_MARGIN_SECONDS = 5 * 60
+
+# Upper bound on how long the refresher sleeps between checks
+MAX_REFRESHER_SLEEP = 60
+
+def _seconds_left(credentials):
+    if not credentials.token or not credentials.expiry:
+        return 0
+    return (credentials.expiry - datetime.datetime.utcnow()).total_seconds()
+
+def _safe_name(key):
+    return "".join(c if c.isalnum() else "_" for c in key).lower()
+
+class ChannelCredentialPool:
+    """Holds one live Credentials object per channel key."""
+
+    def __init__(self, cache_dir=CACHE_DIR, refresh_margin=REFRESH_MARGIN_SECONDS):
+        self.cache_dir = cache_dir
+        self.refresh_margin = refresh_margin
+        self.credentials = {}
+        self.lock = threading.RLock()
+        self.wakeup = threading.Event()
+        self.refresher = None
+
+    def _cache_path(self, key):
+        return os.path.join(self.cache_dir, f"{_safe_name(key)}.json")
+
+    def _load_cached(self, key):
+        try:
+            return google.oauth2.credentials.Credentials.from_authorized_user_info(
+                state_file.load(self._cache_path(key)))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save_cached(self, key, credentials):
+        # state_file creates the file readable by the owner only
+        state_file.save(self._cache_path(key), json.loads(credentials.to_json()))
+
+    def _refresh(self, key, credentials):
+        retry_policy.call('oauth.refresh', credentials.refresh, Request())
+        self._save_cached(key, credentials)
+        print(f"Refreshed YouTube access token for {key} (valid {int(_seconds_left(credentials) / 60)} min)")
+
+    def _refresh_in_background(self, key, credentials):
+        """Refresh a copy of credentials without holding the lock, then swap it in."""
+        fresh = google.oauth2.credentials.Credentials.from_authorized_user_info(json.loads(credentials.to_json()))
+        self._refresh(key, fresh)
+        with self.lock:
+            if self.credentials.get(key) is credentials:
+                self.credentials[key] = fresh
+            # Uploads already holding the old object pick up the new token on their next request
+            credentials.token = fresh.token
+            credentials.expiry = fresh.expiry
+        return fresh
+
+    def get(self, key, load_token_info):
+        """Return live credentials for a channel.
+
+        load_token_info() returns the channel's authorized-user token dict and is
+        only called when neither this process nor the local cache has a refresh
+        token, or when the cached one is rejected.
+        """
+        with self.lock:
+            credentials = self.credentials.get(key)
+            from_cache = False
+            if credentials is None:
+                # A cached refresh token is enough; an expiring access token is refreshed below
+                credentials = self._load_cached(key)
+                from_cache = credentials is not None and bool(credentials.refresh_token)
+                if not from_cache:
+                    credentials = google.oauth2.credentials.Credentials.from_authorized_user_info(load_token_info())
+                self.credentials[key] = credentials
+
+            # Make sure the upload starts with a token that outlives the margin
+            if _seconds_left(credentials) <= self.refresh_margin and credentials.refresh_token:
+                try:
+                    self._refresh(key, credentials)
+                except RefreshError:
+                    if not from_cache:
+                        raise
+                    # The cached grant was revoked or replaced; start again from the channel's token file
+                    print(f"Cached token for {key} could not be refreshed, reloading it")
+                    credentials = google.oauth2.credentials.Credentials.from_authorized_user_info(load_token_info())
+                    self.credentials[key] = credentials
+                    if _seconds_left(credentials) <= self.refresh_margin and credentials.refresh_token:
+                        self._refresh(key, credentials)
+
+        self._ensure_refresher()
+        return credentials
+
+    def _ensure_refresher(self):
+        with self.lock:
+            if self.refresher is None or not self.refresher.is_alive():
+                self.refresher = threading.Thread(target=self._refresh_loop, name='token-refresher', daemon=True)
+                self.refresher.start()
+        self.wakeup.set()
+
+    def _refresh_loop(self):
+        while True:
+            self.wakeup.clear()
+            with self.lock:
+                items = list(self.credentials.items())
+            next_check = MAX_REFRESHER_SLEEP
+            for key, credentials in items:
+                left = _seconds_left(credentials)
+                if left <= self.refresh_margin and credentials.refresh_token:
+                    try:
+                        left = _seconds_left(self._refresh_in_background(key, credentials))
+                    except Exception as e:
+                        print(f"Warning: Background token refresh for {key} failed: {e}")
+                        left = self.refresh_margin + 30  # Try again in 30 seconds
+                next_check = min(next_check, max(1, left - self.refresh_margin))
+            self.wakeup.wait(next_check)
+
+_pool = None
+
+def get_pool():
+    """Return the process-wide credential pool."""
+    global _pool
+    if _pool is None:
+        _pool = ChannelCredentialPool()
+    return _pool
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""Fit uploads into the job's time budget using video sizes and measured throughput.
+
+With a deadline configured, a video is only started when its predicted time
+(fixed per-video overhead plus size over the download and upload rates, with
+a safety margin) fits in the time left. Rates and overhead are moving
+averages over finished videos, kept in .videopost/throughput.json and shared
+by every uploader process of the run.
+"""
+
+import os
+import time
+import datetime
+
+import bandwidth
+import state_file
+
+THROUGHPUT_FILE = os.path.join(state_file.STATE_DIR, 'throughput.json')
+
+# Used until a video of this run has been measured
+DEFAULT_DOWNLOAD_RATE = 20 * 1024 * 1024   # bytes/s
+DEFAULT_UPLOAD_RATE = 5 * 1024 * 1024      # bytes/s
+DEFAULT_OVERHEAD_SECONDS = 90              # Process start, sheet, claim, thumbnail, release
+
+# Predictions are stretched by this factor before comparing them with the time left
+SAFETY_MARGIN = 1.25
+
+# Weight of the newest measurement in the moving averages
+EWMA_ALPHA = 0.4
+
+# Transfers shorter than this (e.g. a file already on disk) say nothing about the rate
+MIN_MEASURED_SECONDS = 2.0
+
+class DeadlineError(Exception):
+    """Starting this video would overrun the deadline."""
+
+_deadline = None
+
+def parse_deadline(value, now=None):
+    """Parse '2026-10-18T23:30:00Z' or a duration from now ('140m', '2h', '5400s') into epoch seconds."""
+    now = now or time.time()
+    text = str(value).strip()
+    units = {'s': 1, 'm': 60, 'h': 3600}
+    if text and text[-1].lower() in units:
+        try:
+            return now + float(text[:-1]) * units[text[-1].lower()]
+        except ValueError:
+            pass
+    try:
+        moment = datetime.datetime.fromisoformat(text.replace('Z', '+00:00'))
+    except ValueError:
+        raise ValueError(f"Invalid deadline '{value}', expected an ISO time like 2026-10-18T23:30:00Z "
+                         f"or a duration like 140m")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+def configure(deadline):
+    """Set the deadline (epoch seconds) every transfer must finish by."""
+    global _deadline
+    _deadline = deadline
+
+def is_enabled():
+    return _deadline is not None
+
+def remaining(now=None):
+    """Seconds left until the deadline (None without one)."""
+    if _deadline is None:
+        return None
+    return _deadline - (now or time.time())
+
+def _average(old, new):
+    return new if old is None else old + EWMA_ALPHA * (new - old)
+
+def record(download_bytes, download_seconds, upload_bytes, upload_seconds, total_seconds):
+    """Fold one finished video's timings into the moving averages."""
+    with state_file.locked(THROUGHPUT_FILE):
+        state = state_file.load(THROUGHPUT_FILE, {})
+        if download_seconds >= MIN_MEASURED_SECONDS and download_bytes:
+            state['download_rate'] = _average(state.get('download_rate'), download_bytes / download_seconds)
+        if upload_seconds >= MIN_MEASURED_SECONDS and upload_bytes:
+            state['upload_rate'] = _average(state.get('upload_rate'), upload_bytes / upload_seconds)
+        overhead = max(0.0, total_seconds - download_seconds - upload_seconds)
+        state['overhead_seconds'] = _average(state.get('overhead_seconds'), overhead)
+        state['videos'] = state.get('videos', 0) + 1
+        state_file.save(THROUGHPUT_FILE, state, indent=2)
+
+def rates():
+    """Return (download bytes/s, upload bytes/s, overhead seconds), capped by configured bandwidth limits."""
+    state = state_file.load(THROUGHPUT_FILE, {})
+    download_rate = state.get('download_rate') or DEFAULT_DOWNLOAD_RATE
+    upload_rate = state.get('upload_rate') or DEFAULT_UPLOAD_RATE
+    limiter = bandwidth.get_limiter()
+    download_rate = min(download_rate, limiter.rate(bandwidth.INGRESS) or download_rate)
+    upload_rate = min(upload_rate, limiter.rate(bandwidth.EGRESS) or upload_rate)
+    return download_rate, upload_rate, state.get('overhead_seconds', DEFAULT_OVERHEAD_SECONDS)
+
+def estimate_seconds(size, rate_info=None):
+    """Predicted seconds to download and upload a video of size bytes (size may be unknown)."""
+    download_rate, upload_rate, overhead = rate_info or rates()
+    size = int(size or 0)
+    return (overhead + size / download_rate + size / upload_rate) * SAFETY_MARGIN
+
+def fits(size, already_planned_seconds=0.0):
+    """True if a video of size bytes, started after already_planned_seconds, ends before the deadline."""
+    if _deadline is None:
+        return True
+    return estimate_seconds(size) + already_planned_seconds <= remaining()
+
+def check(size, name=''):
+    """Raise DeadlineError if a video of size bytes would not finish before the deadline."""
+    if _deadline is None:
+        return
+    predicted = estimate_seconds(size)
+    left = remaining()
+    if predicted > left:
+        raise DeadlineError(f"{name or 'video'} ({int(size or 0) / 1024 ** 2:.0f} MB) needs about "
+                            f"{predicted / 60:.1f} min, only {max(0.0, left) / 60:.1f} min left before the deadline")
+
+def pack(candidates, size_of):
+    """Pick, in order, the candidates whose predicted times add up within the time left.
+
+    A video that does not fit is passed over so smaller ones after it can
+    still be taken. Without a deadline the candidates are returned unchanged.
+    """
+    if _deadline is None:
+        return list(candidates)
+    rate_info = rates()
+    left = remaining()
+    planned = 0.0
+    chosen = []
+    for candidate in candidates:
+        seconds = estimate_seconds(size_of(candidate), rate_info)
+        if planned + seconds <= left:
+            chosen.append(candidate)
+            planned += seconds
+    return chosen
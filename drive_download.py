@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""Resumable Google Drive downloads: HTTP Range resume, retries via retry_policy, size/MD5 checks."""
+
+import os
+import hashlib
+
+from google.auth.transport.requests import AuthorizedSession
+
+import bandwidth
+import retry_policy
+import state_file
+
+DRIVE_MEDIA_URL = 'https://www.googleapis.com/drive/v3/files/{file_id}?alt=media'
+
+# Network reads and how often the committed offset is persisted
+READ_BLOCK_SIZE = 64 * 1024
+COMMIT_EVERY_BYTES = 8 * 1024 * 1024
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+
+class DownloadError(Exception):
+    """A download that could not be completed or failed verification."""
+
+class RetriableDownloadError(DownloadError, retry_policy.TransientError):
+    """A transient failure; the download resumes from the committed offset."""
+
+def _state_path(part_path):
+    return part_path + '.json'
+
+def _load_state(part_path, file_id, expected_size, expected_md5):
+    """Return the committed offset of a previous attempt at the same file, or 0."""
+    state = state_file.load(_state_path(part_path), {})
+    if (state.get('file_id') != file_id or state.get('size') != expected_size
+            or state.get('md5') != expected_md5 or not os.path.exists(part_path)):
+        return 0
+    return min(state.get('offset', 0), os.path.getsize(part_path))
+
+def _save_state(part_path, file_id, expected_size, expected_md5, offset):
+    state_file.save(_state_path(part_path),
+                    {'file_id': file_id, 'size': expected_size, 'md5': expected_md5, 'offset': offset})
+
+def _hash_prefix(part_path, offset):
+    """Rebuild the running MD5 over bytes already on disk."""
+    md5 = hashlib.md5()
+    with open(part_path, 'rb') as f:
+        remaining = offset
+        while remaining > 0:
+            block = f.read(min(COMMIT_EVERY_BYTES, remaining))
+            if not block:
+                break
+            md5.update(block)
+            remaining -= len(block)
+    return md5
+
+def is_complete(file_path, expected_size=None):
+    """A finished download exists only under its final name and with the expected size."""
+    if not os.path.exists(file_path):
+        return False
+    return expected_size is None or os.path.getsize(file_path) == int(expected_size)
+
+def create_session(credentials):
+    """One pooled, authorized HTTP session to reuse across a folder's downloads."""
+    return AuthorizedSession(credentials)
+
+def fetch_range(session, file_id, start, length, channel=None):
+    """Fetch length bytes of a Drive file starting at start (fewer at end of file)."""
+    url = DRIVE_MEDIA_URL.format(file_id=file_id)
+
+    def fetch():
+        headers = {'Range': f'bytes={start}-{start + length - 1}'}
+        with session.get(url, headers=headers, stream=True,
+                         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+            if response.status_code in retry_policy.RETRIABLE_STATUS_CODES:
+                raise retry_policy.RetriableResponseError(response)
+            if response.status_code == 416:
+                return b''
+            if response.status_code not in (200, 206):
+                raise DownloadError(f"HTTP {response.status_code}: {response.text[:200]}")
+            data = bytearray()
+            skip = start if response.status_code == 200 else 0  # Range ignored, whole file sent
+            for block in response.iter_content(chunk_size=READ_BLOCK_SIZE):
+                if skip:
+                    dropped = min(skip, len(block))
+                    block, skip = block[dropped:], skip - dropped
+                data.extend(block)
+                if len(data) >= length:
+                    break
+            bandwidth.get_limiter().throttle(bandwidth.INGRESS, len(data), channel)
+            return bytes(data[:length])
+
+    return retry_policy.call('drive.media', fetch)
+
+def download_drive_file(session, file_id, file_path, expected_size=None, expected_md5=None,
+                        channel=None, progress_label=None, transfer=None):
+    """Download a Drive file to file_path, resuming from the last committed byte after errors.
+
+    Bytes land in file_path + '.part' and the committed offset is recorded in
+    file_path + '.part.json'. The file is renamed into place only after its
+    size and MD5 match what Drive reported. If transfer is a dict, the bytes
+    received by this call (not those resumed from disk) are added to its 'bytes'.
+    """
+    expected_size = int(expected_size) if expected_size not in (None, '') else None
+    part_path = file_path + '.part'
+    label = progress_label or os.path.basename(file_path)
+    url = DRIVE_MEDIA_URL.format(file_id=file_id)
+
+    progress = {'offset': _load_state(part_path, file_id, expected_size, expected_md5)}
+    if progress['offset']:
+        print(f"Resuming {label} from byte {progress['offset']}")
+    progress['md5'] = _hash_prefix(part_path, progress['offset']) if progress['offset'] else hashlib.md5()
+
+    def fetch_remaining():
+        """One attempt: request the bytes after the committed offset and append them."""
+        offset = progress['offset']
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        with session.get(url, headers=headers, stream=True,
+                         timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+            if response.status_code == 416 and expected_size is not None and offset >= expected_size:
+                return  # Everything was already committed
+            if response.status_code in retry_policy.RETRIABLE_STATUS_CODES:
+                raise retry_policy.RetriableResponseError(response)
+            if response.status_code not in (200, 206):
+                raise DownloadError(f"HTTP {response.status_code}: {response.text[:200]}")
+
+            if offset and response.status_code == 200:
+                # The server ignored the Range header, start over
+                offset = progress['offset'] = 0
+                progress['md5'] = hashlib.md5()
+
+            with open(part_path, 'r+b' if os.path.exists(part_path) else 'wb') as f:
+                f.seek(offset)
+                f.truncate()
+                committed = offset
+                try:
+                    for block in response.iter_content(chunk_size=READ_BLOCK_SIZE):
+                        if not block:
+                            continue
+                        bandwidth.get_limiter().throttle(bandwidth.INGRESS, len(block), channel)
+                        f.write(block)
+                        if transfer is not None:
+                            transfer['bytes'] = transfer.get('bytes', 0) + len(block)
+                        progress['md5'].update(block)
+                        progress['offset'] += len(block)
+                        if progress['offset'] - committed >= COMMIT_EVERY_BYTES:
+                            f.flush()
+                            os.fsync(f.fileno())
+                            _save_state(part_path, file_id, expected_size, expected_md5, progress['offset'])
+                            committed = progress['offset']
+                            if expected_size:
+                                print(f"Downloading {label}: {int(progress['offset'] * 100 / expected_size)}%")
+                finally:
+                    f.flush()
+                    os.fsync(f.fileno())
+                    _save_state(part_path, file_id, expected_size, expected_md5, progress['offset'])
+
+        if expected_size is not None and progress['offset'] < expected_size:
+            raise RetriableDownloadError(
+                f"{label}: connection closed at byte {progress['offset']} of {expected_size}")
+
+    try:
+        retry_policy.call('drive.media', fetch_remaining, policy=retry_policy.DOWNLOAD_POLICY)
+    except retry_policy.RetryError as e:
+        raise DownloadError(f"Giving up on {label} at byte {progress['offset']}: {e}")
+
+    offset = progress['offset']
+    md5 = progress['md5']
+
+    # Verify before the file becomes visible under its final name
+    if expected_size is not None and offset != expected_size:
+        raise DownloadError(f"{label}: size {offset} does not match expected {expected_size}")
+    if expected_md5 and md5.hexdigest() != expected_md5:
+        os.remove(part_path)
+        os.remove(_state_path(part_path))
+        raise DownloadError(f"{label}: MD5 {md5.hexdigest()} does not match expected {expected_md5}")
+
+    os.replace(part_path, file_path)
+    os.remove(_state_path(part_path))
+    print(f"Downloading {label}: 100%")
+    return file_path
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Structured run events (JSON lines) and the process exit code derived from them.
+
+Every emit() is tallied, whether or not event output is enabled, and
+exit_code() turns the tallies into one of the EXIT_* codes below. With
+--events jsonl each event is also written as one JSON object per line:
+
+    {"event": "uploaded", "ts": "2026-10-18T21:34:05Z", "elapsed": 83.2,
+     "runner": "gh-123.1:host:4242:9f2c1a7e", "row": 17, "video_id": "..."}
+"""
+
+import sys
+import json
+import time
+import datetime
+from collections import Counter
+
+# Exit codes, one per outcome class
+EXIT_OK = 0                 # Everything selected was uploaded
+EXIT_FAILED = 1             # At least one video failed
+EXIT_ERROR = 2              # Setup or configuration problem, nothing was attempted
+EXIT_NOTHING_TO_DO = 3      # No video was left to upload
+EXIT_UPLOAD_LIMIT = 4       # YouTube refused more uploads for this channel today
+EXIT_QUOTA_EXHAUSTED = 5    # The API project's daily quota is used up
+
+# YouTube error reasons that end the run instead of failing one video
+QUOTA_REASONS = {
+    'uploadLimitExceeded': EXIT_UPLOAD_LIMIT,
+    'quotaExceeded': EXIT_QUOTA_EXHAUSTED,
+    'dailyLimitExceeded': EXIT_QUOTA_EXHAUSTED
+}
+
+EVENT_FORMATS = ('jsonl',)
+
+_output = None
+_runner = None
+_started = time.monotonic()
+_counts = Counter()
+_exit_overrides = []
+
+def configure(fmt, path='-', runner=None):
+    """Start writing events in fmt ('jsonl') to path ('-' for stdout, otherwise appended to)."""
+    global _output, _runner
+    if fmt not in EVENT_FORMATS:
+        raise ValueError(f"Unknown event format '{fmt}', expected one of {', '.join(EVENT_FORMATS)}")
+    _output = sys.stdout if path in (None, '-') else open(path, 'a', encoding='utf-8', buffering=1)
+    _runner = runner
+
+def emit(event, **fields):
+    """Record an event and write it out if event output is enabled."""
+    _counts[event] += 1
+    if event == 'quota_exhausted':
+        _exit_overrides.append(QUOTA_REASONS.get(fields.get('reason'), EXIT_QUOTA_EXHAUSTED))
+    if _output is None:
+        return
+    record = {
+        'event': event,
+        'ts': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'elapsed': round(time.monotonic() - _started, 3)
+    }
+    if _runner:
+        record['runner'] = _runner
+    record.update({k: v for k, v in fields.items() if v is not None})
+    # One write per line keeps lines whole when several processes append to one file
+    _output.write(json.dumps(record, ensure_ascii=False) + '\n')
+    _output.flush()
+
+def quota_exhausted():
+    """True once a quota_exhausted event was emitted; callers stop picking new videos."""
+    return bool(_exit_overrides)
+
+def exit_code():
+    """Exit code for the run so far, the most severe outcome first."""
+    if _exit_overrides:
+        return max(_exit_overrides)
+    if _counts['error']:
+        return EXIT_ERROR
+    if _counts['failed']:
+        return EXIT_FAILED
+    if _counts['nothing_to_do'] and not _counts['uploaded']:
+        return EXIT_NOTHING_TO_DO
+    # Rows skipped because another runner took them are not a reason to stop
+    return EXIT_OK
+
+def finish():
+    """Emit run_finished and return the exit code."""
+    code = exit_code()
+    emit('run_finished', exit_code=code, uploaded=_counts['uploaded'], failed=_counts['failed'],
+         seconds=round(time.monotonic() - _started, 3))
+    return code
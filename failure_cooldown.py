@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""Cool-down and quarantine for sheet rows whose uploads keep failing.
+
+Each failed attempt bumps the row's Failure Count, records the error class
+and sets Next Eligible At: FAILURE_COOLDOWN_SECONDS after the first failure,
+doubling with each further one up to MAX_COOLDOWN_SECONDS. After
+QUARANTINE_AFTER failures the row is quarantined until someone clears those
+cells. Selection reads these columns with the rest of the row, so a cooling
+row is passed over without touching Drive. Quota errors are not the row's
+fault and are not counted; a successful upload clears the columns.
+"""
+
+import time
+
+from row_lease import format_expiry, parse_expiry
+
+FAILURE_COUNT_COLUMN = 'Failure Count'
+LAST_ERROR_CLASS_COLUMN = 'Last Error Class'
+NEXT_ELIGIBLE_COLUMN = 'Next Eligible At'
+FAILURE_COLUMNS = [FAILURE_COUNT_COLUMN, LAST_ERROR_CLASS_COLUMN, NEXT_ELIGIBLE_COLUMN]
+
+FAILURE_COOLDOWN_SECONDS = 60 * 60
+MAX_COOLDOWN_SECONDS = 7 * 24 * 60 * 60
+QUARANTINE_AFTER = 6
+
+# Next Eligible At of a row that is never selected again on its own
+QUARANTINED = 'Quarantined'
+
+def failure_count(row):
+    try:
+        return max(0, int(row.get(FAILURE_COUNT_COLUMN, '') or 0))
+    except (TypeError, ValueError):
+        return 0
+
+def cooldown_seconds(count):
+    """How long a row waits after its count-th failure."""
+    return min(FAILURE_COOLDOWN_SECONDS * 2 ** max(0, count - 1), MAX_COOLDOWN_SECONDS)
+
+def record_failure(row, error_class, now=None):
+    """Return the failure column values for one more failure of row."""
+    now = now or time.time()
+    count = failure_count(row) + 1
+    next_eligible = QUARANTINED if count >= QUARANTINE_AFTER else format_expiry(now + cooldown_seconds(count))
+    return {
+        FAILURE_COUNT_COLUMN: count,
+        LAST_ERROR_CLASS_COLUMN: error_class or '',
+        NEXT_ELIGIBLE_COLUMN: next_eligible
+    }
+
+def cleared():
+    """Failure column values after a successful upload."""
+    return {column: '' for column in FAILURE_COLUMNS}
+
+def is_quarantined(row):
+    return row.get(NEXT_ELIGIBLE_COLUMN, '') == QUARANTINED
+
+def is_eligible(row, now=None):
+    """False while a failed row is cooling down or quarantined; rows that never failed are always eligible."""
+    next_eligible = row.get(NEXT_ELIGIBLE_COLUMN, '')
+    if not next_eligible:
+        return True
+    if next_eligible == QUARANTINED:
+        return False
+    return parse_expiry(next_eligible) <= (now or time.time())
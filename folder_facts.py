@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Per-folder video facts the Drive scanner writes into the sheet.
+
+From a folder's listing (and a Range-request preflight of video.mp4) the
+scanner records the video's size and MD5, which expected files are missing and
+whether the folder is ready to upload. The uploader then filters and orders
+rows from these columns alone, without listing or downloading anything.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import mp4_probe
+
+FACT_COLUMNS = ['Video Size', 'Video MD5', 'Video Check', 'Missing Files', 'Ready']
+
+# Everything a finished folder contains; only the video is needed to upload
+EXPECTED_FILES = ('video.mp4', 'thumbnail.jpg', 'title.txt', 'description.txt', 'tags.txt')
+REQUIRED_FILES = ('video.mp4',)
+
+PROBE_WORKERS = 8
+
+def compute(files, probe_fn=None):
+    """Return {column: value} for a folder listing. probe_fn(video_file) preflights the video.
+
+    Ready is 'Yes' or 'No', or '' when the video could not be checked (the
+    next scan tries again and the row stays selectable meanwhile).
+    """
+    by_name = {f['name']: f for f in files}
+    video = by_name.get('video.mp4')
+    facts = {
+        'Video Size': video.get('size', '') if video else '',
+        'Video MD5': video.get('md5Checksum', '') if video else '',
+        'Video Check': '',
+        'Missing Files': ', '.join(name for name in EXPECTED_FILES if name not in by_name),
+        'Ready': 'No'
+    }
+    if any(name not in by_name for name in REQUIRED_FILES):
+        facts['Video Check'] = 'video.mp4 missing'
+        return facts
+    if not int(video.get('size') or 0):
+        facts['Video Check'] = 'video.mp4 is empty'
+        return facts
+
+    if probe_fn:
+        try:
+            facts['Video Check'] = mp4_probe.describe(probe_fn(video))
+        except mp4_probe.Mp4ProbeError as e:
+            facts['Video Check'] = f"failed preflight: {e}"
+            return facts
+        except Exception as e:
+            print(f"Warning: Could not preflight video.mp4 ({video['id']}): {e}")
+            facts['Ready'] = ''
+            return facts
+    facts['Ready'] = 'Yes'
+    return facts
+
+def compute_many(session, files_by_folder):
+    """Compute the facts of several folders, preflighting their videos in parallel."""
+    def probe(video):
+        return mp4_probe.cached_probe(video['id'], video.get('md5Checksum'),
+                                      lambda: mp4_probe.probe_drive(session, video['id'], video.get('size')))
+
+    with ThreadPoolExecutor(max_workers=PROBE_WORKERS) as pool:
+        futures = {folder_id: pool.submit(compute, files, probe if session else None)
+                   for folder_id, files in files_by_folder.items()}
+        return {folder_id: future.result() for folder_id, future in futures.items()}
+
+def is_selectable(row):
+    """Rows the scanner found not ready are left out; rows without facts yet stay in."""
+    return row.get('Ready', '') != 'No'
+
+def readiness_rank(row):
+    """Sort key putting rows known to be ready ahead of rows not checked yet."""
+    return 0 if row.get('Ready', '') == 'Yes' else 1
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Folder listings and title/description/tags text, fetched in bulk and kept in memory.
+
+Drive batch HTTP does not carry media downloads, so the folder listings for all
+selected folders go out as batched files.list calls, and the small text files
+are read straight into memory over the pooled download session. Nothing but
+video.mp4 and thumbnail.jpg is written to disk.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import drive_download
+import retry_policy
+
+METADATA_FILES = ('title.txt', 'description.txt', 'tags.txt')
+
+LIST_FIELDS = 'files(id, name, mimeType, size, md5Checksum)'
+
+# Drive accepts at most 100 calls per batch request
+MAX_BATCH_SIZE = 100
+
+# Metadata files are a few hundred bytes; never read more than this of one
+MAX_METADATA_BYTES = 64 * 1024
+
+TEXT_FETCH_WORKERS = 8
+
+# folder_id -> {'files': [...], 'text': {'title.txt': '...'}}, either key may be missing
+_folders = {}
+
+def _list_request(drive_service, folder_id):
+    return drive_service.files().list(
+        q=f"'{folder_id}' in parents and trashed=false",
+        spaces='drive',
+        pageSize=1000,
+        fields=LIST_FIELDS
+    )
+
+def list_folders(drive_service, folder_ids):
+    """List several folders with batched files.list calls. Returns {folder_id: [file, ...]}."""
+    listings = {}
+    failed = []
+
+    def on_response(request_id, response, exception):
+        if exception is None:
+            listings[request_id] = response.get('files', [])
+        else:
+            failed.append(request_id)
+
+    folder_ids = list(dict.fromkeys(folder_ids))
+    for start in range(0, len(folder_ids), MAX_BATCH_SIZE):
+        chunk = folder_ids[start:start + MAX_BATCH_SIZE]
+
+        def send_batch():
+            batch = drive_service.new_batch_http_request(callback=on_response)
+            for folder_id in chunk:
+                if folder_id not in listings:
+                    batch.add(_list_request(drive_service, folder_id), request_id=folder_id)
+            batch.execute()
+
+        try:
+            retry_policy.call('drive.files.list', send_batch)
+        except Exception as e:
+            print(f"Warning: Batched folder listing failed, listing folders one by one: {e}")
+            failed.extend(folder_id for folder_id in chunk if folder_id not in listings)
+
+    # Calls that failed inside the batch are retried on their own
+    for folder_id in dict.fromkeys(failed):
+        if folder_id in listings:
+            continue
+        result = retry_policy.execute(_list_request(drive_service, folder_id), 'drive.files.list')
+        listings[folder_id] = result.get('files', [])
+
+    return listings
+
+def _fetch_text(session, file):
+    data = drive_download.fetch_range(session, file['id'], 0, MAX_METADATA_BYTES)
+    return data.decode('utf-8-sig', errors='replace').strip()
+
+def fetch_texts(session, files_by_folder):
+    """Read the metadata files of several folders into memory. Returns {folder_id: {name: text}}."""
+    jobs = [(folder_id, file) for folder_id, files in files_by_folder.items()
+            for file in files if file['name'] in METADATA_FILES]
+    texts = {folder_id: {} for folder_id in files_by_folder}
+
+    with ThreadPoolExecutor(max_workers=TEXT_FETCH_WORKERS) as pool:
+        futures = [(folder_id, file, pool.submit(_fetch_text, session, file)) for folder_id, file in jobs]
+        for folder_id, file, future in futures:
+            try:
+                texts[folder_id][file['name']] = future.result()
+            except Exception as e:
+                print(f"Warning: Could not read {file['name']} of folder {folder_id}: {e}")
+    return texts
+
+def prefetch(drive_service, session, folder_ids):
+    """List the folders and read their metadata text in bulk, keeping the results in memory."""
+    folder_ids = [folder_id for folder_id in folder_ids if folder_id]
+    missing = [folder_id for folder_id in folder_ids if 'files' not in _folders.get(folder_id, {})]
+    if missing:
+        for folder_id, files in list_folders(drive_service, missing).items():
+            _folders.setdefault(folder_id, {})['files'] = files
+
+    need_text = {folder_id: _folders[folder_id]['files'] for folder_id in folder_ids
+                 if folder_id in _folders and 'files' in _folders[folder_id]
+                 and 'text' not in _folders[folder_id]}
+    if need_text:
+        print(f"Fetching metadata for {len(need_text)} folder(s) in memory...")
+        for folder_id, text in fetch_texts(session, need_text).items():
+            _folders[folder_id]['text'] = text
+    return {folder_id: _folders.get(folder_id, {}) for folder_id in folder_ids}
+
+def remember_files(folder_id, files):
+    """Seed a folder's listing, e.g. from a Drive scan that just listed it."""
+    _folders.setdefault(folder_id, {})['files'] = list(files)
+
+def remember_text(folder_id, text):
+    """Seed a folder's metadata text, e.g. from today's upload plan."""
+    _folders.setdefault(folder_id, {})['text'] = dict(text)
+
+def get_text(folder_id):
+    """Return a folder's metadata text if it is already in memory, else None."""
+    return _folders.get(folder_id, {}).get('text')
+
+def get(drive_service, session, folder_id):
+    """Return {'files': [...], 'text': {...}} for a folder, fetching whatever is not in memory."""
+    entry = _folders.setdefault(folder_id, {})
+    if 'files' not in entry:
+        entry['files'] = list_folders(drive_service, [folder_id]).get(folder_id, [])
+    if 'text' not in entry:
+        entry['text'] = fetch_texts(session, {folder_id: entry['files']})[folder_id]
+    return entry
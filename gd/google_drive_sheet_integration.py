@@ -1,5 +1,7 @@
+# Run from the repository root as a module, so the shared helpers there import:
+#     python -m gd.google_drive_sheet_integration
 import os
-import requests
+import sys
 import io
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
@@ -8,6 +10,14 @@ import datetime
 import json
 import time
 
+import retry_policy
+import share_link_fetcher
+import sheet_reader
+import drive_download
+import folder_metadata
+import folder_facts
+import service_account_pool
+
 # Define the scopes for Google Drive and Sheets APIs
 DRIVE_SHEETS_SCOPES = ['https://www.googleapis.com/auth/drive', 
                       'https://www.googleapis.com/auth/spreadsheets']
@@ -26,44 +36,13 @@ TEMP_DIR = 'temp_files'
 
 def download_credentials_from_gdrive(file_id):
     """Download the credentials file directly from Google Drive link."""
-    # Extract file ID from a Google Drive link if full URL provided
-    if '/' in file_id:
-        file_id = file_id.split('/')[-2]
-    
-    print(f"Downloading credentials file with ID: {file_id}")
-    
-    # Direct download URL format for Google Drive
-    url = f"https://drive.google.com/uc?export=download&id={file_id}"
+    print(f"Downloading credentials file with ID: {share_link_fetcher.file_id_from_link(file_id)}")
     
     try:
-        # First attempt - direct download for small files
-        response = requests.get(url)
-        
-        # Check if we got the download warning page (for larger files)
-        if 'Content-Disposition' not in response.headers:
-            print("Trying to handle large file download...")
-            # Handle the download warning page if needed
-            confirm_token = None
-            for line in response.text.split('\n'):
-                if 'confirm=' in line:
-                    confirm_token = line.split('confirm=')[1].split('&')[0]
-                    break
-            
-            if confirm_token:
-                url = f"{url}&confirm={confirm_token}"
-                response = requests.get(url)
-            else:
-                print("Could not extract confirmation token, may need manual download")
-        
-        # Save the credentials file
-        if response.status_code == 200:
-            with open('credentials.json', 'wb') as f:
-                f.write(response.content)
-            print("Successfully downloaded credentials.json")
-            return True
-        else:
-            print(f"Failed to download file: HTTP {response.status_code}")
-            return False
+        # Pooled, streaming and cached; large-file confirmation pages are handled by the fetcher
+        share_link_fetcher.fetch(file_id, dest_path='credentials.json')
+        print("Successfully downloaded credentials.json")
+        return True
     
     except Exception as e:
         print(f"Error downloading credentials file: {e}")
@@ -82,7 +61,8 @@ def get_credentials():
     credentials = service_account.Credentials.from_service_account_file(
         'credentials.json', scopes=DRIVE_SHEETS_SCOPES)
     
-    return credentials
+    # Spread requests over extra service accounts when any are configured
+    return service_account_pool.pooled(credentials, DRIVE_SHEETS_SCOPES)
 
 def find_folder_by_name(folder_name):
     """Find a folder by name in Google Drive."""
@@ -91,11 +71,11 @@ def find_folder_by_name(folder_name):
     
     # Search for the folder
     query = f"name='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    results = drive_service.files().list(
+    results = retry_policy.execute(drive_service.files().list(
         q=query,
         spaces='drive',
         fields='files(id, name, parents)'
-    ).execute()
+    ), 'drive.files.list')
     
     items = results.get('files', [])
     
@@ -112,11 +92,11 @@ def list_subfolders(folder_id):
     drive_service = build('drive', 'v3', credentials=credentials)
     
     query = f"'{folder_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
-    results = drive_service.files().list(
+    results = retry_policy.execute(drive_service.files().list(
         q=query,
         spaces='drive',
         fields='files(id, name, modifiedTime)'
-    ).execute()
+    ), 'drive.files.list')
     
     items = results.get('files', [])
     return items
@@ -127,11 +107,11 @@ def list_files_in_folder(folder_id):
     drive_service = build('drive', 'v3', credentials=credentials)
     
     query = f"'{folder_id}' in parents and mimeType!='application/vnd.google-apps.folder' and trashed=false"
-    results = drive_service.files().list(
+    results = retry_policy.execute(drive_service.files().list(
         q=query,
         spaces='drive',
         fields='files(id, name, mimeType, modifiedTime, size)'
-    ).execute()
+    ), 'drive.files.list')
     
     items = results.get('files', [])
     return items
@@ -153,7 +133,7 @@ def download_file_from_drive(file_id, file_name):
         downloader = MediaIoBaseDownload(f, request)
         done = False
         while done is False:
-            status, done = downloader.next_chunk()
+            status, done = retry_policy.call('drive.media', downloader.next_chunk)
             print(f"Download {int(status.progress() * 100)}%")
     
     return file_path
@@ -162,26 +142,37 @@ def get_files_by_type(files, mime_type_pattern):
     """Get files that match a specific MIME type pattern."""
     return [f for f in files if mime_type_pattern in f.get('mimeType', '')]
 
-def get_existing_folders_from_sheet(spreadsheet_id):
-    """Get list of subfolder IDs that are already in the spreadsheet."""
+def format_modified_time(modified_time):
+    """Drive's RFC 3339 modifiedTime as the sheet's Last Modified column shows it."""
+    try:
+        return datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+    except (AttributeError, ValueError):
+        return modified_time or ''
+
+def get_sheet_folder_rows(spreadsheet_id):
+    """Read the columns the scan compares against Drive for every row (None on error)."""
     credentials = get_credentials()
     sheets_service = build('sheets', 'v4', credentials=credentials)
     
     try:
-        # Get all values from column A (Folder ID) starting from row 2 (skipping header)
-        result = sheets_service.spreadsheets().values().get(
-            spreadsheetId=spreadsheet_id,
-            range='Sheet1!A2:A1000'  # Increased range to ensure we get all rows
-        ).execute()
-        
-        values = result.get('values', [])
+        # Page through every row of these columns, however long the sheet is
+        return sheet_reader.read_columns(sheets_service, spreadsheet_id,
+                                         ['Folder ID', 'Last Modified', 'Upload Status', 'Ready', 'Video MD5'])
+    except Exception as e:
+        print(f"Error reading folder rows: {e}")
+        return None
+
+def get_existing_folders_from_sheet(spreadsheet_id, rows=None):
+    """Get list of subfolder IDs that are already in the spreadsheet."""
+    try:
+        rows = rows if rows is not None else get_sheet_folder_rows(spreadsheet_id)
         
-        if not values:
+        if not rows:
             print("No existing folders found in the spreadsheet")
             return []
             
         # Extract folder IDs and ensure they're strings for consistent comparison
-        folder_ids = [str(row[0]).strip() for row in values if row and row[0]]
+        folder_ids = [str(row.get('Folder ID')).strip() for row in rows if row.get('Folder ID')]
         
         print(f"Found {len(folder_ids)} existing folders in the spreadsheet")
         if folder_ids:
@@ -214,28 +205,68 @@ def get_subfolder_details_with_files():
     print(f"Found {len(subfolders)} total subfolders in {TARGET_FOLDER_NAME}.")
     
     # Get existing folder IDs from the spreadsheet
-    existing_folder_ids = get_existing_folders_from_sheet(EXISTING_SHEET_ID)
+    sheet_rows = get_sheet_folder_rows(EXISTING_SHEET_ID)
+    existing_folder_ids = get_existing_folders_from_sheet(EXISTING_SHEET_ID, sheet_rows)
+    
+    # Unuploaded rows not checked yet get their video facts checked; rows found not ready
+    # are only checked again once the folder or its video changed
+    unuploaded_rows = {
+        str(row.get('Folder ID')).strip(): row for row in sheet_rows or []
+        if row.get('Folder ID') and row.get('Upload Status', '') != 'Yes' and row.get('Ready', '') != 'Yes'
+    }
     
     # Filter out folders that are already in the spreadsheet
     # Convert IDs to strings to ensure consistent comparison
     new_subfolders = [folder for folder in subfolders if str(folder['id']).strip() not in existing_folder_ids]
+    recheck_subfolders = [folder for folder in subfolders
+                          if unuploaded_rows.get(str(folder['id']).strip(), {}).get('Ready', '') == '']
+    not_ready_subfolders = [folder for folder in subfolders
+                            if unuploaded_rows.get(str(folder['id']).strip(), {}).get('Ready', '') == 'No']
+    
+    # List the candidate folders with batched calls (metadata only, nothing is downloaded)
+    credentials = get_credentials()
+    drive_service = build('drive', 'v3', credentials=credentials)
+    listings = folder_metadata.list_folders(
+        drive_service, [folder['id'] for folder in new_subfolders + recheck_subfolders + not_ready_subfolders])
+    files_by_folder = {
+        folder_id: [f for f in files if f.get('mimeType') != 'application/vnd.google-apps.folder']
+        for folder_id, files in listings.items()
+    }
+    
+    def changed_since_check(folder):
+        row = unuploaded_rows[str(folder['id']).strip()]
+        if format_modified_time(folder.get('modifiedTime', '')) != row.get('Last Modified', ''):
+            return True
+        video = next((f for f in files_by_folder.get(folder['id'], []) if f['name'] == 'video.mp4'), None)
+        return (video.get('md5Checksum', '') if video else '') != row.get('Video MD5', '')
+    
+    changed_subfolders = [folder for folder in not_ready_subfolders if changed_since_check(folder)]
+    recheck_subfolders += changed_subfolders
     
     print(f"Found {len(new_subfolders)} NEW subfolders to process.")
+    print(f"Found {len(recheck_subfolders)} unuploaded subfolders whose video facts need checking "
+          f"({len(not_ready_subfolders) - len(changed_subfolders)} unchanged not-ready folders left alone).")
     
-    if not new_subfolders:
+    if not new_subfolders and not recheck_subfolders:
         print("No new subfolders to process. All are already in the spreadsheet.")
         return []
     
-    # For each new subfolder, get its files
+    # Preflight the videos of the folders to process over Range requests
+    files_by_folder = {folder['id']: files_by_folder.get(folder['id'], [])
+                       for folder in new_subfolders + recheck_subfolders}
+    facts_by_folder = folder_facts.compute_many(drive_download.create_session(credentials), files_by_folder)
+    
+    # For each subfolder, record its files and facts
     all_data = []
+    new_folder_ids = {folder['id'] for folder in new_subfolders}
     
-    for subfolder in new_subfolders:
+    for subfolder in new_subfolders + recheck_subfolders:
         subfolder_id = subfolder['id']
         subfolder_name = subfolder['name']
         subfolder_modified = subfolder.get('modifiedTime', '')
         
-        # Get files in this subfolder
-        files = list_files_in_folder(subfolder_id)
+        files = files_by_folder.get(subfolder_id, [])
+        facts = facts_by_folder.get(subfolder_id, {})
         
         # Create an entry for this subfolder
         subfolder_entry = {
@@ -245,16 +276,18 @@ def get_subfolder_details_with_files():
             'parent_folder': TARGET_FOLDER_NAME,
             'modified_time': subfolder_modified,
             'file_count': len(files),
-            'files': files
+            'files': files,
+            'facts': facts
         }
         
         all_data.append(subfolder_entry)
         
-        # Print subfolder name and file count
-        print(f"  - {subfolder_name}: {len(files)} files")
+        # Print subfolder name, file count and readiness
+        print(f"  - {subfolder_name}: {len(files)} files, ready: {facts.get('Ready') or 'unknown'}"
+              f"{' (' + facts['Video Check'] + ')' if facts.get('Video Check') else ''}")
         
-        # Print file names within this subfolder
-        if files:
+        # Print file names within new subfolders
+        if files and subfolder_id in new_folder_ids:
             print(f"    Files in {subfolder_name}:")
             for file in files:
                 print(f"      • {file['name']} ({file['mimeType']})")
@@ -273,10 +306,10 @@ def update_sheet_with_detailed_data(spreadsheet_id, folder_data):
     
     # Get ALL existing data including Upload Status, Upload Date, and YouTube URL columns
     try:
-        result = sheets_service.spreadsheets().values().get(
+        result = retry_policy.execute(sheets_service.spreadsheets().values().get(
             spreadsheetId=spreadsheet_id,
             range='Sheet1'  # Get the entire sheet to preserve all columns
-        ).execute()
+        ), 'sheets.read')
         
         existing_values = result.get('values', [])
         
@@ -315,6 +348,11 @@ def update_sheet_with_detailed_data(spreadsheet_id, folder_data):
     
     # Extract header row and existing data rows
     header = existing_values[0] if existing_values else []
+    
+    # Video fact columns go after whatever columns the sheet already has
+    for col in folder_facts.FACT_COLUMNS:
+        if col not in header:
+            header.append(col)
     existing_data_rows = existing_values[1:] if len(existing_values) > 1 else []
     
     # Create a dictionary to store existing data by Folder ID for quick lookup
@@ -335,13 +373,7 @@ def update_sheet_with_detailed_data(spreadsheet_id, folder_data):
         updated_folder_ids.add(folder_id)
         
         # Format modified time
-        modified_time = folder.get('modified_time', '')
-        if modified_time:
-            try:
-                dt = datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00'))
-                modified_time = dt.strftime('%Y-%m-%d %H:%M:%S')
-            except:
-                pass
+        modified_time = format_modified_time(folder.get('modified_time', ''))
         
         # Get file names, types, and IDs as comma-separated lists
         file_names = ", ".join([f['name'] for f in folder.get('files', [])])
@@ -371,14 +403,14 @@ def update_sheet_with_detailed_data(spreadsheet_id, folder_data):
                     new_data.append(existing_row[i])
                 else:
                     new_data.append('')  # Add empty cells if needed
-            
-            updated_rows.append(new_data)
-        else:
-            # This is a completely new folder, so we only have basic data
-            # Add empty values for any additional columns in the header
-            while len(new_data) < len(header):
-                new_data.append('')
-            updated_rows.append(new_data)
+        
+        # Add empty values for any additional columns in the header, then fill in the video facts
+        while len(new_data) < len(header):
+            new_data.append('')
+        for col, value in folder.get('facts', {}).items():
+            new_data[header.index(col)] = value
+        
+        updated_rows.append(new_data)
     
     # Add any existing rows that weren't in the new data (to preserve ALL existing data)
     for folder_id, row in existing_data_dict.items():
@@ -397,12 +429,12 @@ def update_sheet_with_detailed_data(spreadsheet_id, folder_data):
     }
     
     # Update the sheet WITHOUT clearing it first
-    response = sheets_service.spreadsheets().values().update(
+    response = retry_policy.execute(sheets_service.spreadsheets().values().update(
         spreadsheetId=spreadsheet_id,
         range='Sheet1!A1',  # Start from A1 and update as many cells as needed
         valueInputOption='RAW',
         body=body
-    ).execute()
+    ), 'sheets.write')
     
     print(f"Spreadsheet updated preserving existing data. {len(updated_rows)} total subfolder entries.")
     print(f"URL: https://docs.google.com/spreadsheets/d/{spreadsheet_id}")
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""Find local videos with their sidecar metadata, and remember which were uploaded.
+
+A directory can hold loose videos with sidecars next to them
+
+    trip.mp4  trip.title.txt  trip.description.txt  trip.tags.txt  trip.jpg
+
+or one folder per video laid out like the Drive folders
+
+    trip/video.mp4  trip/title.txt  trip/description.txt  trip/tags.txt  trip/thumbnail.jpg
+
+A manifest is a JSON list of {"file", "title", "description", "tags",
+"thumbnail", "category", "privacyStatus"} objects, paths relative to the
+manifest. Progress is kept in a JSON file keyed by the video's path, so a
+re-run skips videos already uploaded unless the file changed since.
+"""
+
+import os
+import json
+import time
+import threading
+
+import state_file
+
+VIDEO_EXTENSIONS = ('.mp4', '.mov', '.m4v', '.mkv', '.webm', '.avi')
+THUMBNAIL_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+# Text sidecars: item key -> (suffix next to a loose video, file name inside a video folder)
+TEXT_SIDECARS = {
+    'title': ('.title.txt', 'title.txt'),
+    'description': ('.description.txt', 'description.txt'),
+    'tags': ('.tags.txt', 'tags.txt')
+}
+
+PROGRESS_FILE_NAME = '.upload_progress.json'
+
+def _read_text(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+def _first_existing(paths):
+    return next((path for path in paths if os.path.isfile(path)), None)
+
+def is_video_name(name):
+    return name.lower().endswith(VIDEO_EXTENSIONS) and not name.startswith('.')
+
+def item_for_video(path):
+    """Return the upload item for a loose video, its sidecars read in."""
+    stem = os.path.splitext(path)[0]
+    item = {'file': path}
+    for key, (suffix, _) in TEXT_SIDECARS.items():
+        item[key] = _read_text(stem + suffix)
+    item['thumbnail'] = _first_existing(
+        [stem + ext for ext in THUMBNAIL_EXTENSIONS] + [stem + '.thumbnail' + ext for ext in THUMBNAIL_EXTENSIONS])
+    return item
+
+def item_for_folder(folder):
+    """Return the upload item for a Drive-style folder holding video.mp4, or None."""
+    video = os.path.join(folder, 'video.mp4')
+    if not os.path.isfile(video):
+        return None
+    item = {'file': video}
+    for key, (_, name) in TEXT_SIDECARS.items():
+        item[key] = _read_text(os.path.join(folder, name))
+    item['title'] = item['title'] or os.path.basename(os.path.normpath(folder))
+    item['thumbnail'] = _first_existing([os.path.join(folder, 'thumbnail' + ext) for ext in THUMBNAIL_EXTENSIONS])
+    return item
+
+def discover(directory):
+    """Return upload items for the videos in directory (loose files and video folders), sorted by path."""
+    items = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            if entry.is_dir():
+                item = item_for_folder(entry.path)
+                if item:
+                    items.append(item)
+            elif entry.is_file() and is_video_name(entry.name):
+                items.append(item_for_video(entry.path))
+    return sorted(items, key=lambda item: item['file'])
+
+def load_manifest(path):
+    """Return upload items from a JSON manifest (a list, or {"videos": [...]})."""
+    with open(path, 'r', encoding='utf-8') as f:
+        entries = json.load(f)
+    if isinstance(entries, dict):
+        entries = entries.get('videos', [])
+    base = os.path.dirname(os.path.abspath(path))
+    items = []
+    for number, entry in enumerate(entries, 1):
+        if not isinstance(entry, dict) or not entry.get('file'):
+            raise ValueError(f"{path}: entry {number} has no 'file'")
+        item = dict(entry)
+        for key in ('file', 'thumbnail'):
+            if item.get(key):
+                item[key] = os.path.join(base, item[key])
+        if isinstance(item.get('tags'), list):
+            item['tags'] = ','.join(item['tags'])
+        items.append(item)
+    return items
+
+def default_progress_path(directory=None, manifest=None):
+    if manifest:
+        return os.path.splitext(manifest)[0] + '.progress.json'
+    return os.path.join(directory, PROGRESS_FILE_NAME)
+
+class Progress:
+    """Uploaded videos by path, saved atomically after every change."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = state_file.load(path, {})
+
+    @staticmethod
+    def key(path):
+        return os.path.realpath(path)
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def is_done(self, path):
+        """True if path was uploaded and has not changed since."""
+        with self.lock:
+            entry = self.entries.get(self.key(path))
+        if not entry or not entry.get('video_id'):
+            return False
+        try:
+            signature = self._signature(path)
+        except OSError:
+            return False
+        return entry.get('size') == signature['size'] and entry.get('mtime_ns') == signature['mtime_ns']
+
+    def _save(self):
+        state_file.save(self.path, self.entries, indent=2)
+
+    def record(self, path, video_id=None, error=None):
+        """Record an upload (video_id) or a failed attempt (error) of path."""
+        entry = {'updated_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+        try:
+            entry.update(self._signature(path))
+        except OSError:
+            pass
+        if video_id:
+            entry['video_id'] = video_id
+        if error:
+            entry['error'] = str(error)
+        with self.lock:
+            previous = self.entries.get(self.key(path), {})
+            entry['attempts'] = previous.get('attempts', 0) + 1
+            self.entries[self.key(path)] = entry
+            self._save()
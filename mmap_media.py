@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Memory-mapped media bodies for videos.insert and thumbnails.set.
+
+MediaFileUpload and MediaIoBaseUpload read every block of every chunk (and
+every retried chunk) from the file into a new bytes object. MmapMediaUpload
+maps the file once and hands googleapiclient one memoryview slice of the
+mapping per chunk instead, which http.client passes to the socket whole, so
+a chunk goes from the page cache to the socket without a copy in Python.
+Each slice is charged against the shared egress budget before it is sent.
+"""
+
+import os
+import io
+import json
+import mmap
+
+from googleapiclient.http import MediaUpload
+
+import bandwidth
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# Mapped pages this far behind the read position are dropped from the process
+# (they stay in the page cache), so RSS does not grow with the file size
+RELEASE_BEHIND_BYTES = 1024 * 1024
+
+class MmapReader:
+    """Seekable reader over a memory-mapped file whose read() returns memoryview slices."""
+
+    def __init__(self, path, channel=None):
+        self._channel = channel
+        self._position = 0
+        self._released = 0
+        self._map = None
+        with open(path, 'rb') as f:
+            self._size = os.fstat(f.fileno()).st_size
+            # An empty file cannot be mapped
+            if self._size:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b'')
+        if self._map is not None and hasattr(self._map, 'madvise'):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+    @property
+    def size(self):
+        return self._size
+
+    def slice(self, begin, length):
+        """Return up to length bytes from begin as a memoryview, charged to the egress budget."""
+        if length is None or length < 0:
+            length = self._size - begin
+        data = self._view[begin:begin + length]
+        self._release_behind(begin)
+        if len(data):
+            bandwidth.get_limiter().throttle(bandwidth.EGRESS, len(data), self._channel)
+        return data
+
+    def _release_behind(self, position):
+        end = (position - RELEASE_BEHIND_BYTES) // mmap.PAGESIZE * mmap.PAGESIZE
+        if self._map is None or end - self._released < RELEASE_BEHIND_BYTES or not hasattr(mmap, 'MADV_DONTNEED'):
+            return
+        # A retry that seeks back just faults the pages in again
+        self._map.madvise(mmap.MADV_DONTNEED, self._released, end - self._released)
+        self._released = end
+
+    def read(self, size=-1):
+        data = self.slice(self._position, size)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self._size
+        self._position = max(0, offset)
+        self._released = min(self._released, self._position // mmap.PAGESIZE * mmap.PAGESIZE)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        self._view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A chunk slice is still referenced; the mapping goes away with it
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class MmapMediaUpload(MediaUpload):
+    """MediaUpload over a memory-mapped file. Use as a context manager to unmap it afterwards."""
+
+    def __init__(self, path, mimetype, chunksize=DEFAULT_CHUNK_SIZE, resumable=False, channel=None):
+        super().__init__()
+        self._filename = path
+        self._channel = channel
+        self._reader = MmapReader(path, channel)
+        self._mimetype = mimetype
+        self._chunksize = chunksize
+        self._resumable = resumable
+
+    def chunksize(self):
+        return self._chunksize
+
+    def mimetype(self):
+        return self._mimetype
+
+    def size(self):
+        return self._reader.size
+
+    def resumable(self):
+        return self._resumable
+
+    def getbytes(self, begin, length):
+        # Resumable chunks, retries and simple uploads like thumbnails.set all send a slice
+        return self._reader.slice(begin, length)
+
+    def has_stream(self):
+        # A stream would be read in 8 KB blocks; getbytes() hands over a whole chunk at once
+        return False
+
+    def stream(self):
+        return self._reader
+
+    def to_json(self):
+        # Like MediaFileUpload: the path is serialized and the file mapped again on load
+        return self._to_json(strip=['_reader'])
+
+    @staticmethod
+    def from_json(s):
+        """Rebuild an upload from to_json() (MediaUpload.new_from_json only accepts googleapiclient's own classes)."""
+        d = json.loads(s)
+        return MmapMediaUpload(d['_filename'], d['_mimetype'], chunksize=d['_chunksize'],
+                               resumable=d['_resumable'], channel=d['_channel'])
+
+    def close(self):
+        self._reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""Pure-Python MP4 preflight: walk the box structure from a few KB at each end of the file.
+
+The probe reads the head and tail of the file (locally or with Drive Range
+requests), follows top-level box headers across the file, and parses moov for
+duration, resolution and codecs. Zero-byte, truncated and non-MP4 files are
+rejected before the full download and upload.
+"""
+
+import os
+import struct
+import threading
+
+import drive_download
+import state_file
+
+CACHE_FILE = os.path.join(state_file.STATE_DIR, 'mp4_probe.json')
+
+_cache_lock = threading.Lock()
+
+HEAD_BYTES = 64 * 1024
+TAIL_BYTES = 64 * 1024
+
+# Window fetched when a box header lies outside the bytes already read
+HEADER_WINDOW_BYTES = 4 * 1024
+
+# Fragmented files alternate moof/mdat; stop following headers after this many fetches
+MAX_HEADER_FETCHES = 32
+
+# A moov bigger than this is not an index for the videos this repo uploads
+MAX_MOOV_BYTES = 32 * 1024 * 1024
+
+# Boxes whose children are parsed for track details
+CONTAINER_BOXES = (b'moov', b'trak', b'mdia', b'minf', b'stbl', b'mvex')
+
+class Mp4ProbeError(Exception):
+    """The file is not a usable MP4 (empty, truncated, corrupt or missing its index)."""
+
+class _RangeReader:
+    """Serves byte ranges from cached windows, fetching the rest with read_fn(offset, length)."""
+
+    def __init__(self, read_fn, size):
+        self.read_fn = read_fn
+        self.size = size
+        self.windows = []
+        self.fetches = 0
+        self._fetch(0, min(HEAD_BYTES, size))
+        if size > HEAD_BYTES:
+            tail_start = max(HEAD_BYTES, size - TAIL_BYTES)
+            self._fetch(tail_start, size - tail_start)
+
+    def _fetch(self, offset, length):
+        data = self.read_fn(offset, length)
+        self.fetches += 1
+        self.windows.append((offset, data))
+        return data
+
+    def read(self, offset, length):
+        length = min(length, self.size - offset)
+        for start, data in self.windows:
+            if start <= offset and offset + length <= start + len(data):
+                return data[offset - start:offset - start + length]
+        data = self._fetch(offset, max(length, min(HEADER_WINDOW_BYTES, self.size - offset)))
+        return data[:length]
+
+def _box_header(data, offset, end):
+    """Return (type, header_size, box_size) of the box at offset in data, or raise on garbage."""
+    if end - offset < 8:
+        raise Mp4ProbeError(f"truncated box header at offset {offset}")
+    size, box_type = struct.unpack('>I4s', data[offset:offset + 8])
+    header_size = 8
+    if size == 1:
+        if end - offset < 16:
+            raise Mp4ProbeError(f"truncated box header at offset {offset}")
+        size = struct.unpack('>Q', data[offset + 8:offset + 16])[0]
+        header_size = 16
+    elif size == 0:
+        size = end - offset  # Box runs to the end of its parent
+    if size < header_size:
+        raise Mp4ProbeError(f"corrupt box '{box_type.decode('latin-1')}' at offset {offset} (size {size})")
+    return box_type, header_size, size
+
+def _children(data, start, end):
+    """Yield (type, payload_start, box_end) for the boxes between start and end."""
+    offset = start
+    while offset + 8 <= end:
+        box_type, header_size, size = _box_header(data, offset, end)
+        if offset + size > end:
+            raise Mp4ProbeError(f"box '{box_type.decode('latin-1')}' overruns its parent")
+        yield box_type, offset + header_size, offset + size
+        offset += size
+
+def _parse_mvhd(data, start):
+    version = data[start]
+    if version == 1:
+        timescale, duration = struct.unpack('>IQ', data[start + 20:start + 32])
+    else:
+        timescale, duration = struct.unpack('>II', data[start + 12:start + 20])
+    return timescale, duration
+
+def _parse_tkhd(data, start):
+    """Return (track_id, width, height); width and height are 16.16 fixed point."""
+    version = data[start]
+    track_id = struct.unpack_from('>I', data, start + (20 if version == 1 else 12))[0]
+    width, height = struct.unpack_from('>II', data, start + (88 if version == 1 else 76))
+    return track_id, width >> 16, height >> 16
+
+def _parse_trak(data, start, end):
+    track = {}
+    for box_type, payload, box_end in _children(data, start, end):
+        if box_type == b'tkhd':
+            track['track_id'], track['width'], track['height'] = _parse_tkhd(data, payload)
+        elif box_type == b'mdhd':
+            track['timescale'] = struct.unpack_from('>I', data, payload + (20 if data[payload] == 1 else 12))[0]
+        elif box_type in CONTAINER_BOXES:
+            track.update(_parse_trak(data, payload, box_end))
+        elif box_type == b'hdlr':
+            track['handler'] = data[payload + 8:payload + 12].decode('latin-1')
+        elif box_type == b'stsd' and box_end - payload >= 16:
+            track['codec'] = data[payload + 12:payload + 16].decode('latin-1')
+    return track
+
+def _parse_moov(data):
+    """Return (info, video_track, trex_durations) from a moov payload."""
+    info = {'duration': None, 'width': None, 'height': None, 'video_codec': None, 'audio_codec': None}
+    timescale = duration = 0
+    fragment_duration = 0
+    video_track = {}
+    trex_durations = {}
+    for box_type, payload, box_end in _children(data, 0, len(data)):
+        if box_type == b'mvhd':
+            timescale, duration = _parse_mvhd(data, payload)
+        elif box_type == b'mvex':
+            for child_type, child_payload, _ in _children(data, payload, box_end):
+                if child_type == b'mehd':
+                    fmt = '>Q' if data[child_payload] == 1 else '>I'
+                    fragment_duration = struct.unpack_from(fmt, data, child_payload + 4)[0]
+                elif child_type == b'trex':
+                    track_id, _, default_duration = struct.unpack_from('>III', data, child_payload + 4)
+                    trex_durations[track_id] = default_duration
+        elif box_type == b'trak':
+            track = _parse_trak(data, payload, box_end)
+            if track.get('handler') == 'vide' and not info['video_codec']:
+                video_track = track
+                info['video_codec'] = track.get('codec')
+                info['width'], info['height'] = track.get('width'), track.get('height')
+            elif track.get('handler') == 'soun' and not info['audio_codec']:
+                info['audio_codec'] = track.get('codec')
+    # Fragmented files keep the real length in mehd, if anywhere
+    duration = duration or fragment_duration
+    if timescale and duration:
+        info['duration'] = round(duration / timescale, 3)
+    return info, video_track, trex_durations
+
+def _fragment_end_time(data, track_id, default_duration):
+    """Return the end time, in track timescale units, of track_id's samples in a moof payload."""
+    end_time = None
+    for box_type, payload, box_end in _children(data, 0, len(data)):
+        if box_type != b'traf':
+            continue
+        base_time = 0
+        sample_duration = default_duration
+        total = 0
+        matched = False
+        for child_type, child_payload, _ in _children(data, payload, box_end):
+            flags = struct.unpack_from('>I', data, child_payload)[0] & 0xFFFFFF
+            if child_type == b'tfhd':
+                matched = struct.unpack_from('>I', data, child_payload + 4)[0] == track_id
+                offset = child_payload + 8
+                offset += 8 if flags & 0x01 else 0  # base-data-offset
+                offset += 4 if flags & 0x02 else 0  # sample-description-index
+                if flags & 0x08:
+                    sample_duration = struct.unpack_from('>I', data, offset)[0]
+            elif child_type == b'tfdt':
+                fmt = '>Q' if data[child_payload] == 1 else '>I'
+                base_time = struct.unpack_from(fmt, data, child_payload + 4)[0]
+            elif child_type == b'trun':
+                count = struct.unpack_from('>I', data, child_payload + 4)[0]
+                offset = child_payload + 8
+                offset += 4 if flags & 0x01 else 0  # data-offset
+                offset += 4 if flags & 0x04 else 0  # first-sample-flags
+                if flags & 0x100:
+                    stride = 4 * bin(flags & 0xF00).count('1')
+                    total += sum(struct.unpack_from('>I', data, offset + i * stride)[0] for i in range(count))
+                else:
+                    total += count * sample_duration
+        if matched:
+            end_time = base_time + total
+    return end_time
+
+def probe(read_fn, size):
+    """Probe an MP4 of size bytes through read_fn(offset, length). Returns an info dict.
+
+    Raises Mp4ProbeError for anything YouTube would fail to process.
+    """
+    size = int(size or 0)
+    if size < 8:
+        raise Mp4ProbeError("file is empty" if size == 0 else f"file is only {size} bytes")
+
+    reader = _RangeReader(read_fn, size)
+    boxes = []
+    moov = None
+    last_moof = None
+    offset = 0
+    while offset < size:
+        if reader.fetches >= MAX_HEADER_FETCHES + 2:
+            break  # Long fragmented tail; moov and the first fragments were sound
+        header = reader.read(offset, 16)
+        box_type, header_size, box_size = _box_header(header, 0, size - offset)
+        name = box_type.decode('latin-1')
+        if not boxes and box_type != b'ftyp':
+            raise Mp4ProbeError(f"not an MP4 file (first box is '{name}', expected 'ftyp')")
+        if offset + box_size > size:
+            raise Mp4ProbeError(f"truncated: box '{name}' at offset {offset} needs {box_size} bytes, "
+                                f"file has {size - offset}")
+        if box_type == b'moov':
+            if box_size > MAX_MOOV_BYTES:
+                raise Mp4ProbeError(f"moov box is {box_size} bytes, larger than any sane index")
+            moov = reader.read(offset + header_size, box_size - header_size)
+        elif box_type == b'moof':
+            last_moof = (offset + header_size, box_size - header_size)
+        boxes.append(name)
+        offset += box_size
+    walked_to_end = offset >= size
+
+    if 'moov' not in boxes or moov is None:
+        raise Mp4ProbeError("no moov box (the file has no index)")
+    if 'mdat' not in boxes:
+        raise Mp4ProbeError("no mdat box (the file has no media data)")
+
+    try:
+        info, video_track, trex_durations = _parse_moov(moov)
+    except (struct.error, IndexError):
+        raise Mp4ProbeError("corrupt moov box")
+    if not info['video_codec']:
+        raise Mp4ProbeError("no video track")
+
+    # Fragmented MP4 without a total duration: the last fragment's end time gives it
+    if info['duration'] is None and last_moof and walked_to_end and video_track.get('timescale'):
+        track_id = video_track.get('track_id')
+        try:
+            end_time = _fragment_end_time(reader.read(*last_moof), track_id, trex_durations.get(track_id, 0))
+        except (struct.error, IndexError, Mp4ProbeError):
+            end_time = None  # Duration is informational; a damaged fragment is caught on upload
+        if end_time:
+            info['duration'] = round(end_time / video_track['timescale'], 3)
+    info['size'] = size
+    info['brand'] = reader.read(8, 4).decode('latin-1')
+    return info
+
+def probe_local(path):
+    """Probe a local MP4 file."""
+    with open(path, 'rb') as f:
+        def read(offset, length):
+            f.seek(offset)
+            return f.read(length)
+        return probe(read, os.path.getsize(path))
+
+def probe_drive(session, file_id, size, channel=None):
+    """Probe a Drive file with Range requests, without downloading it."""
+    return probe(lambda offset, length: drive_download.fetch_range(session, file_id, offset, length, channel),
+                 size)
+
+def _remember(file_id, entry):
+    # Re-read under the lock so probes running on other threads and processes keep their entries
+    with _cache_lock, state_file.locked(CACHE_FILE):
+        cache = state_file.load(CACHE_FILE, {})
+        cache[file_id] = entry
+        state_file.save(CACHE_FILE, cache, indent=2)
+
+def cached_probe(file_id, md5, probe_fn):
+    """Run probe_fn() once per Drive file version; rejections are cached as well as results."""
+    with _cache_lock:
+        entry = state_file.load(CACHE_FILE, {}).get(file_id)
+    if entry and entry.get('md5') == md5:
+        if entry.get('error'):
+            raise Mp4ProbeError(entry['error'])
+        return entry['info']
+
+    try:
+        info = probe_fn()
+    except Mp4ProbeError as e:
+        _remember(file_id, {'md5': md5, 'error': str(e)})
+        raise
+    _remember(file_id, {'md5': md5, 'info': info})
+    return info
+
+def describe(info):
+    """One-line summary such as '1080x1920 avc1/mp4a, 61.5s'."""
+    codecs = '/'.join(c for c in (info.get('video_codec'), info.get('audio_codec')) if c)
+    duration = f"{info['duration']}s" if info.get('duration') else 'unknown duration'
+    return f"{info.get('width')}x{info.get('height')} {codecs}, {duration}"
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Per-channel publishing schedule for burst uploads.
+
+In burst mode videos are uploaded back to back as private, each with a
+status.publishAt slot. A channel's slots are spaced by its publish interval,
+so videos still go public one at a time. The slots handed out per channel are
+kept in .videopost/publish_schedule.json, shared by every uploader process of
+the run. A slot is reserved before the upload (publishAt goes in the insert
+request) and released again if the upload fails, so the next video takes it.
+"""
+
+import os
+import time
+import datetime
+
+import state_file
+
+SCHEDULE_FILE = os.path.join(state_file.STATE_DIR, 'publish_schedule.json')
+
+# Minutes between two videos of the same channel going public
+DEFAULT_INTERVAL_MINUTES = 20
+
+# The first slot leaves YouTube time to process the upload
+DEFAULT_DELAY_MINUTES = 15
+
+PUBLISH_AT_FORMAT = '%Y-%m-%dT%H:%M:%S.000Z'
+
+_config = None
+
+def parse_intervals(values):
+    """Parse ['30', 'MagicMap Tales=45'] into (default minutes, {channel: minutes})."""
+    default = DEFAULT_INTERVAL_MINUTES
+    per_channel = {}
+    for value in values or []:
+        for item in value.split(','):
+            if not item.strip():
+                continue
+            name, sep, minutes = item.rpartition('=')
+            try:
+                minutes = float(minutes)
+            except ValueError:
+                raise ValueError(f"Invalid publish interval '{item}', expected minutes or 'Channel Name=minutes'")
+            if minutes <= 0:
+                raise ValueError(f"Publish interval must be positive: '{item}'")
+            if sep:
+                per_channel[name.strip().lower()] = minutes
+            else:
+                default = minutes
+    return default, per_channel
+
+def configure(intervals=None, delay_minutes=DEFAULT_DELAY_MINUTES):
+    """Turn burst mode on. intervals is the output of parse_intervals()."""
+    global _config
+    default, per_channel = intervals or (DEFAULT_INTERVAL_MINUTES, {})
+    _config = {'default': default, 'channels': per_channel, 'delay': delay_minutes}
+
+def is_enabled():
+    return _config is not None
+
+def interval_minutes(channel):
+    return _config['channels'].get((channel or '').lower(), _config['default'])
+
+def _slots(state, key, now):
+    """The channel's reserved slots still in the future (state from older runs kept only the last one)."""
+    slots = state.get(key) or []
+    if not isinstance(slots, list):
+        slots = [slots]
+    return sorted(slot for slot in slots if slot > now)
+
+def next_slot(channel, now=None):
+    """Reserve the channel's earliest free publish time and return it as a UTC datetime."""
+    now = now or time.time()
+    key = (channel or '').lower()
+    interval = interval_minutes(channel) * 60
+    with state_file.locked(SCHEDULE_FILE):
+        state = state_file.load(SCHEDULE_FILE, {})
+        slots = _slots(state, key, now)
+        earliest = now + _config['delay'] * 60
+        # The earliest time at least one interval away from every reserved slot, so released slots are reused
+        candidates = [earliest] + [slot + interval for slot in slots if slot + interval >= earliest]
+        slot = min(t for t in candidates if all(abs(t - other) >= interval for other in slots))
+        state[key] = sorted(slots + [slot])
+        state_file.save(SCHEDULE_FILE, state, indent=2)
+    return datetime.datetime.fromtimestamp(slot, tz=datetime.timezone.utc)
+
+def release(channel, slot):
+    """Give back a slot from next_slot() whose upload failed."""
+    key = (channel or '').lower()
+    with state_file.locked(SCHEDULE_FILE):
+        state = state_file.load(SCHEDULE_FILE, {})
+        slots = _slots(state, key, time.time())
+        timestamp = slot.timestamp()
+        state[key] = [other for other in slots if abs(other - timestamp) > 1e-3]
+        state_file.save(SCHEDULE_FILE, state, indent=2)
+
+def format_publish_at(slot):
+    """Format a slot as the RFC 3339 timestamp YouTube expects in status.publishAt."""
+    return slot.astimezone(datetime.timezone.utc).strftime(PUBLISH_AT_FORMAT)
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""Client-side request rate limits per API and per credential.
+
+Every retry_policy.call() attempt takes a token from its API's bucket (the
+limit Google or Telegram applies to the whole project or bot), and requests
+signed by a pooled service account, or calls made with a rate_key such as a
+Telegram chat, also take one from that credential's bucket. Buckets refill at
+RATE_HEADROOM of the published rate and hold the rest as burst, so no
+sliding window of the published length can exceed the limit. Limits are per
+process.
+"""
+
+import threading
+from urllib.parse import urlparse
+
+import bandwidth
+
+# Published limits as (requests, per seconds). Endpoint names match by prefix, longest first.
+PROJECT_LIMITS = {
+    'sheets.read': (300, 60),     # Read requests per minute per project
+    'sheets.write': (300, 60),    # Write requests per minute per project
+    'drive': (12000, 60),         # Queries per minute
+    'telegram': (30, 1),          # Messages per second per bot
+}
+CREDENTIAL_LIMITS = {
+    'sheets.read': (60, 60),      # Read requests per minute per user per project
+    'sheets.write': (60, 60),     # Write requests per minute per user per project
+    'drive': (12000, 60),         # Queries per minute per user
+    'telegram': (20, 60),         # Messages per minute to one group chat
+}
+# YouTube is limited by daily quota units rather than request rate; limits can still be set for it
+
+# Sustained fraction of a published rate; the remainder is the bucket's burst
+RATE_HEADROOM = 0.85
+
+def parse_limits(values):
+    """Parse ['sheets.read=60/60', 'drive=100/1'] into {api: (requests, seconds)}."""
+    limits = {}
+    for value in values or []:
+        for pair in value.split(','):
+            if not pair.strip():
+                continue
+            api, sep, spec = pair.partition('=')
+            count, slash, seconds = spec.partition('/')
+            try:
+                limit = (float(count), float(seconds) if slash else 1.0)
+            except ValueError:
+                limit = None
+            if not sep or not api.strip() or not limit or limit[0] <= 0 or limit[1] <= 0:
+                raise ValueError(f"Invalid request limit '{pair}', expected API=REQUESTS/SECONDS like sheets.read=60/60")
+            limits[api.strip()] = limit
+    return limits
+
+def _match(limits, endpoint):
+    for api in sorted(limits, key=len, reverse=True):
+        if endpoint == api or endpoint.startswith(api + '.'):
+            return api
+    return None
+
+def _bucket_for(limit):
+    count, seconds = limit
+    return bandwidth.TokenBucket(count / seconds * RATE_HEADROOM, burst=max(1.0, count * (1 - RATE_HEADROOM)))
+
+class RateLimiterRegistry:
+    """Lazily created token buckets keyed by (api, credential)."""
+
+    def __init__(self, project_limits=None, credential_limits=None):
+        self.project_limits = dict(PROJECT_LIMITS if project_limits is None else project_limits)
+        self.credential_limits = dict(CREDENTIAL_LIMITS if credential_limits is None else credential_limits)
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def _bucket(self, limits, endpoint, credential):
+        api = _match(limits, endpoint)
+        if api is None:
+            return None
+        key = (api, credential)
+        with self.lock:
+            if key not in self.buckets:
+                self.buckets[key] = _bucket_for(limits[api])
+            return self.buckets[key]
+
+    def acquire(self, endpoint, credential=None):
+        """Wait until one request to endpoint fits the API's limit (and credential's, if given)."""
+        buckets = [self._bucket(self.project_limits, endpoint, None)]
+        if credential is not None:
+            buckets.append(self._bucket(self.credential_limits, endpoint, credential))
+        for bucket in buckets:
+            if bucket:
+                bucket.consume(1)
+
+_registry = RateLimiterRegistry()
+
+def configure(overrides=None, credential_overrides=None):
+    """Install the process-wide registry, replacing published limits with any overrides."""
+    global _registry
+    _registry = RateLimiterRegistry(dict(PROJECT_LIMITS, **(overrides or {})),
+                                    dict(CREDENTIAL_LIMITS, **(credential_overrides or {})))
+    return _registry
+
+def get_registry():
+    return _registry
+
+def acquire(endpoint, credential=None):
+    _registry.acquire(endpoint, credential)
+
+def endpoint_for_request(method, url):
+    """Map a Google API request to the endpoint name its limits are kept under."""
+    parsed = urlparse(url)
+    if parsed.hostname == 'sheets.googleapis.com':
+        return 'sheets.read' if method.upper() == 'GET' else 'sheets.write'
+    if parsed.hostname == 'drive.googleapis.com' or parsed.path.startswith(('/drive/', '/upload/drive/')):
+        return 'drive.request'
+    if parsed.path.startswith(('/youtube/', '/upload/youtube/')) or parsed.hostname == 'youtube.googleapis.com':
+        return 'youtube.request'
+    return 'other'
+
+def acquire_credential(method, url, credential):
+    """Wait until one request fits credential's own limit for the API the URL belongs to."""
+    credential_bucket = _registry._bucket(_registry.credential_limits, endpoint_for_request(method, url), credential)
+    if credential_bucket:
+        credential_bucket.consume(1)
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""One retry policy for every outbound call: Retry-After, decorrelated jitter, circuit breakers."""
+
+import ssl
+import time
+import socket
+import random
+import threading
+import http.client
+import email.utils
+
+import httplib2
+import requests
+from googleapiclient.errors import HttpError
+
+import rate_limits
+
+# Always retry when these exceptions are raised. Only network failures: local OSErrors
+# such as a missing file or a permission error would fail the same way again.
+RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, ConnectionError, socket.timeout, socket.gaierror,
+                        ssl.SSLError, http.client.NotConnected,
+                        http.client.IncompleteRead, http.client.ImproperConnectionState,
+                        http.client.CannotSendRequest, http.client.CannotSendHeader,
+                        http.client.ResponseNotReady, http.client.BadStatusLine)
+
+# Always retry these HTTP statuses
+RETRIABLE_STATUS_CODES = [429, 500, 502, 503, 504]
+
+# Longest Retry-After honoured in one sleep; a longer wait costs an attempt instead
+MAX_RETRY_AFTER_SECONDS = 300.0
+
+# 403 reasons that are per-minute throttling rather than exhausted daily quota
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+
+class TransientError(Exception):
+    """Base class for errors callers raise to ask for a retry."""
+
+class RetryError(Exception):
+    """Retries were exhausted (or the circuit is open); last_error holds the cause."""
+
+    def __init__(self, message, last_error=None):
+        super().__init__(message)
+        self.last_error = last_error
+
+class CircuitOpenError(RetryError):
+    """The endpoint failed repeatedly and calls are paused until its cool-down ends."""
+
+class RetriableResponseError(TransientError):
+    """A requests.Response with a retriable status code."""
+
+    def __init__(self, response):
+        super().__init__(f"HTTP {response.status_code} from {response.url}")
+        self.response = response
+
+class RetryPolicy:
+    """Attempt budget plus decorrelated-jitter backoff bounds."""
+
+    def __init__(self, max_attempts=6, base_delay=1.0, max_delay=60.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def next_delay(self, previous_delay):
+        """Decorrelated jitter: sleep = min(cap, random(base, previous * 3))."""
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous_delay) * 3))
+
+# API calls (Drive listing, Sheets, thumbnails, Telegram, credential downloads)
+DEFAULT_POLICY = RetryPolicy()
+
+# Resumable upload chunks: more patience, the bytes already sent are kept
+UPLOAD_POLICY = RetryPolicy(max_attempts=11, base_delay=1.0, max_delay=120.0)
+
+# Range-resumed Drive downloads: each retry only re-fetches uncommitted bytes
+DOWNLOAD_POLICY = RetryPolicy(max_attempts=9, base_delay=1.0, max_delay=60.0)
+
+class CircuitBreaker:
+    """Stops calling an endpoint after consecutive failures, then lets one trial call through."""
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                return True  # Half-open: let a trial call decide
+            return False
+
+    def remaining(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+def get_breaker(endpoint):
+    """Return the circuit breaker for an endpoint name such as 'sheets.read'."""
+    with _breakers_lock:
+        if endpoint not in _breakers:
+            _breakers[endpoint] = CircuitBreaker()
+        return _breakers[endpoint]
+
+def parse_retry_after(value):
+    """Parse a Retry-After header (seconds or an HTTP date) into seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def http_error_reason(error):
+    """Return the first error reason (e.g. 'uploadLimitExceeded') of an HttpError."""
+    try:
+        details = error.error_details
+        if isinstance(details, list) and details:
+            return details[0].get('reason', '')
+    except AttributeError:
+        pass
+    return ''
+
+def classify(error):
+    """Return (retriable, retry_after_seconds) for an exception."""
+    if isinstance(error, HttpError):
+        status = error.resp.status
+        retry_after = parse_retry_after(error.resp.get('retry-after'))
+        if status in RETRIABLE_STATUS_CODES:
+            return True, retry_after
+        if status == 403 and http_error_reason(error) in RATE_LIMIT_REASONS:
+            return True, retry_after
+        return False, None
+    if isinstance(error, RetriableResponseError):
+        return True, parse_retry_after(error.response.headers.get('Retry-After'))
+    if isinstance(error, requests.HTTPError):
+        response = error.response
+        if response is not None and response.status_code in RETRIABLE_STATUS_CODES:
+            return True, parse_retry_after(response.headers.get('Retry-After'))
+        return False, None
+    if isinstance(error, (TransientError, requests.RequestException) + RETRIABLE_EXCEPTIONS):
+        return True, None
+    return False, None
+
+def is_rate_limited(error):
+    """True for throttling (429, or 403 rateLimitExceeded/userRateLimitExceeded) rather than a server fault."""
+    if isinstance(error, HttpError):
+        return error.resp.status == 429 or (error.resp.status == 403 and http_error_reason(error) in RATE_LIMIT_REASONS)
+    response = getattr(error, 'response', None)
+    if isinstance(error, (RetriableResponseError, requests.HTTPError)) and response is not None:
+        return response.status_code == 429
+    return False
+
+_rate_limit_listeners = []
+
+def add_rate_limit_listener(listener):
+    """Call listener(endpoint, error, retry_after) on the failing thread whenever a call is rate limited."""
+    _rate_limit_listeners.append(listener)
+
+def check_response(response):
+    """Raise RetriableResponseError for 429/5xx so call() retries plain requests calls."""
+    if response.status_code in RETRIABLE_STATUS_CODES:
+        raise RetriableResponseError(response)
+    return response
+
+def call(endpoint, fn, *args, policy=None, rate_key=None, **kwargs):
+    """Call fn(*args, **kwargs), retrying transient failures under the endpoint's circuit breaker.
+
+    Each attempt first waits for the endpoint's client-side rate limit (and
+    rate_key's, e.g. a chat id, when given). Non-retriable errors are raised
+    unchanged. When retries run out, or the circuit is open, a RetryError
+    wrapping the last error is raised.
+    """
+    policy = policy or DEFAULT_POLICY
+    breaker = get_breaker(endpoint)
+    delay = policy.base_delay
+
+    for attempt in range(1, policy.max_attempts + 1):
+        # New calls fail fast while the circuit is open; a call already retrying keeps its budget
+        if attempt == 1 and not breaker.allow():
+            raise CircuitOpenError(
+                f"{endpoint}: circuit open after repeated failures, retry in {breaker.remaining():.0f}s")
+        rate_limits.acquire(endpoint, rate_key)
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            retriable, retry_after = classify(e)
+            if not retriable:
+                # The endpoint answered, so it is healthy even if the request was bad
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if _rate_limit_listeners and is_rate_limited(e):
+                for listener in _rate_limit_listeners:
+                    listener(endpoint, e, retry_after)
+            if attempt == policy.max_attempts:
+                print(f"{endpoint}: no longer attempting to retry ({e})")
+                raise RetryError(f"{endpoint}: giving up after {attempt} attempts: {e}", e)
+            delay = min(retry_after, MAX_RETRY_AFTER_SECONDS) if retry_after is not None else policy.next_delay(delay)
+            delay = max(delay, breaker.remaining())
+            print(f"{endpoint}: retriable error ({e}). Sleeping {delay:.1f} seconds and then retrying...")
+            time.sleep(delay)
+            continue
+        breaker.record_success()
+        return result
+
+def execute(request, endpoint, policy=None):
+    """Execute a googleapiclient request through the retry policy."""
+    return call(endpoint, request.execute, policy=policy)
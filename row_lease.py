@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""Sheet row leases so several uploader processes never pick the same video."""
+
+import os
+import uuid
+import time
+import random
+import socket
+import datetime
+import threading
+
+import retry_policy
+from sheet_reader import column_letter, read_row
+
+# Claim columns added next to the upload tracking columns
+LEASE_OWNER_COLUMN = 'Lease Owner'
+LEASE_EXPIRES_COLUMN = 'Lease Expires'
+LEASE_COLUMNS = [LEASE_OWNER_COLUMN, LEASE_EXPIRES_COLUMN]
+
+# A lease outlives one download + upload; a dead runner's lease lapses after this
+DEFAULT_LEASE_SECONDS = 60 * 60
+
+# A held lease is pushed forward after this fraction of it, so a few failed renewals still leave time
+RENEW_FRACTION = 0.25
+
+# Time between writing a claim and reading it back. It must be longer than the
+# gap between another runner's read and its write, which is one API round trip.
+DEFAULT_SETTLE_SECONDS = 3.0
+
+EXPIRES_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+_runner_id = None
+
+def get_runner_id():
+    """Return a stable ID for this process, e.g. 'gh-123456.1:runner-host:4242:9f2c1a7e'."""
+    global _runner_id
+    if _runner_id is None:
+        parts = []
+        if os.environ.get('GITHUB_RUN_ID'):
+            parts.append(f"gh-{os.environ['GITHUB_RUN_ID']}.{os.environ.get('GITHUB_RUN_ATTEMPT', '1')}")
+        parts.extend([socket.gethostname(), str(os.getpid()), uuid.uuid4().hex[:8]])
+        _runner_id = os.environ.get('UPLOADER_RUNNER_ID') or ':'.join(parts)
+    return _runner_id
+
+def format_expiry(timestamp):
+    return datetime.datetime.utcfromtimestamp(timestamp).strftime(EXPIRES_FORMAT)
+
+def parse_expiry(value):
+    """Parse a Lease Expires cell, treating blank or garbage as already expired."""
+    try:
+        return datetime.datetime.strptime(value, EXPIRES_FORMAT).replace(
+            tzinfo=datetime.timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+def _write_lease(sheets_service, spreadsheet_id, row_index, headers, owner, expires):
+    sheet_row = row_index + 2
+    owner_col = column_letter(headers.index(LEASE_OWNER_COLUMN))
+    expires_col = column_letter(headers.index(LEASE_EXPIRES_COLUMN))
+    body = {
+        'valueInputOption': 'RAW',
+        'data': [
+            {'range': f'Sheet1!{owner_col}{sheet_row}', 'values': [[owner]]},
+            {'range': f'Sheet1!{expires_col}{sheet_row}', 'values': [[expires]]}
+        ]
+    }
+    retry_policy.execute(sheets_service.spreadsheets().values().batchUpdate(
+        spreadsheetId=spreadsheet_id,
+        body=body
+    ), 'sheets.write')
+
+def is_claimable(row_dict, runner_id, folder_id=None, now=None):
+    """Check whether a row is free for this runner (not uploaded, not leased by someone else)."""
+    now = now or time.time()
+    if folder_id is not None and row_dict.get('Folder ID', '') != folder_id:
+        return False  # The sheet was re-sorted and this row now holds another folder
+    if row_dict.get('Upload Status', '') == 'Yes':
+        return False
+    owner = row_dict.get(LEASE_OWNER_COLUMN, '')
+    if owner and owner != runner_id and parse_expiry(row_dict.get(LEASE_EXPIRES_COLUMN, '')) > now:
+        return False
+    return True
+
+def try_claim(sheets_service, spreadsheet_id, row_index, headers, folder_id=None,
+              runner_id=None, lease_seconds=DEFAULT_LEASE_SECONDS, settle_seconds=DEFAULT_SETTLE_SECONDS):
+    """Claim a row with read-verify-write. Returns True only if this runner owns the lease.
+
+    1. Read the row and give up if it is uploaded or leased by a live runner.
+    2. Write our runner ID and expiry into the claim columns.
+    3. Wait for competing writes to land, read the row again and keep the
+       lease only if our runner ID survived (last writer wins).
+    """
+    if LEASE_OWNER_COLUMN not in headers or LEASE_EXPIRES_COLUMN not in headers:
+        print("Warning: Lease columns not found in spreadsheet, uploading without a row lease.")
+        return True
+
+    runner_id = runner_id or get_runner_id()
+
+    row = read_row(sheets_service, spreadsheet_id, row_index, headers)
+    if not is_claimable(row, runner_id, folder_id):
+        return False
+
+    _write_lease(sheets_service, spreadsheet_id, row_index, headers,
+                 runner_id, format_expiry(time.time() + lease_seconds))
+
+    # Jitter keeps two runners that claimed together from re-reading in lockstep
+    time.sleep(settle_seconds + random.random() * settle_seconds / 2)
+
+    row = read_row(sheets_service, spreadsheet_id, row_index, headers)
+    if row.get(LEASE_OWNER_COLUMN, '') != runner_id or row.get('Upload Status', '') == 'Yes':
+        return False
+    if folder_id is not None and row.get('Folder ID', '') != folder_id:
+        return False
+    return True
+
+def renew(sheets_service, spreadsheet_id, row_index, headers, runner_id=None,
+          lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Push our lease expiry forward during a long transfer. Returns False if we lost the lease."""
+    if LEASE_OWNER_COLUMN not in headers or LEASE_EXPIRES_COLUMN not in headers:
+        return True
+    runner_id = runner_id or get_runner_id()
+    row = read_row(sheets_service, spreadsheet_id, row_index, headers)
+    if row.get(LEASE_OWNER_COLUMN, '') != runner_id:
+        return False
+    _write_lease(sheets_service, spreadsheet_id, row_index, headers,
+                 runner_id, format_expiry(time.time() + lease_seconds))
+    return True
+
+class LeaseRenewer:
+    """Renews a row lease from a background thread while the row's transfer runs.
+
+    Use as a context manager around the download and upload. The thread needs
+    its own sheets_service, since httplib2 connections are not thread-safe.
+    """
+
+    def __init__(self, sheets_service, spreadsheet_id, row_index, headers, runner_id=None,
+                 lease_seconds=DEFAULT_LEASE_SECONDS, interval=None):
+        self.args = (sheets_service, spreadsheet_id, row_index, headers, runner_id or get_runner_id(), lease_seconds)
+        self.row_index = row_index
+        self.interval = interval or lease_seconds * RENEW_FRACTION
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='lease-renewer', daemon=True)
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            try:
+                if not renew(*self.args):
+                    print(f"Warning: Lost the lease on row {self.row_index+2} during the transfer.")
+                    return
+            except Exception as e:
+                # The next attempt comes well before the lease runs out
+                print(f"Warning: Could not renew lease on row {self.row_index+2}: {e}")
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stopped.set()
+        self.thread.join()
+
+def release(sheets_service, spreadsheet_id, row_index, headers, runner_id=None):
+    """Clear our lease on a row. Leases held by other runners are left alone."""
+    if LEASE_OWNER_COLUMN not in headers or LEASE_EXPIRES_COLUMN not in headers:
+        return False
+    runner_id = runner_id or get_runner_id()
+    try:
+        row = read_row(sheets_service, spreadsheet_id, row_index, headers)
+        if row.get(LEASE_OWNER_COLUMN, '') != runner_id:
+            return False
+        _write_lease(sheets_service, spreadsheet_id, row_index, headers, '', '')
+        return True
+    except Exception as e:
+        # An unreleased lease simply expires, so this is never fatal
+        print(f"Warning: Could not release lease on row {row_index+2}: {e}")
+        return False
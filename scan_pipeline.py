@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Scan Drive for new video folders and feed them to the uploader as they are found.
+
+iter_new_folders() pages through the GeminiStories subfolders and yields each
+folder not in the sheet yet, with its listing and video facts, a batch at a
+time, so the first one arrives after one page of subfolders and one batched
+listing. SheetAppender adds those rows to the sheet from a background thread
+with values.append. Existing rows never move (the standalone scanner re-sorts
+the sheet, which would invalidate the row numbers leases use), and each folder
+gets a future that resolves to its row once the append has landed.
+"""
+
+import re
+import queue
+import datetime
+import threading
+from concurrent.futures import Future
+
+import retry_policy
+import folder_facts
+import folder_metadata
+
+FOLDER_MIME_TYPE = 'application/vnd.google-apps.folder'
+
+# Columns A-H, as gd/google_drive_sheet_integration.py writes them (needed in an empty sheet)
+BASIC_COLUMNS = ['Folder ID', 'Subfolder Name', 'Parent Folder', 'Last Modified', 'File Count',
+                 'File Names', 'File Types', 'File IDs']
+
+# Subfolders listed, then listed and preflighted, per step of the scan
+SUBFOLDER_PAGE_SIZE = 100
+SCAN_BATCH_SIZE = 8
+
+# How long the appender waits to gather more rows into one append call
+APPEND_GATHER_SECONDS = 1.0
+
+UPDATED_RANGE = re.compile(r'![A-Z]+(\d+)')
+
+def find_folder(drive_service, folder_name):
+    """Return the ID of the Drive folder named folder_name, or None."""
+    result = retry_policy.execute(drive_service.files().list(
+        q=f"name='{folder_name}' and mimeType='{FOLDER_MIME_TYPE}' and trashed=false",
+        spaces='drive',
+        fields='files(id, name)'
+    ), 'drive.files.list')
+    items = result.get('files', [])
+    return items[0]['id'] if items else None
+
+def iter_subfolders(drive_service, parent_id):
+    """Yield the parent's subfolders page by page, newest first."""
+    page_token = None
+    while True:
+        result = retry_policy.execute(drive_service.files().list(
+            q=f"'{parent_id}' in parents and mimeType='{FOLDER_MIME_TYPE}' and trashed=false",
+            spaces='drive',
+            orderBy='createdTime desc',
+            pageSize=SUBFOLDER_PAGE_SIZE,
+            pageToken=page_token,
+            fields='nextPageToken, files(id, name, modifiedTime)'
+        ), 'drive.files.list')
+        yield from result.get('files', [])
+        page_token = result.get('nextPageToken')
+        if not page_token:
+            return
+
+def iter_new_folders(drive_service, session, parent_id, known_folder_ids):
+    """Yield {'id', 'name', 'modified_time', 'files', 'facts'} for subfolders not in known_folder_ids.
+
+    Listings are also left in folder_metadata so the upload does not list the
+    folder again.
+    """
+    known = {str(folder_id).strip() for folder_id in known_folder_ids}
+    batch = []
+
+    def flush():
+        listings = folder_metadata.list_folders(drive_service, [folder['id'] for folder in batch])
+        files_by_folder = {folder_id: [f for f in files if f.get('mimeType') != FOLDER_MIME_TYPE]
+                           for folder_id, files in listings.items()}
+        facts_by_folder = folder_facts.compute_many(session, files_by_folder)
+        for folder in batch:
+            files = files_by_folder.get(folder['id'], [])
+            folder_metadata.remember_files(folder['id'], files)
+            yield {'id': folder['id'], 'name': folder['name'], 'modified_time': folder.get('modifiedTime', ''),
+                   'files': files, 'facts': facts_by_folder.get(folder['id'], {})}
+        batch.clear()
+
+    for folder in iter_subfolders(drive_service, parent_id):
+        if str(folder['id']).strip() in known:
+            continue
+        known.add(str(folder['id']).strip())
+        batch.append(folder)
+        if len(batch) >= SCAN_BATCH_SIZE:
+            yield from flush()
+    if batch:
+        yield from flush()
+
+def folder_row(headers, folder, parent_name):
+    """The sheet row for a newly found folder, laid out by headers."""
+    modified_time = folder.get('modified_time', '')
+    try:
+        modified_time = datetime.datetime.fromisoformat(modified_time.replace('Z', '+00:00')).strftime('%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        pass
+    files = folder.get('files', [])
+    values = {
+        'Folder ID': folder['id'],
+        'Subfolder Name': folder.get('name', ''),
+        'Parent Folder': parent_name,
+        'Last Modified': modified_time,
+        'File Count': len(files),
+        'File Names': ", ".join(f['name'] for f in files),
+        'File Types': ", ".join(f['mimeType'] for f in files),
+        'File IDs': ", ".join(f['id'] for f in files)
+    }
+    values.update(folder.get('facts', {}))
+    return [values.get(header, '') for header in headers]
+
+class SheetAppender:
+    """Appends folder rows to the sheet from a background thread, a few at a time."""
+
+    def __init__(self, sheets_service, spreadsheet_id, headers, parent_name):
+        self.sheets_service = sheets_service
+        self.spreadsheet_id = spreadsheet_id
+        self.headers = headers
+        self.parent_name = parent_name
+        self.pending = queue.Queue()
+        self.appended = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def add(self, folder):
+        """Queue a folder's row; the returned future resolves to its 0-based data row index."""
+        future = Future()
+        self.pending.put((folder_row(self.headers, folder, self.parent_name), future))
+        return future
+
+    def close(self):
+        """Append whatever is queued and wait for the thread to finish."""
+        self.pending.put(None)
+        self.thread.join()
+
+    def _append(self, items):
+        rows = [row for row, _ in items]
+        try:
+            response = retry_policy.execute(self.sheets_service.spreadsheets().values().append(
+                spreadsheetId=self.spreadsheet_id,
+                range='Sheet1!A1',
+                valueInputOption='RAW',
+                insertDataOption='INSERT_ROWS',
+                body={'values': rows}
+            ), 'sheets.write')
+            match = UPDATED_RANGE.search(response.get('updates', {}).get('updatedRange', ''))
+            if not match:
+                raise ValueError(f"Unexpected append response: {response}")
+            first_row = int(match.group(1)) - 2  # Sheet rows are 1-based and start after the header
+        except Exception as e:
+            print(f"Error appending {len(rows)} row(s) to the spreadsheet: {e}")
+            for _, future in items:
+                future.set_exception(e)
+            return
+        self.appended += len(rows)
+        print(f"Added {len(rows)} new folder(s) to the spreadsheet")
+        for offset, (_, future) in enumerate(items):
+            future.set_result(first_row + offset)
+
+    def _run(self):
+        closing = False
+        while not closing:
+            item = self.pending.get()
+            if item is None:
+                break
+            items = [item]
+            # Gather what the scanner yields meanwhile into the same call
+            while True:
+                try:
+                    item = self.pending.get(timeout=APPEND_GATHER_SECONDS)
+                except queue.Empty:
+                    break
+                if item is None:
+                    closing = True
+                    break
+                items.append(item)
+            self._append(items)
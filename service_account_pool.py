@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""Spread Drive and Sheets traffic over several service accounts.
+
+PooledCredentials stands in for a single service account's credentials. Each
+request (googleapiclient call, batch or AuthorizedSession download) picks an
+account, round-robin or least-loaded over the last minute, and carries that
+account's token. When a call is rate limited (429, or 403 rateLimitExceeded /
+userRateLimitExceeded), retry_policy tells the pool and the account that served
+it sits out for a while, so the retry goes out under another account. Each
+account's requests are also paced to its own per-user limits (rate_limits).
+
+Every account must have access to the Drive folder and the spreadsheet.
+"""
+
+import os
+import glob
+import time
+import threading
+import collections
+
+from google.auth import credentials as google_credentials
+from google.oauth2 import service_account
+
+import retry_policy
+import rate_limits
+
+STRATEGIES = ('round-robin', 'least-loaded')
+
+# Extra key files: SERVICE_ACCOUNT_FILES (comma-separated) or every *.json in this directory
+SERVICE_ACCOUNT_FILES_ENV = 'SERVICE_ACCOUNT_FILES'
+SERVICE_ACCOUNT_STRATEGY_ENV = 'SERVICE_ACCOUNT_STRATEGY'
+SERVICE_ACCOUNT_DIR = os.path.join('gd', 'service_accounts')
+
+# How long a rate-limited account is left out when the response has no Retry-After
+BENCH_SECONDS = 60.0
+
+# A server's Retry-After benches an account no longer than retry_policy would wait on it
+MAX_BENCH_SECONDS = retry_policy.MAX_RETRY_AFTER_SECONDS
+
+# Window over which least-loaded counts each account's requests
+LOAD_WINDOW_SECONDS = 60.0
+
+# Only these APIs are called with pooled credentials; YouTube and Telegram limits say nothing about them
+POOLED_ENDPOINTS = ('drive.', 'sheets.')
+
+class _Account:
+    def __init__(self, credentials):
+        self.credentials = credentials
+        self.name = getattr(credentials, 'service_account_email', None) or f"account-{id(credentials)}"
+        self.lock = threading.Lock()
+        self.benched_until = 0.0
+        self.recent = collections.deque()
+
+    def load(self, now):
+        while self.recent and self.recent[0] < now - LOAD_WINDOW_SECONDS:
+            self.recent.popleft()
+        return len(self.recent)
+
+class PooledCredentials(google_credentials.Credentials):
+    """Credentials that sign each request with one of several service accounts."""
+
+    def __init__(self, accounts, strategy='round-robin'):
+        super().__init__()
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown service account strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+        self.accounts = [_Account(credentials) for credentials in accounts]
+        self.strategy = strategy
+        self._lock = threading.Lock()
+        self._next = 0
+        self._local = threading.local()
+
+    @property
+    def valid(self):
+        # Each account refreshes itself in before_request
+        return True
+
+    @property
+    def expired(self):
+        return False
+
+    def _pick(self):
+        now = time.monotonic()
+        with self._lock:
+            available = [account for account in self.accounts if account.benched_until <= now]
+            if not available:
+                # Everyone is benched: use whoever comes back first rather than block
+                account = min(self.accounts, key=lambda a: a.benched_until)
+            elif self.strategy == 'least-loaded':
+                account = min(available, key=lambda a: a.load(now))
+            else:
+                while True:
+                    account = self.accounts[self._next % len(self.accounts)]
+                    self._next += 1
+                    if account in available:
+                        break
+            account.recent.append(now)
+            return account
+
+    def before_request(self, request, method, url, headers):
+        account = self._pick()
+        self._local.account = account
+        _current.pool = self
+        rate_limits.acquire_credential(method, url, account.name)
+        with account.lock:
+            account.credentials.before_request(request, method, url, headers)
+
+    def refresh(self, request):
+        # Called after a 401: refresh the account that just answered
+        account = getattr(self._local, 'account', None) or self.accounts[0]
+        with account.lock:
+            account.credentials.refresh(request)
+
+    def apply(self, headers, token=None):
+        account = getattr(self._local, 'account', None) or self.accounts[0]
+        account.credentials.apply(headers, token)
+
+    def bench_current(self, seconds=None):
+        """Leave out the account that served this thread's last request for a while."""
+        account = getattr(self._local, 'account', None)
+        if account is None:
+            return
+        seconds = BENCH_SECONDS if seconds is None else min(seconds, MAX_BENCH_SECONDS)
+        with self._lock:
+            account.benched_until = max(account.benched_until, time.monotonic() + seconds)
+        print(f"Service account {account.name} is rate limited, benched for {seconds:.0f}s")
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+# The pool that signed this thread's last request
+_current = threading.local()
+_extra_files = None
+_strategy = None
+
+def configure(extra_files=None, strategy=None):
+    """Set the extra key files and the strategy (otherwise taken from the environment)."""
+    global _extra_files, _strategy
+    if strategy is not None and strategy not in STRATEGIES:
+        raise ValueError(f"Unknown service account strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+    _extra_files = list(extra_files) if extra_files else None
+    _strategy = strategy
+    with _pools_lock:
+        _pools.clear()
+
+def extra_account_files():
+    if _extra_files is not None:
+        return _extra_files
+    listed = os.environ.get(SERVICE_ACCOUNT_FILES_ENV, '')
+    if listed.strip():
+        return [path.strip() for path in listed.split(',') if path.strip()]
+    return sorted(glob.glob(os.path.join(SERVICE_ACCOUNT_DIR, '*.json')))
+
+def pooled(primary, scopes):
+    """Return credentials that spread requests over primary and the extra accounts.
+
+    A lone account is still wrapped so its requests are paced to the per-user
+    limits. The pool is built once per process, so round-robin position and
+    benched accounts carry over between calls.
+    """
+    files = extra_account_files()
+    key = (getattr(primary, 'service_account_email', None), tuple(files), tuple(scopes))
+    with _pools_lock:
+        if key not in _pools:
+            accounts = [primary]
+            seen = {getattr(primary, 'service_account_email', None)}
+            for path in files:
+                try:
+                    credentials = service_account.Credentials.from_service_account_file(path, scopes=scopes)
+                except (OSError, ValueError) as e:
+                    print(f"Warning: Skipping service account file {path}: {e}")
+                    continue
+                if credentials.service_account_email in seen:
+                    continue
+                seen.add(credentials.service_account_email)
+                accounts.append(credentials)
+            strategy = _strategy or os.environ.get(SERVICE_ACCOUNT_STRATEGY_ENV) or 'round-robin'
+            _pools[key] = PooledCredentials(accounts, strategy)
+            if len(accounts) > 1:
+                print(f"Spreading Drive and Sheets requests over {len(accounts)} service accounts ({strategy})")
+        return _pools[key]
+
+def _on_rate_limited(endpoint, error, retry_after):
+    if not endpoint.startswith(POOLED_ENDPOINTS):
+        return
+    pool = getattr(_current, 'pool', None)
+    if pool is not None and len(pool.accounts) > 1:
+        pool.bench_current(retry_after)
+
+retry_policy.add_rate_limit_listener(_on_rate_limited)
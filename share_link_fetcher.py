@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""Shared fetcher for Google Drive share-link downloads (credentials, tokens, mappings).
+
+One pooled requests.Session with connect/read timeouts streams bodies to disk.
+Each file is cached under .videopost/share_links together with its ETag and
+Last-Modified, so later runs send a conditional request and usually get a 304.
+The cached files are credentials: they are readable by the owner only, and
+the workflow's cleanup step deletes the cache directory.
+"""
+
+import os
+import re
+import shutil
+import tempfile
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import retry_policy
+import state_file
+
+CACHE_DIR = os.path.join(state_file.STATE_DIR, 'share_links')
+DOWNLOAD_URL = 'https://drive.google.com/uc?export=download&id={file_id}'
+
+CONNECT_TIMEOUT = 10
+READ_TIMEOUT = 60
+STREAM_BLOCK_SIZE = 64 * 1024
+
+# Drive's "can't scan this file for viruses" page is small; never read more than this of it
+MAX_WARNING_PAGE_BYTES = 256 * 1024
+
+_session = None
+_session_lock = threading.Lock()
+
+# Files already validated during this process; later calls skip the network entirely
+_fresh_paths = {}
+
+def get_session():
+    """Return the process-wide pooled session."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+        return _session
+
+def file_id_from_link(link):
+    """Extract the file ID from a share link ('.../file/d/<id>/view', '...?id=<id>') or a bare ID."""
+    match = re.search(r'/d/([^/?#]+)', link) or re.search(r'[?&]id=([^&#]+)', link)
+    return match.group(1) if match else link.strip()
+
+def _cache_paths(file_id):
+    body_path = os.path.join(CACHE_DIR, file_id)
+    return body_path, body_path + '.meta.json'
+
+def _confirm_url(response, page):
+    """Find the 'download anyway' URL on Drive's virus-scan warning page."""
+    for name, value in response.cookies.items():
+        if name.startswith('download_warning'):
+            return f"{response.url}&confirm={value}"
+    form = re.search(r'<form[^>]+action="([^"]+)"', page)
+    if form:
+        inputs = dict(re.findall(r'<input[^>]+name="([^"]+)"[^>]+value="([^"]*)"', page))
+        query = '&'.join(f"{k}={v}" for k, v in inputs.items())
+        return f"{form.group(1).replace('&amp;', '&')}?{query}" if query else form.group(1)
+    token = re.search(r'confirm=([0-9A-Za-z_-]+)', page)
+    if token:
+        return f"{response.url}&confirm={token.group(1)}"
+    return None
+
+def _is_warning_page(response):
+    return ('Content-Disposition' not in response.headers
+            and response.headers.get('Content-Type', '').startswith('text/html'))
+
+def _stream_to(response, dest_path):
+    """Stream a response body into dest_path atomically."""
+    os.makedirs(os.path.dirname(dest_path) or '.', exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(dest_path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for block in response.iter_content(chunk_size=STREAM_BLOCK_SIZE):
+                if block:
+                    f.write(block)
+        os.chmod(tmp_path, 0o600)  # These files are credentials
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _get(url, headers=None):
+    response = get_session().get(url, headers=headers or {}, stream=True,
+                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    try:
+        return retry_policy.check_response(response)
+    except retry_policy.RetriableResponseError:
+        response.close()
+        raise
+
+def _fetch_once(file_id, body_path, meta_path):
+    """One attempt: conditional GET, follow the warning page if needed, stream to the cache."""
+    meta = state_file.load(meta_path, {}) if os.path.exists(body_path) else {}
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    response = _get(DOWNLOAD_URL.format(file_id=file_id), headers)
+    with response:
+        if response.status_code == 304:
+            return 'not modified'
+        if response.status_code != 200:
+            raise requests.HTTPError(f"HTTP {response.status_code} downloading {file_id}", response=response)
+
+        if _is_warning_page(response):
+            page = response.raw.read(MAX_WARNING_PAGE_BYTES, decode_content=True).decode('utf-8', 'replace')
+            confirm_url = _confirm_url(response, page)
+            if not confirm_url:
+                raise requests.HTTPError(f"Could not find the download confirmation for {file_id}",
+                                         response=response)
+            response = _get(confirm_url)
+
+        with response:
+            # A Drive error page or a second warning page must never replace the cached file
+            if response.status_code != 200 or response.headers.get('Content-Type', '').startswith('text/html'):
+                raise requests.HTTPError(f"HTTP {response.status_code} ({response.headers.get('Content-Type', '')}) "
+                                         f"instead of the file downloading {file_id}", response=response)
+            _stream_to(response, body_path)
+            state_file.save(meta_path, {'etag': response.headers.get('ETag'),
+                                        'last_modified': response.headers.get('Last-Modified')})
+    return 'downloaded'
+
+def fetch(link, dest_path=None):
+    """Return a local path holding the share-link file, downloading only if it changed.
+
+    If dest_path is given the cached file is also copied there. Raises on failure.
+    """
+    file_id = file_id_from_link(link)
+    body_path, meta_path = _cache_paths(file_id)
+    os.makedirs(CACHE_DIR, exist_ok=True)
+
+    if file_id not in _fresh_paths:
+        result = retry_policy.call('drive.share_link', _fetch_once, file_id, body_path, meta_path)
+        if result == 'not modified':
+            print(f"Share-link file {file_id} unchanged, using cached copy.")
+        _fresh_paths[file_id] = body_path
+
+    if dest_path:
+        shutil.copyfile(body_path, dest_path)
+        return dest_path
+    return body_path
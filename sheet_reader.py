@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""Paged, column-projected reads of the upload spreadsheet.
+
+The sheet's real size comes from spreadsheets.get, so no row or column is
+cut off by a fixed range like A2:Z1000. Rows are read in pages with
+values.batchGet, fetching only the columns a command asks for, and kept as
+tuples. Iterating yields RowView objects that answer .get() like the row
+dicts they replace.
+"""
+
+import retry_policy
+
+SHEET_TITLE = 'Sheet1'
+
+# Data rows fetched per values.batchGet call
+PAGE_ROWS = 2000
+
+def column_letter(index):
+    """Convert a 0-based column index to A1 letters (0 -> A, 25 -> Z, 26 -> AA)."""
+    letters = ''
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+class RowView:
+    """Dict-like read-only view of one row of a SheetRows table."""
+
+    __slots__ = ('_table', '_values')
+
+    def __init__(self, table, values):
+        self._table = table
+        self._values = values
+
+    def get(self, name, default=None):
+        position = self._table.positions.get(name)
+        if position is None:
+            return default
+        return self._values[position] if position < len(self._values) else ''
+
+    def __getitem__(self, name):
+        if name not in self._table.positions:
+            raise KeyError(name)
+        return self.get(name)
+
+    def __contains__(self, name):
+        return name in self._table.positions
+
+    def to_dict(self):
+        return {name: self.get(name) for name in self._table.columns}
+
+class SheetRows:
+    """Rows of the selected columns. headers is the sheet's full header row, in sheet order."""
+
+    def __init__(self, headers, columns, rows):
+        self.headers = headers
+        self.columns = columns
+        self.positions = {name: i for i, name in enumerate(columns)}
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        return RowView(self, self.rows[index])
+
+    def __iter__(self):
+        for values in self.rows:
+            yield RowView(self, values)
+
+    def to_json(self):
+        return {'headers': self.headers, 'columns': self.columns, 'rows': [list(r) for r in self.rows]}
+
+    @classmethod
+    def from_json(cls, data):
+        return cls(data['headers'], data['columns'], [tuple(r) for r in data['rows']])
+
+def get_dimensions(sheets_service, spreadsheet_id, sheet_title=SHEET_TITLE):
+    """Return (row_count, column_count) of a sheet's grid."""
+    result = retry_policy.execute(sheets_service.spreadsheets().get(
+        spreadsheetId=spreadsheet_id,
+        fields='sheets.properties(title,gridProperties(rowCount,columnCount))'
+    ), 'sheets.read')
+    for sheet in result.get('sheets', []):
+        properties = sheet.get('properties', {})
+        if properties.get('title') == sheet_title:
+            grid = properties.get('gridProperties', {})
+            return grid.get('rowCount', 0), grid.get('columnCount', 0)
+    raise ValueError(f"Sheet '{sheet_title}' not found in spreadsheet {spreadsheet_id}")
+
+def read_headers(sheets_service, spreadsheet_id, sheet_title=SHEET_TITLE):
+    result = retry_policy.execute(sheets_service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'{sheet_title}!1:1'
+    ), 'sheets.read')
+    return result.get('values', [[]])[0]
+
+def read_row(sheets_service, spreadsheet_id, row_index, headers, sheet_title=SHEET_TITLE):
+    """Read a single data row (0-based, header excluded) as a dict keyed by headers."""
+    sheet_row = row_index + 2  # +2 because row_index is 0-based and we skip header
+    result = retry_policy.execute(sheets_service.spreadsheets().values().get(
+        spreadsheetId=spreadsheet_id,
+        range=f'{sheet_title}!{sheet_row}:{sheet_row}'
+    ), 'sheets.read')
+    values = result.get('values', [[]])
+    row = values[0] if values else []
+    row_padded = row + [''] * (len(headers) - len(row))
+    return {headers[i]: row_padded[i] for i in range(len(headers))}
+
+def _column_spans(indices):
+    """Group sorted column indices into contiguous (first, last) spans."""
+    spans = []
+    for index in indices:
+        if spans and index == spans[-1][1] + 1:
+            spans[-1][1] = index
+        else:
+            spans.append([index, index])
+    return spans
+
+def read_columns(sheets_service, spreadsheet_id, columns=None, sheet_title=SHEET_TITLE, page_rows=PAGE_ROWS):
+    """Read the named columns (all columns if None) of every data row. Returns SheetRows.
+
+    Requested columns missing from the sheet read as ''. Interior blank rows are
+    kept so row positions match sheet rows (position 0 is sheet row 2).
+    """
+    headers = read_headers(sheets_service, spreadsheet_id, sheet_title)
+    row_count, _ = get_dimensions(sheets_service, spreadsheet_id, sheet_title)
+    columns = list(headers) if columns is None else list(columns)
+
+    # Duplicate header names resolve to the last one, as the row dicts did
+    header_index = {name: i for i, name in enumerate(headers)}
+    targets = {}
+    for position, name in enumerate(columns):
+        if name in header_index:
+            targets.setdefault(header_index[name], []).append(position)
+    spans = _column_spans(sorted(targets))
+
+    rows = []
+    pending_blank_rows = 0
+    blank = ('',) * len(columns)
+    for first_row in range(2, row_count + 1, page_rows) if spans else []:
+        last_row = min(row_count, first_row + page_rows - 1)
+        ranges = [f"{sheet_title}!{column_letter(a)}{first_row}:{column_letter(b)}{last_row}" for a, b in spans]
+        result = retry_policy.execute(sheets_service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=ranges,
+            majorDimension='ROWS'
+        ), 'sheets.read')
+
+        page = []
+        for (first_column, _), value_range in zip(spans, result.get('valueRanges', [])):
+            for r, values in enumerate(value_range.get('values', [])):
+                while len(page) <= r:
+                    page.append([''] * len(columns))
+                for offset, value in enumerate(values):
+                    for position in targets.get(first_column + offset, ()):
+                        page[r][position] = value
+
+        if page:
+            rows.extend([blank] * pending_blank_rows)
+            rows.extend(tuple(row) for row in page)
+            pending_blank_rows = 0
+        # Trailing blank rows of this page only count if a later page has data
+        pending_blank_rows += (last_row - first_row + 1) - len(page)
+
+    return SheetRows(headers, columns, rows)
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Local snapshot of the upload spreadsheet, refetched only when Drive reports a new revision.
+
+A files.get for the spreadsheet's version and modifiedTime costs one small
+Drive call. The full Sheets read runs only when either has changed since the
+snapshot was taken. Each column projection keeps its own snapshot. Rows read from a snapshot may lag a concurrent writer by
+one revision, so anything that writes a row re-reads it first (row leases do).
+"""
+
+import os
+import time
+import hashlib
+
+import retry_policy
+import state_file
+
+CACHE_DIR = os.path.join(state_file.STATE_DIR, 'sheet_snapshots')
+
+def _snapshot_path(spreadsheet_id, variant):
+    name = spreadsheet_id
+    if variant:
+        name += '-' + hashlib.sha1(variant.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(CACHE_DIR, f"{name}.json")
+
+def drive_revision(drive_service, spreadsheet_id):
+    """Return (version, modifiedTime) of the spreadsheet file."""
+    result = retry_policy.execute(drive_service.files().get(
+        fileId=spreadsheet_id,
+        fields='version, modifiedTime'
+    ), 'drive.files.get')
+    return result.get('version'), result.get('modifiedTime')
+
+def load(drive_service, spreadsheet_id, fetch, variant=''):
+    """Return the JSON payload of fetch(), calling it only if the sheet changed.
+
+    variant names what fetch() reads (e.g. its columns) so different reads
+    never answer for each other.
+    """
+    path = _snapshot_path(spreadsheet_id, variant)
+    try:
+        version, modified_time = drive_revision(drive_service, spreadsheet_id)
+    except Exception as e:
+        print(f"Warning: Could not check the spreadsheet revision, reading it in full: {e}")
+        version = modified_time = None
+
+    snapshot = state_file.load(path, None)
+    if (snapshot and version is not None and snapshot.get('version') == version
+            and snapshot.get('modified_time') == modified_time):
+        print(f"Spreadsheet unchanged since {snapshot['modified_time']} (version {version}), using snapshot.")
+        return snapshot['payload']
+
+    payload = fetch()
+    if version is not None:
+        state_file.save(path, {
+            'version': version,
+            'modified_time': modified_time,
+            'fetched_at': time.time(),
+            'payload': payload
+        }, ensure_ascii=False)
+    return payload
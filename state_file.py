@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""Locked, atomically written JSON files under .videopost, shared by every uploader process of a run."""
+
+import os
+import json
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl  # POSIX file locking (GitHub runners are Linux)
+except ImportError:
+    fcntl = None
+
+# Local state directory shared by the uploader helpers
+STATE_DIR = '.videopost'
+
+_RAISE = object()
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive lock on path (via path.lock) while reading and rewriting it."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.lock', 'w') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def load(path, default=_RAISE):
+    """Read a JSON file; a missing or unreadable file returns default if one is given."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        if default is _RAISE:
+            raise
+        return default
+
+def save(path, data, **dump_kwargs):
+    """Write data atomically so a killed process never leaves a half-written file.
+
+    Like any mkstemp file, the result is readable and writable by the owner only.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, **dump_kwargs)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""Discrete-event simulator of the daily upload workflow, for sizing counts and concurrency.
+
+Replays .github/workflows/daily_youtube_upload.yml: job setup, the Drive scan,
+planning, then per channel one `--from-plan --limit 1` process per video with
+`--upload-history`, the uploadLimitExceeded and three-consecutive-failures
+breaks, and the job timeout. --sleep/--channel-sleep model pacing sleeps
+(120 s / 30 s before burst mode removed them). Each video goes through
+the same steps as process_planned_videos (claim, Drive listing and preflight,
+download, chunked videos.insert, thumbnail, sheet update, release).
+
+Latencies, sizes and throughputs come from a profile of distributions (see
+DEFAULT_PROFILE; override any entry with --profile). Many runs are simulated and
+the report gives completion time percentiles, timeout risk and quota use.
+
+    python tools/capacity_sim.py --counts "MagicMap Tales:8,KidVenture Quest:9,Tiny Trailblazers:7"
+    python tools/capacity_sim.py --concurrency 3 --trials 2000
+"""
+
+import os
+import sys
+import json
+import math
+import heapq
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upload_plan import parse_channel_counts
+
+CHANNEL_NAMES = ["MagicMap Tales", "KidVenture Quest", "Tiny Trailblazers"]
+
+# YouTube Data API costs (units) and the default daily quota of one Cloud project
+INSERT_COST = 1600
+THUMBNAIL_COST = 50
+DEFAULT_DAILY_QUOTA = 10000
+
+Z90 = 1.2816  # Standard normal 90th percentile
+
+# A distribution is a number, {"p10": a, "p90": b} (lognormal) or {"samples": [...]} (resampled)
+DEFAULT_PROFILE = {
+    'job_setup_seconds': {'p10': 40, 'p90': 120},       # checkout, setup-python, pip install
+    'scan_seconds': {'p10': 60, 'p90': 300},            # gd/google_drive_sheet_integration.py
+    'process_start_seconds': {'p10': 2, 'p90': 6},      # interpreter, imports, credentials
+    'api_seconds': {'p10': 0.15, 'p90': 1.0},           # one Sheets/Drive/YouTube round trip
+    'video_mb': {'p10': 15, 'p90': 120},
+    'download_mb_per_second': {'p10': 10, 'p90': 60},
+    'upload_mb_per_second': {'p10': 3, 'p90': 20},
+    'upload_chunk_mb': 1,                               # MediaIoBaseUpload chunksize
+    'claim_settle_seconds': {'p10': 3.0, 'p90': 4.5},   # row_lease settle plus jitter
+    'failure_probability': 0.03,                        # transient upload failure after insert
+    'channel_upload_limit': None                        # uploads before uploadLimitExceeded
+}
+
+def sample(spec, rng):
+    """Draw one value from a profile distribution."""
+    if spec is None or isinstance(spec, (int, float)):
+        return spec
+    if 'samples' in spec:
+        return rng.choice(spec['samples'])
+    low, high = spec['p10'], spec['p90']
+    median = math.sqrt(low * high)
+    sigma = math.log(high / low) / (2 * Z90)
+    return median * math.exp(sigma * rng.gauss(0, 1))
+
+class Simulation:
+    """Minimal event loop: processes are generators that yield how long they wait."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.queue = []
+        self.sequence = 0
+
+    def start(self, process):
+        self._schedule(0.0, process)
+
+    def _schedule(self, delay, process):
+        self.sequence += 1
+        heapq.heappush(self.queue, (self.now + delay, self.sequence, process))
+
+    def run(self):
+        while self.queue:
+            self.now, _, process = heapq.heappop(self.queue)
+            try:
+                delay = next(process)
+            except StopIteration:
+                continue
+            self._schedule(max(0.0, delay), process)
+        return self.now
+
+class Run:
+    """State shared by the concurrent channel loops of one simulated workflow run."""
+
+    def __init__(self, profile, daily_quota, quota_per_channel, rng):
+        self.profile = profile
+        self.daily_quota = daily_quota
+        self.quota_per_channel = quota_per_channel
+        self.rng = rng
+        self.quota_used = {}
+        self.active_transfers = 0
+        self.uploads = []          # (finish time, channel)
+        self.failures = 0
+        self.quota_failures = 0
+        self.limit_hits = 0
+
+    def charge(self, channel, units):
+        """Spend quota units if the channel's project has them left."""
+        key = channel if self.quota_per_channel else 'project'
+        if self.quota_used.get(key, 0) + units > self.daily_quota:
+            return False
+        self.quota_used[key] = self.quota_used.get(key, 0) + units
+        return True
+
+    def draw(self, name):
+        return sample(self.profile[name], self.rng)
+
+    def api(self, calls=1):
+        return sum(self.draw('api_seconds') for _ in range(calls))
+
+    def transfer_seconds(self, megabytes, rate_name):
+        # Concurrent transfers share the runner's link
+        return megabytes / (self.draw(rate_name) / max(1, self.active_transfers))
+
+def upload_one_video(sim, run, channel, channel_uploads):
+    """One `upload_gdrive_videos.py --from-plan --limit 1` process. Sets channel_uploads['result']."""
+    yield run.draw('process_start_seconds')
+    # Sheet read, claim (read, write, settle, read)
+    yield run.api(4) + run.draw('claim_settle_seconds')
+    # Drive listing and MP4 preflight range reads
+    yield run.api(4)
+
+    size_mb = run.draw('video_mb')
+    run.active_transfers += 1
+    yield run.transfer_seconds(size_mb, 'download_mb_per_second') + run.api(4)
+    run.active_transfers -= 1
+
+    limit = run.profile.get('channel_upload_limit')
+    if limit is not None and channel_uploads['count'] >= limit:
+        yield run.api()
+        run.limit_hits += 1
+        channel_uploads['result'] = 'upload_limit'
+        return
+    if not run.charge(channel, INSERT_COST):
+        yield run.api()
+        run.quota_failures += 1
+        channel_uploads['result'] = 'failed'  # quotaExceeded is not the uploadLimitExceeded the workflow greps
+        return
+
+    chunks = math.ceil(size_mb / run.profile['upload_chunk_mb'])
+    run.active_transfers += 1
+    yield run.transfer_seconds(size_mb, 'upload_mb_per_second') + run.api(chunks)
+    run.active_transfers -= 1
+
+    if run.rng.random() < run.profile['failure_probability']:
+        run.failures += 1
+        channel_uploads['result'] = 'failed'
+        return
+
+    run.charge(channel, THUMBNAIL_COST)
+    # Thumbnail, sheet update, Telegram, lease release
+    yield run.api(6)
+    channel_uploads['count'] += 1
+    run.uploads.append((sim.now, channel))
+    channel_uploads['result'] = 'ok'
+
+def channel_loop(sim, run, channels, sleep_seconds, channel_sleep_seconds):
+    """The workflow's per-channel bash loop for the channels assigned to this lane."""
+    for channel_index, (channel, count) in enumerate(channels):
+        channel_uploads = {'count': 0, 'result': None}
+        consecutive_failures = 0
+        last_channel = channel_index == len(channels) - 1
+        for i in range(1, count + 1):
+            yield from upload_one_video(sim, run, channel, channel_uploads)
+            if channel_uploads['result'] == 'upload_limit':
+                break
+            if channel_uploads['result'] == 'failed':
+                consecutive_failures += 1
+                if consecutive_failures >= 3:
+                    break
+            else:
+                consecutive_failures = 0
+            # --upload-history after each video
+            yield run.draw('process_start_seconds') + run.api()
+            if i < count or not last_channel:
+                yield sleep_seconds
+        if not last_channel:
+            yield channel_sleep_seconds
+
+def workflow(sim, run, lanes, sleep_seconds, channel_sleep_seconds):
+    yield run.draw('job_setup_seconds')
+    yield run.draw('process_start_seconds') + run.api()      # --upload-history
+    yield run.draw('scan_seconds')
+    yield run.draw('process_start_seconds') + run.api(2)     # --plan-day
+    for lane in lanes:
+        sim.start(channel_loop(sim, run, lane, sleep_seconds, channel_sleep_seconds))
+
+def random_counts(rng, low, high):
+    return {name: rng.randint(low, high) for name in CHANNEL_NAMES}
+
+def simulate(args, profile, rng):
+    """Simulate one workflow run and return its outcome."""
+    counts = parse_channel_counts(args.counts) if args.counts else random_counts(rng, args.min_count, args.max_count)
+    channels = list(counts.items())
+    lanes = [channels[i::args.concurrency] for i in range(args.concurrency)]
+    lanes = [lane for lane in lanes if lane]
+
+    sim = Simulation()
+    run = Run(profile, args.daily_quota, args.quota_per_channel, rng)
+    sim.start(workflow(sim, run, lanes, args.sleep, args.channel_sleep))
+    finish = sim.run()
+
+    timeout = args.timeout_minutes * 60
+    return {
+        'planned': sum(counts.values()),
+        'finish': finish,
+        'timed_out': finish > timeout,
+        'uploaded_before_timeout': sum(1 for t, _ in run.uploads if t <= timeout),
+        'quota_used': sum(run.quota_used.values()),
+        'quota_failures': run.quota_failures,
+        'failures': run.failures,
+        'limit_hits': run.limit_hits
+    }
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def load_profile(path):
+    profile = dict(DEFAULT_PROFILE)
+    if path:
+        with open(path, 'r') as f:
+            profile.update(json.load(f))
+    return profile
+
+def main():
+    parser = argparse.ArgumentParser(description='Simulate the daily upload workflow to size counts and concurrency.')
+    parser.add_argument('--counts', help='Fixed channel counts, e.g. "MagicMap Tales:8,Tiny Trailblazers:7" '
+                                         '(default: random per run, like the workflow)')
+    parser.add_argument('--min-count', type=int, default=7, help='Smallest random count per channel (default 7)')
+    parser.add_argument('--max-count', type=int, default=10, help='Largest random count per channel (default 10)')
+    parser.add_argument('--concurrency', type=int, default=1,
+                        help='Channel loops running in parallel (the workflow runs 1)')
+    parser.add_argument('--sleep', type=float, default=0, help='Seconds between videos (default 0, burst mode)')
+    parser.add_argument('--channel-sleep', type=float, default=0, help='Seconds between channels (default 0)')
+    parser.add_argument('--timeout-minutes', type=float, default=150, help='Job timeout (default 150)')
+    parser.add_argument('--daily-quota', type=int, default=DEFAULT_DAILY_QUOTA,
+                        help=f'YouTube API units per Cloud project per day (default {DEFAULT_DAILY_QUOTA})')
+    parser.add_argument('--quota-per-channel', action='store_true',
+                        help='Each channel token belongs to its own Cloud project (default: one shared project)')
+    parser.add_argument('--profile', help='JSON file overriding entries of the default latency profile')
+    parser.add_argument('--trials', type=int, default=1000, help='Runs to simulate (default 1000)')
+    parser.add_argument('--seed', type=int, default=1, help='Random seed')
+    args = parser.parse_args()
+
+    if args.concurrency < 1:
+        parser.error('--concurrency must be at least 1')
+
+    profile = load_profile(args.profile)
+    rng = random.Random(args.seed)
+    results = [simulate(args, profile, rng) for _ in range(args.trials)]
+
+    finishes = [r['finish'] / 60 for r in results]
+    timeouts = sum(1 for r in results if r['timed_out'])
+    planned = sum(r['planned'] for r in results) / len(results)
+    uploaded = sum(r['uploaded_before_timeout'] for r in results) / len(results)
+    quota = [r['quota_used'] for r in results]
+
+    print(f"Simulated {args.trials} runs ({args.concurrency} channel loop(s), "
+          f"{args.sleep:.0f}s between videos, {args.timeout_minutes:.0f} min timeout)")
+    print(f"Completion time: p50 {percentile(finishes, 0.5):.1f} min, p90 {percentile(finishes, 0.9):.1f} min, "
+          f"p99 {percentile(finishes, 0.99):.1f} min")
+    print(f"Timeout risk: {timeouts * 100 / len(results):.1f}% of runs exceed {args.timeout_minutes:.0f} min")
+    print(f"Videos: {planned:.1f} planned, {uploaded:.1f} uploaded before the timeout on average")
+    scope = 'per channel' if args.quota_per_channel else 'shared'
+    print(f"Quota: p50 {percentile(quota, 0.5)} / max {max(quota)} units used, {args.daily_quota} {scope} "
+          f"({INSERT_COST} per insert, {THUMBNAIL_COST} per thumbnail)")
+    quota_failures = sum(r['quota_failures'] for r in results) / len(results)
+    if quota_failures:
+        print(f"Quota exhausted: {quota_failures:.1f} insert attempts per run fail with quotaExceeded "
+              f"after their download; at most {args.daily_quota // (INSERT_COST + THUMBNAIL_COST)} "
+              f"videos fit in each project's quota")
+    print(f"Other failures: {sum(r['failures'] for r in results) / len(results):.2f} per run, "
+          f"uploadLimitExceeded: {sum(r['limit_hits'] for r in results) / len(results):.2f} per run")
+
+if __name__ == '__main__':
+    main()
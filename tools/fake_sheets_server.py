@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""Local in-memory stand-in for the Sheets v4 values API, for multi-process testing.
+
+Point googleapiclient at it with
+    build('sheets', 'v4', credentials=AnonymousCredentials(),
+          client_options={'api_endpoint': 'http://127.0.0.1:8765'})
+"""
+
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs, unquote
+
+A1_CELL = re.compile(r'^([A-Z]*)(\d*)$')
+
+def column_index(letters):
+    """Convert A1 column letters to a 0-based index (A -> 0, AA -> 26)."""
+    index = 0
+    for ch in letters:
+        index = index * 26 + (ord(ch) - 64)
+    return index - 1
+
+def parse_range(a1_range):
+    """Parse 'Sheet1!A2:Z1000' style ranges into (sheet, row0, col0, row1, col1).
+
+    Bounds are 0-based and inclusive; None means open-ended.
+    """
+    sheet, _, cells = a1_range.partition('!')
+    sheet = sheet.strip("'")
+    if not cells:
+        return sheet, 0, 0, None, None
+    start, _, end = cells.partition(':')
+    end = end or start
+
+    def split(cell):
+        match = A1_CELL.match(cell.upper())
+        if not match:
+            raise ValueError(f"Unsupported range: {a1_range}")
+        letters, digits = match.groups()
+        col = column_index(letters) if letters else None
+        row = int(digits) - 1 if digits else None
+        return row, col
+
+    row0, col0 = split(start)
+    row1, col1 = split(end)
+    return sheet, row0 or 0, col0 or 0, row1, col1
+
+class FakeSpreadsheet:
+    """Thread-safe grid of strings per sheet."""
+
+    def __init__(self, sheets=None, row_count=1000, column_count=26):
+        self.sheets = sheets or {'Sheet1': []}
+        self.row_count = row_count
+        self.column_count = column_count
+        self.lock = threading.Lock()
+        self.request_count = 0
+
+    def get(self, a1_range):
+        sheet, row0, col0, row1, col1 = parse_range(a1_range)
+        with self.lock:
+            grid = self.sheets.setdefault(sheet, [])
+            rows = grid[row0:None if row1 is None else row1 + 1]
+            values = [list(r[col0:None if col1 is None else col1 + 1]) for r in rows]
+        # The real API trims trailing empty cells and rows
+        for row in values:
+            while row and row[-1] == '':
+                row.pop()
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def update(self, a1_range, values):
+        sheet, row0, col0, _, _ = parse_range(a1_range)
+        with self.lock:
+            grid = self.sheets.setdefault(sheet, [])
+            for r, row_values in enumerate(values):
+                while len(grid) <= row0 + r:
+                    grid.append([])
+                row = grid[row0 + r]
+                for c, value in enumerate(row_values):
+                    while len(row) <= col0 + c:
+                        row.append('')
+                    row[col0 + c] = '' if value is None else str(value)
+            self.row_count = max(self.row_count, len(grid))
+        return len(values)
+
+    def append(self, a1_range, values):
+        sheet, _, col0, _, _ = parse_range(a1_range)
+        with self.lock:
+            grid = self.sheets.setdefault(sheet, [])
+            start = len(grid)
+            while grid and not any(grid[start - 1]):
+                start -= 1
+        from_col = chr(65 + col0)
+        self.update(f"{sheet}!{from_col}{start + 1}", values)
+        return f"{sheet}!{from_col}{start + 1}:{from_col}{start + len(values)}"
+
+class FakeSheetsHandler(BaseHTTPRequestHandler):
+    """Implements values.get/update/append/batchGet/batchUpdate and spreadsheets.get."""
+
+    spreadsheet = None
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _route(self, method):
+        if self.latency:
+            time.sleep(random.random() * self.latency)
+        self.spreadsheet.request_count += 1
+
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        match = re.match(r'^/v4/spreadsheets/([^/:]+)(.*)$', parsed.path)
+        if not match:
+            return self._send(404, {'error': {'code': 404, 'message': 'Not found'}})
+        rest = match.group(2)
+
+        try:
+            if method == 'GET' and rest == '':
+                return self._send(200, {
+                    'spreadsheetId': match.group(1),
+                    'sheets': [{'properties': {'title': title, 'gridProperties': {
+                        'rowCount': self.spreadsheet.row_count,
+                        'columnCount': self.spreadsheet.column_count}}}
+                        for title in self.spreadsheet.sheets]
+                })
+            if method == 'GET' and rest == '/values:batchGet':
+                return self._send(200, {'valueRanges': [
+                    {'range': r, 'values': self.spreadsheet.get(r)} for r in query.get('ranges', [])]})
+            if method == 'POST' and rest == '/values:batchUpdate':
+                data = self._body().get('data', [])
+                for item in data:
+                    self.spreadsheet.update(item['range'], item.get('values', []))
+                return self._send(200, {'totalUpdatedRanges': len(data)})
+            if rest.startswith('/values/'):
+                a1_range = unquote(rest[len('/values/'):])
+                if method == 'POST' and a1_range.endswith(':append'):
+                    updated = self.spreadsheet.append(a1_range[:-len(':append')], self._body().get('values', []))
+                    return self._send(200, {'updates': {'updatedRange': updated}})
+                if method == 'GET':
+                    values = self.spreadsheet.get(a1_range)
+                    payload = {'range': a1_range, 'majorDimension': 'ROWS'}
+                    if values:
+                        payload['values'] = values
+                    return self._send(200, payload)
+                if method == 'PUT':
+                    rows = self.spreadsheet.update(a1_range, self._body().get('values', []))
+                    return self._send(200, {'updatedRange': a1_range, 'updatedRows': rows})
+        except ValueError as e:
+            return self._send(400, {'error': {'code': 400, 'message': str(e)}})
+
+        return self._send(404, {'error': {'code': 404, 'message': f'Unsupported call {method} {rest}'}})
+
+    def do_GET(self):
+        self._route('GET')
+
+    def do_POST(self):
+        self._route('POST')
+
+    def do_PUT(self):
+        self._route('PUT')
+
+def start_server(spreadsheet, port=0, latency=0.0):
+    """Start the fake server on a background thread and return (server, endpoint URL)."""
+    handler = type('Handler', (FakeSheetsHandler,), {'spreadsheet': spreadsheet, 'latency': latency})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def build_fake_sheets_service(endpoint):
+    """Build a googleapiclient Sheets service that talks to the fake server."""
+    from google.auth.credentials import AnonymousCredentials
+    from googleapiclient.discovery import build
+    return build('sheets', 'v4', credentials=AnonymousCredentials(),
+                 client_options={'api_endpoint': endpoint}, static_discovery=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Google Sheets values API")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--latency", type=float, default=0.0, help="Maximum random delay per request in seconds")
+    parser.add_argument("--seed-file", help="JSON file with a list of rows (first row is the header) for Sheet1")
+    args = parser.parse_args()
+
+    rows = []
+    if args.seed_file:
+        with open(args.seed_file, 'r', encoding='utf-8') as f:
+            rows = json.load(f)
+
+    server, endpoint = start_server(FakeSpreadsheet({'Sheet1': rows}), args.port, args.latency)
+    print(f"Fake Sheets API listening on {endpoint}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
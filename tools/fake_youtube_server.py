@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""Local stand-in for YouTube's resumable videos.insert endpoint, with fault injection.
+
+Chunk PUTs can be answered with 5xx or 429 errors, a connection reset halfway
+through the body, a partial `308 Resume Incomplete` that keeps only part of
+the chunk, or a slow response. Faults come from a seeded random schedule
+(FaultSchedule.rates) and/or fixed request numbers (FaultSchedule.at). Point
+googleapiclient at it with
+
+    youtube = build_fake_youtube_service('http://127.0.0.1:8766')
+"""
+
+import re
+import json
+import time
+import uuid
+import random
+import socket
+import struct
+import hashlib
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import httplib2
+
+FAULT_KINDS = ('500', '502', '503', '504', '429', 'reset', 'partial', 'slow')
+
+CONTENT_RANGE = re.compile(r'^bytes (?:(\d+)-(\d+)|\*)/(\d+|\*)$')
+
+def parse_fault_rates(value):
+    """Parse '503=0.02,reset=0.01,partial=0.05' into {kind: probability}."""
+    rates = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        kind, sep, rate = item.partition('=')
+        kind = kind.strip()
+        if not sep or kind not in FAULT_KINDS:
+            raise ValueError(f"Invalid fault '{item}', expected KIND=PROBABILITY with KIND in {', '.join(FAULT_KINDS)}")
+        rates[kind] = float(rate)
+    if sum(rates.values()) > 1:
+        raise ValueError("Fault probabilities add up to more than 1")
+    return rates
+
+def parse_fault_at(value):
+    """Parse '3:503,7:reset' into {chunk request number: kind}."""
+    faults = {}
+    for item in (value or '').split(','):
+        if not item.strip():
+            continue
+        number, sep, kind = item.partition(':')
+        if not sep or kind.strip() not in FAULT_KINDS:
+            raise ValueError(f"Invalid fault '{item}', expected NUMBER:KIND")
+        faults[int(number)] = kind.strip()
+    return faults
+
+class FaultSchedule:
+    """Decides which fault, if any, the Nth chunk PUT gets."""
+
+    def __init__(self, rates=None, at=None, seed=None, slow_seconds=2.0, retry_after=None):
+        self.rates = rates or {}
+        self.at = at or {}
+        self.random = random.Random(seed)
+        self.slow_seconds = slow_seconds
+        self.retry_after = retry_after
+
+    def next_fault(self, request_number):
+        if request_number in self.at:
+            return self.at[request_number]
+        roll = self.random.random()
+        for kind, rate in self.rates.items():
+            if roll < rate:
+                return kind
+            roll -= rate
+        return None
+
+class UploadState:
+    """Upload sessions plus counters the benchmark reads."""
+
+    def __init__(self, schedule=None):
+        self.schedule = schedule or FaultSchedule()
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.chunk_requests = 0
+        self.status_queries = 0
+        self.bytes_received = 0
+        self.faults = {}
+
+    def count_fault(self, kind):
+        self.faults[kind] = self.faults.get(kind, 0) + 1
+
+class FakeYouTubeHandler(BaseHTTPRequestHandler):
+    """Implements resumable videos.insert, its status queries and thumbnails.set."""
+
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, payload=None, headers=None):
+        body = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if payload is not None:
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, status, reason, message, headers=None):
+        self._send(status, {'error': {'code': status, 'message': message,
+                                      'errors': [{'reason': reason, 'message': message}]}}, headers)
+
+    def _read_body(self, limit=None):
+        length = int(self.headers.get('Content-Length') or 0)
+        data = self.rfile.read(length if limit is None else min(length, limit))
+        with self.state.lock:
+            self.state.bytes_received += len(data)
+        return data
+
+    def _reset(self):
+        # SO_LINGER 0 makes close() send a RST instead of a FIN
+        self.connection.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+        self.close_connection = True
+        self.connection.close()
+
+    def _resume_incomplete(self, session):
+        headers = {}
+        if session['committed']:
+            headers['Range'] = f"bytes=0-{session['committed'] - 1}"
+        self._send(308, headers=headers)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        query = parse_qs(parsed.query)
+        if parsed.path.endswith('/videos') and query.get('uploadType') == ['resumable']:
+            metadata = json.loads(self._read_body() or b'{}')
+            session_id = uuid.uuid4().hex
+            total = self.headers.get('X-Upload-Content-Length')
+            with self.state.lock:
+                self.state.sessions[session_id] = {
+                    'metadata': metadata,
+                    'total': int(total) if total else None,
+                    'committed': 0,
+                    'md5': hashlib.md5()
+                }
+            host = self.headers.get('Host') or f"127.0.0.1:{self.server.server_address[1]}"
+            return self._send(200, {}, {'Location': f"http://{host}/upload/sessions/{session_id}"})
+        if parsed.path.endswith('/thumbnails/set'):
+            self._read_body()
+            return self._send(200, {'kind': 'youtube#thumbnailSetResponse', 'items': []})
+        self._read_body()
+        return self._error(404, 'notFound', f'Unsupported call POST {parsed.path}')
+
+    def do_PUT(self):
+        match = re.match(r'^/upload/sessions/([0-9a-f]+)$', urlparse(self.path).path)
+        session = self.state.sessions.get(match.group(1)) if match else None
+        if session is None:
+            self._read_body()
+            return self._error(404, 'notFound', 'Unknown upload session')
+
+        content_range = CONTENT_RANGE.match(self.headers.get('Content-Range', ''))
+        if not content_range:
+            self._read_body()
+            return self._error(400, 'badContentRange', 'Missing or invalid Content-Range')
+        first, last, total = content_range.groups()
+        if total != '*':
+            session['total'] = int(total)
+
+        # "bytes */total": the client asks how much was committed
+        if first is None:
+            self._read_body()
+            with self.state.lock:
+                self.state.status_queries += 1
+            return self._resume_incomplete(session)
+
+        with self.state.lock:
+            self.state.chunk_requests += 1
+            fault = self.state.schedule.next_fault(self.state.chunk_requests)
+            if fault:
+                self.state.count_fault(fault)
+
+        if fault == 'reset':
+            self._read_body(limit=int(self.headers.get('Content-Length') or 0) // 2)
+            return self._reset()
+        data = self._read_body()
+        if fault == 'slow':
+            time.sleep(self.state.schedule.slow_seconds)
+        elif fault == '429':
+            retry_after = self.state.schedule.retry_after
+            return self._error(429, 'rateLimitExceeded', 'Too many requests',
+                               {'Retry-After': str(retry_after)} if retry_after is not None else None)
+        elif fault and fault.isdigit():
+            return self._error(int(fault), 'backendError', 'Injected server error')
+
+        first = int(first)
+        if first > session['committed']:
+            # A gap: keep nothing and tell the client where to resume
+            return self._resume_incomplete(session)
+        data = data[session['committed'] - first:]
+        if fault == 'partial' and len(data) > 1:
+            data = data[:len(data) // 2]
+        session['md5'].update(data)
+        session['committed'] += len(data)
+
+        if session['total'] is not None and session['committed'] >= session['total']:
+            return self._send(200, {
+                'kind': 'youtube#video',
+                'id': 'fake' + match.group(1)[:7],
+                'snippet': session['metadata'].get('snippet', {}),
+                'status': {'uploadStatus': 'uploaded'},
+                'fileDetails': {'fileSize': session['committed'], 'md5': session['md5'].hexdigest()}
+            })
+        return self._resume_incomplete(session)
+
+def start_server(schedule=None, port=0):
+    """Start the fake server on a background thread and return (server, endpoint URL)."""
+    state = UploadState(schedule)
+    handler = type('Handler', (FakeYouTubeHandler,), {'state': state})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+class LocalHttp(httplib2.Http):
+    """httplib2.Http that sends every request to the fake server, whatever host the URL names."""
+
+    def __init__(self, endpoint, **kwargs):
+        super().__init__(**kwargs)
+        self.endpoint = endpoint.rstrip('/')
+        # 308 is Resume Incomplete for uploads, not a redirect (as googleapiclient's build_http sets up)
+        self.redirect_codes = self.redirect_codes - {308}
+
+    def request(self, uri, *args, **kwargs):
+        parsed = urlparse(uri)
+        path = parsed.path + (f"?{parsed.query}" if parsed.query else '')
+        return super().request(self.endpoint + path, *args, **kwargs)
+
+def build_fake_youtube_service(endpoint, timeout=60):
+    """Build a googleapiclient YouTube service whose calls (media uploads included) go to the fake server."""
+    from googleapiclient.discovery import build
+    return build('youtube', 'v3', http=LocalHttp(endpoint, timeout=timeout), static_discovery=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake YouTube resumable upload endpoint")
+    parser.add_argument("--port", type=int, default=8766, help="Port to listen on")
+    parser.add_argument("--faults", help="Fault probabilities per chunk, e.g. '503=0.02,reset=0.01,partial=0.05'")
+    parser.add_argument("--fault-at", help="Faults at fixed chunk request numbers, e.g. '3:503,7:reset'")
+    parser.add_argument("--slow-seconds", type=float, default=2.0, help="Delay of a 'slow' fault (default 2)")
+    parser.add_argument("--retry-after", type=float, help="Retry-After seconds sent with 429 faults")
+    parser.add_argument("--seed", type=int, help="Seed for the fault schedule")
+    args = parser.parse_args()
+
+    try:
+        schedule = FaultSchedule(parse_fault_rates(args.faults), parse_fault_at(args.fault_at), args.seed,
+                                 args.slow_seconds, args.retry_after)
+    except ValueError as e:
+        parser.error(str(e))
+
+    server, endpoint = start_server(schedule, args.port)
+    print(f"Fake YouTube upload API listening on {endpoint}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == '__main__':
+    main()
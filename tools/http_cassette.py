@@ -0,0 +1,456 @@
+#!/usr/bin/env python3
+"""Record a script's HTTP traffic and replay it offline, for repeatable profiling.
+
+Both transports the uploader uses are patched at the lowest shared layer:
+httplib2.Http.request (googleapiclient, AuthorizedHttp) and
+requests.adapters.HTTPAdapter.send (AuthorizedSession downloads, share links,
+Telegram). Recording writes one JSON line per exchange with its latency.
+Authorization headers, cookies, tokens and keys in URLs and bodies, and the
+Telegram bot token are redacted. Bodies over INLINE_BYTES (videos) are kept as
+a sized placeholder holding only their first and last PLACEHOLDER_EDGE_BYTES,
+so MP4 probes still see a real header; MD5 checksums in replayed listings are
+rewritten to match the placeholder content.
+
+Replay answers each request with the next recorded response for the same
+method and URL, after sleeping the recorded latency times --time-scale.
+
+    python tools/http_cassette.py record run.jsonl -- upload_gdrive_videos.py --limit 2
+    python tools/http_cassette.py replay run.jsonl --time-scale 0 --profile run.prof -- upload_gdrive_videos.py --limit 2
+
+Local state changes which requests a run makes (.videopost caches, the share
+link cache), so record and replay with --isolate, which runs the script in an
+empty temporary directory. The lease runner ID is pinned via
+UPLOADER_RUNNER_ID so lease read-backs match.
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import base64
+import random
+import runpy
+import hashlib
+import argparse
+import tempfile
+import threading
+import collections
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+import httplib2
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+INLINE_BYTES = 256 * 1024
+PLACEHOLDER_EDGE_BYTES = 64 * 1024
+
+REDACTED = 'REDACTED'
+REDACTED_HEADERS = {'authorization', 'proxy-authorization', 'cookie', 'set-cookie', 'x-goog-api-key'}
+REDACTED_PARAMS = {'key', 'access_token', 'token', 'client_secret', 'refresh_token', 'assertion', 'code'}
+# JSON fields redacted in bodies (token responses, downloaded credential files)
+REDACTED_FIELDS = ('access_token', 'refresh_token', 'id_token', 'client_secret', 'private_key', 'private_key_id',
+                   'token', 'assertion')
+
+TELEGRAM_BOT_PATH = re.compile(r'/bot[^/]+/')
+JSON_FIELD = re.compile(r'"(%s)"(\s*:\s*)"(?:[^"\\]|\\.)*"' % '|'.join(REDACTED_FIELDS))
+BATCH_CONTENT_ID = re.compile(rb'Content-ID: <(?:response-)?([0-9a-f-]{36}) ?\+')
+RUNNER_ID = 'cassette-runner'
+
+def redact_url(url):
+    parts = urlsplit(url)
+    path = TELEGRAM_BOT_PATH.sub(f'/bot{REDACTED}/', parts.path)
+    query = sorted((k, REDACTED if k in REDACTED_PARAMS else v) for k, v in parse_qsl(parts.query, keep_blank_values=True))
+    return urlunsplit((parts.scheme, parts.netloc, path, urlencode(query), ''))
+
+def redact_headers(headers):
+    return {str(k).lower(): (REDACTED if str(k).lower() in REDACTED_HEADERS else str(v))
+            for k, v in (headers or {}).items()}
+
+def redact_text(data):
+    """Blank secret JSON fields and form parameters in a body; returns bytes."""
+    text = data.decode('utf-8', 'replace') if isinstance(data, bytes) else str(data)
+    text = JSON_FIELD.sub(lambda m: f'"{m.group(1)}"{m.group(2)}"{REDACTED}:{m.group(1)}"', text)
+    text = re.sub(r'(?<![\w-])(%s)=[^&\s]*' % '|'.join(REDACTED_PARAMS), rf'\1={REDACTED}', text)
+    return text.encode('utf-8')
+
+def _is_text(content_type):
+    content_type = (content_type or '').lower()
+    return (content_type.startswith('text/') or 'json' in content_type or 'x-www-form-urlencoded' in content_type
+            or content_type.startswith('multipart/'))
+
+def _looks_like_json(data):
+    # Credential files come from Drive as application/octet-stream and must still be redacted
+    if not data.lstrip()[:1] in (b'{', b'['):
+        return False
+    try:
+        json.loads(data)
+        return True
+    except ValueError:
+        return False
+
+def _placeholder(data_head, size, md5, data_tail):
+    return {'placeholder': size, 'md5': md5,
+            'head': base64.b64encode(data_head).decode('ascii'),
+            'tail': base64.b64encode(data_tail).decode('ascii')}
+
+def encode_body(data, content_type):
+    """Cassette form of a body: text, base64, or a sized placeholder."""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    data = bytes(data)
+    if len(data) > INLINE_BYTES:
+        return _placeholder(data[:PLACEHOLDER_EDGE_BYTES], len(data), hashlib.md5(data).hexdigest(),
+                            data[max(PLACEHOLDER_EDGE_BYTES, len(data) - PLACEHOLDER_EDGE_BYTES):])
+    if _is_text(content_type) or _looks_like_json(data):
+        return {'text': redact_text(data).decode('utf-8')}
+    return {'base64': base64.b64encode(data).decode('ascii')}
+
+def _request_body_size(body):
+    if body is None:
+        return 0
+    try:
+        return len(body)
+    except TypeError:
+        return None
+
+class PlaceholderStream(io.RawIOBase):
+    """The placeholder's head, zeros, then its tail, produced as read."""
+
+    def __init__(self, head, size, tail):
+        self.head, self.size, self.tail = head, size, tail
+        self.position = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = min(len(buffer), self.size - self.position)
+        if n <= 0:
+            return 0
+        start, end = self.position, self.position + n
+        view = memoryview(buffer)
+        view[:n] = bytes(n)
+        if start < len(self.head):
+            head_end = min(end, len(self.head))
+            view[:head_end - start] = self.head[start:head_end]
+        tail_start = self.size - len(self.tail)
+        if end > tail_start:
+            begin = max(start, tail_start)
+            view[begin - start:n] = self.tail[begin - tail_start:end - tail_start]
+        self.position = end
+        return n
+
+def placeholder_bytes(body):
+    head = base64.b64decode(body.get('head', ''))
+    tail = base64.b64decode(body.get('tail', ''))
+    size = body['placeholder']
+    return head[:size] + bytes(max(0, size - len(head) - len(tail))) + tail
+
+class _TeeRaw(io.RawIOBase):
+    """Wraps a urllib3 response while recording: keeps the head, tail, size and MD5 of what is read."""
+
+    def __init__(self, raw, interaction, started):
+        self.raw = raw
+        self.interaction = interaction
+        self.started = started
+        self.head = bytearray()
+        self.tail = collections.deque()
+        self.tail_bytes = 0
+        self.size = 0
+        self.md5 = hashlib.md5()
+        self.finished = False
+
+    def readable(self):
+        return True
+
+    def read(self, amt=None, **kwargs):
+        data = self.raw.read(amt, **kwargs)
+        if data:
+            self.size += len(data)
+            self.md5.update(data)
+            if len(self.head) < INLINE_BYTES:
+                self.head += data[:INLINE_BYTES - len(self.head)]
+            self.tail.append(data)
+            self.tail_bytes += len(data)
+            while self.tail and self.tail_bytes - len(self.tail[0]) >= PLACEHOLDER_EDGE_BYTES:
+                self.tail_bytes -= len(self.tail.popleft())
+        if amt is None or not data:
+            self.finish()
+        return data
+
+    def stream(self, amt=2 ** 16, decode_content=None):
+        while True:
+            data = self.read(amt, decode_content=decode_content)
+            if not data:
+                break
+            yield data
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        content_type = self.interaction['response']['headers'].get('content-type')
+        if self.size <= INLINE_BYTES:
+            self.interaction['response']['body'] = encode_body(bytes(self.head), content_type)
+        else:
+            self.interaction['response']['body'] = _placeholder(
+                bytes(self.head[:PLACEHOLDER_EDGE_BYTES]), self.size, self.md5.hexdigest(),
+                b''.join(self.tail)[-PLACEHOLDER_EDGE_BYTES:])
+        self.interaction['elapsed'] = round(time.monotonic() - self.started, 6)
+
+    def close(self):
+        self.finish()
+        self.raw.close()
+        super().close()
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+class Recorder:
+    """Patches the transports to pass requests through and log them."""
+
+    def __init__(self, path):
+        self.path = path
+        self.interactions = []
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+
+    def _new(self, method, url, headers, body):
+        content_type = redact_headers(headers).get('content-type')
+        size = _request_body_size(body)
+        interaction = {
+            'offset': round(time.monotonic() - self.started, 6),
+            'request': {'method': method.upper(), 'url': redact_url(url), 'headers': redact_headers(headers),
+                        'body_size': size},
+        }
+        if body is not None and size is not None and size <= INLINE_BYTES and not hasattr(body, 'read'):
+            interaction['request']['body'] = encode_body(body, content_type)
+            match = BATCH_CONTENT_ID.search(body if isinstance(body, bytes) else str(body).encode('utf-8'))
+            if match:
+                interaction['batch_id'] = match.group(1).decode('ascii')
+        with self.lock:
+            self.interactions.append(interaction)
+        return interaction
+
+    def install(self):
+        recorder = self
+        original_request = httplib2.Http.request
+        original_send = HTTPAdapter.send
+
+        def request(http, uri, method='GET', body=None, headers=None, *args, **kwargs):
+            interaction = recorder._new(method, uri, headers, body)
+            started = time.monotonic()
+            response, content = original_request(http, uri, method, body, headers, *args, **kwargs)
+            headers_out = redact_headers({k: v for k, v in response.items() if k != 'status'})
+            interaction['elapsed'] = round(time.monotonic() - started, 6)
+            interaction['response'] = {'status': response.status, 'headers': headers_out,
+                                       'body': encode_body(content, headers_out.get('content-type'))}
+            return response, content
+
+        def send(adapter, prepared, *args, **kwargs):
+            interaction = recorder._new(prepared.method, prepared.url, prepared.headers, prepared.body)
+            started = time.monotonic()
+            response = original_send(adapter, prepared, *args, **kwargs)
+            interaction['response'] = {'status': response.status_code, 'reason': response.reason,
+                                       'headers': redact_headers(response.headers), 'body': None}
+            interaction['elapsed'] = round(time.monotonic() - started, 6)
+            response.raw = _TeeRaw(response.raw, interaction, started)
+            return response
+
+        httplib2.Http.request = request
+        HTTPAdapter.send = send
+
+    def save(self):
+        with self.lock:
+            interactions = [i for i in self.interactions if 'response' in i]
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'cassette': 1, 'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                                'interactions': len(interactions)}) + '\n')
+            for interaction in interactions:
+                f.write(json.dumps(interaction) + '\n')
+        print(f"Recorded {len(interactions)} HTTP exchanges to {self.path}", file=sys.stderr)
+
+def _throwaway_private_key():
+    """A fresh RSA key (PEM) so redacted service account files still load on replay."""
+    try:
+        from cryptography.hazmat.primitives import serialization
+        from cryptography.hazmat.primitives.asymmetric import rsa
+    except ImportError:
+        import rsa as python_rsa  # google-auth's own dependency
+        return python_rsa.newkeys(2048)[1].save_pkcs1().decode('ascii')
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                             serialization.NoEncryption()).decode('ascii')
+
+class CassetteMiss(Exception):
+    """The replayed run made a request the cassette has no answer for."""
+
+class Replayer:
+    """Patches the transports to answer from a cassette."""
+
+    def __init__(self, path, time_scale=1.0):
+        self.time_scale = time_scale
+        self.queues = collections.defaultdict(collections.deque)
+        self.last = {}
+        self.lock = threading.Lock()
+        self.replayed = 0
+        self.slept = 0.0
+        self.md5_map = {}
+        self.private_key = None
+        with open(path, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline())
+            if header.get('cassette') != 1:
+                raise ValueError(f"{path} is not an HTTP cassette")
+            for line in f:
+                interaction = json.loads(line)
+                request = interaction['request']
+                self.queues[(request['method'], request['url'])].append(interaction)
+                body = interaction['response'].get('body') or {}
+                if 'placeholder' in body and body.get('md5'):
+                    self.md5_map[body['md5']] = hashlib.md5(placeholder_bytes(body)).hexdigest()
+
+    def _private_key(self):
+        with self.lock:
+            if self.private_key is None:
+                self.private_key = _throwaway_private_key()
+            return self.private_key
+
+    def _next(self, method, url):
+        key = (method.upper(), redact_url(url))
+        with self.lock:
+            queue = self.queues.get(key)
+            if queue:
+                interaction = queue.popleft()
+                self.last[key] = interaction
+            elif key in self.last:
+                interaction = self.last[key]  # Asked more often than recorded: repeat the last answer
+            else:
+                raise CassetteMiss(f"No recorded response for {key[0]} {key[1]}")
+            self.replayed += 1
+        delay = interaction.get('elapsed', 0) * self.time_scale
+        if delay > 0:
+            time.sleep(delay)
+            with self.lock:
+                self.slept += delay
+        return interaction
+
+    def _content(self, interaction, live_body):
+        body = interaction['response'].get('body')
+        if not body:
+            return b''
+        if 'placeholder' in body:
+            return None  # Streamed by the caller
+        data = body['text'].encode('utf-8') if 'text' in body else base64.b64decode(body['base64'])
+        redacted_key = f'"{REDACTED}:private_key"'.encode('ascii')
+        if redacted_key in data:
+            data = data.replace(redacted_key, json.dumps(self._private_key()).encode('ascii'))
+        for original, synthetic in self.md5_map.items():
+            data = data.replace(original.encode('ascii'), synthetic.encode('ascii'))
+        recorded_id = interaction.get('batch_id')
+        if recorded_id and live_body is not None:
+            live = live_body if isinstance(live_body, bytes) else str(live_body).encode('utf-8')
+            match = BATCH_CONTENT_ID.search(live)
+            if match:
+                data = data.replace(recorded_id.encode('ascii'), match.group(1))
+        return data
+
+    def install(self):
+        replayer = self
+
+        def request(http, uri, method='GET', body=None, headers=None, *args, **kwargs):
+            interaction = replayer._next(method, uri)
+            recorded = interaction['response']
+            content = replayer._content(interaction, body)
+            if content is None:
+                content = placeholder_bytes(recorded['body'])
+            response = httplib2.Response(dict(recorded['headers'], status=str(recorded['status'])))
+            return response, content
+
+        def send(adapter, prepared, *args, **kwargs):
+            interaction = replayer._next(prepared.method, prepared.url)
+            recorded = interaction['response']
+            content = replayer._content(interaction, prepared.body)
+            response = requests.Response()
+            response.status_code = recorded['status']
+            response.reason = recorded.get('reason', '')
+            response.headers = CaseInsensitiveDict(recorded['headers'])
+            response.headers.pop('content-encoding', None)  # Bodies were recorded decoded
+            if content is None:
+                body = recorded['body']
+                response.raw = io.BufferedReader(PlaceholderStream(base64.b64decode(body.get('head', '')),
+                                                                   body['placeholder'],
+                                                                   base64.b64decode(body.get('tail', ''))))
+            else:
+                response.raw = io.BytesIO(content)
+            response.url = prepared.url
+            response.request = prepared
+            response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+            return response
+
+        httplib2.Http.request = request
+        HTTPAdapter.send = send
+
+def run_script(script, script_args, profile=None):
+    sys.argv = [script] + list(script_args)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+    if not profile:
+        runpy.run_path(script, run_name='__main__')
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(runpy.run_path, script, run_name='__main__')
+    finally:
+        profiler.dump_stats(profile)
+        print(f"Profile written to {profile}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='Record or replay the HTTP traffic of an uploader script.')
+    parser.add_argument('mode', choices=('record', 'replay'))
+    parser.add_argument('cassette', help='Cassette file (JSON lines)')
+    parser.add_argument('--time-scale', type=float, default=1.0,
+                        help='Replay: fraction of each recorded latency to sleep (default 1, 0 for none)')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for random (jitter, random selection)')
+    parser.add_argument('--isolate', action='store_true', help='Run the script in an empty temporary directory')
+    parser.add_argument('--profile', metavar='FILE', help='Also write a cProfile profile of the run')
+    parser.add_argument('script', help='Script to run, followed by its arguments after --')
+    parser.add_argument('script_args', nargs=argparse.REMAINDER)
+    args = parser.parse_args()
+
+    script = os.path.abspath(args.script)
+    cassette = os.path.abspath(args.cassette)
+    script_args = args.script_args[1:] if args.script_args[:1] == ['--'] else args.script_args
+    os.environ.setdefault('UPLOADER_RUNNER_ID', RUNNER_ID)
+    random.seed(args.seed)
+    if args.isolate:
+        os.chdir(tempfile.mkdtemp(prefix='cassette_'))
+
+    if args.mode == 'record':
+        transport = Recorder(cassette)
+    else:
+        transport = Replayer(cassette, args.time_scale)
+    transport.install()
+
+    started, cpu_started = time.monotonic(), time.process_time()
+    exit_code = 0
+    try:
+        run_script(script, script_args, args.profile)
+    except SystemExit as e:
+        exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+    finally:
+        wall, cpu = time.monotonic() - started, time.process_time() - cpu_started
+        if args.mode == 'record':
+            transport.save()
+        else:
+            print(f"Replayed {transport.replayed} HTTP exchanges, {transport.slept:.1f}s of modelled latency",
+                  file=sys.stderr)
+        print(f"Wall {wall:.2f}s, CPU {cpu:.2f}s, exit code {exit_code}", file=sys.stderr)
+    sys.exit(exit_code)
+
+if __name__ == '__main__':
+    main()
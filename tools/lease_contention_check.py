@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""Run N uploader processes against the fake Sheets server and check no row is uploaded twice.
+
+One extra "crashing" worker claims a row and exits without releasing it, so the
+run also checks that a dead runner's lease expires and the row is picked up.
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import multiprocessing
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import row_lease
+from fake_sheets_server import FakeSpreadsheet, start_server, build_fake_sheets_service
+
+SPREADSHEET_ID = 'fake-sheet'
+HEADERS = ['Folder ID', 'Subfolder Name', 'Upload Status', 'YouTube Video ID',
+           row_lease.LEASE_OWNER_COLUMN, row_lease.LEASE_EXPIRES_COLUMN]
+
+def read_rows(sheets_service):
+    result = sheets_service.spreadsheets().values().get(
+        spreadsheetId=SPREADSHEET_ID, range='Sheet1!A2:Z1000').execute()
+    rows = result.get('values', [])
+    return [dict(zip(HEADERS, row + [''] * (len(HEADERS) - len(row)))) for row in rows]
+
+def mark_uploaded(sheets_service, row_index, runner_id):
+    sheet_row = row_index + 2
+    body = {'valueInputOption': 'RAW', 'data': [
+        {'range': f'Sheet1!C{sheet_row}:D{sheet_row}', 'values': [['Yes', runner_id]]}]}
+    sheets_service.spreadsheets().values().batchUpdate(spreadsheetId=SPREADSHEET_ID, body=body).execute()
+
+def uploader(endpoint, worker_number, upload_seconds, settle_seconds, lease_seconds, results):
+    """Keep claiming and 'uploading' rows until none are left."""
+    random.seed(worker_number)
+    sheets_service = build_fake_sheets_service(endpoint)
+    runner_id = f"worker-{worker_number}"
+
+    while True:
+        rows = read_rows(sheets_service)
+        pending = [i for i, row in enumerate(rows) if row['Upload Status'] != 'Yes']
+        if not pending:
+            return
+        candidates = [i for i in pending if row_lease.is_claimable(rows[i], runner_id)]
+        if not candidates:
+            time.sleep(settle_seconds)  # Everything left is leased, wait for leases to finish or lapse
+            continue
+
+        row_index = random.choice(candidates)
+        if not row_lease.try_claim(sheets_service, SPREADSHEET_ID, row_index, HEADERS,
+                                   folder_id=rows[row_index]['Folder ID'], runner_id=runner_id,
+                                   lease_seconds=lease_seconds, settle_seconds=settle_seconds):
+            continue
+
+        time.sleep(upload_seconds)
+        results.put((row_index, runner_id))
+        mark_uploaded(sheets_service, row_index, runner_id)
+        row_lease.release(sheets_service, SPREADSHEET_ID, row_index, HEADERS, runner_id=runner_id)
+
+def crashing_uploader(endpoint, lease_seconds):
+    """Claim row 0 and die without uploading or releasing it."""
+    sheets_service = build_fake_sheets_service(endpoint)
+    row_lease.try_claim(sheets_service, SPREADSHEET_ID, 0, HEADERS, folder_id='folder-0',
+                        runner_id='crashed-worker', lease_seconds=lease_seconds, settle_seconds=0.1)
+
+def main():
+    parser = argparse.ArgumentParser(description="Check row leasing with concurrent uploader processes")
+    parser.add_argument("--workers", type=int, default=6, help="Number of uploader processes")
+    parser.add_argument("--rows", type=int, default=20, help="Number of sheet rows to upload")
+    parser.add_argument("--latency", type=float, default=0.05, help="Maximum fake API latency in seconds")
+    parser.add_argument("--upload-seconds", type=float, default=0.2, help="Simulated upload time")
+    parser.add_argument("--settle-seconds", type=float, default=0.3, help="Claim settle delay")
+    parser.add_argument("--lease-seconds", type=float, default=3.0, help="Lease length")
+    args = parser.parse_args()
+
+    rows = [HEADERS] + [[f"folder-{i}", f"Story {i}"] for i in range(args.rows)]
+    spreadsheet = FakeSpreadsheet({'Sheet1': rows})
+    server, endpoint = start_server(spreadsheet, latency=args.latency)
+
+    crasher = multiprocessing.Process(target=crashing_uploader, args=(endpoint, args.lease_seconds))
+    crasher.start()
+    crasher.join()
+
+    results = multiprocessing.Queue()
+    started = time.time()
+    workers = [multiprocessing.Process(target=uploader, args=(endpoint, n, args.upload_seconds,
+                                                              args.settle_seconds, args.lease_seconds, results))
+               for n in range(args.workers)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.time() - started
+
+    uploads = []
+    while not results.empty():
+        uploads.append(results.get())
+    server.shutdown()
+
+    counts = Counter(row_index for row_index, _ in uploads)
+    duplicates = {row: n for row, n in counts.items() if n > 1}
+    missing = [row for row in range(args.rows) if row not in counts]
+
+    print(f"{args.workers} workers uploaded {len(uploads)} videos for {args.rows} rows in {elapsed:.1f}s "
+          f"({spreadsheet.request_count} Sheets requests)")
+    print(f"Row 0 (lease left by crashed worker) uploaded by: {[r for i, r in uploads if i == 0]}")
+    if duplicates or missing:
+        print(f"FAILED: duplicates={duplicates} missing={missing}")
+        sys.exit(1)
+    print("OK: every row uploaded exactly once")
+
+if __name__ == '__main__':
+    main()
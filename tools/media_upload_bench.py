@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""Compare CPU time and peak RSS of the file-backed and mmap-backed media bodies.
+
+Each source runs in its own child process and pushes the file through the same
+path a resumable videos.insert takes into a socket drained by a reader thread:
+'file' is the former ThrottledReader + MediaIoBaseUpload body (kept here only
+as the baseline), read per chunk through a _StreamSlice in http.client's 8 KB
+blocks; 'mmap' is MmapMediaUpload, whose getbytes() slice is sent whole. A fraction of the chunks can be re-sent
+to model retries. Figures are per uploaded GB.
+
+    python tools/media_upload_bench.py --size-mb 2048
+    python tools/media_upload_bench.py --file temp_download/some/video.mp4 --retry-rate 0.05
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import socket
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SOURCES = ('file', 'mmap')
+
+# http.client reads stream bodies in blocks of this size
+SEND_BLOCK_SIZE = 8192
+
+class ThrottledReader(io.RawIOBase):
+    """The former upload body: a file wrapper charging every read against the egress budget."""
+
+    def __init__(self, fd):
+        self._fd = fd
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def read(self, size=-1):
+        import bandwidth
+        data = self._fd.read(size)
+        if data:
+            bandwidth.get_limiter().throttle(bandwidth.EGRESS, len(data))
+        return data
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self._fd.seek(offset, whence)
+
+    def tell(self):
+        return self._fd.tell()
+
+    def close(self):
+        self._fd.close()
+        super().close()
+
+def open_media(source, path, chunksize):
+    if source == 'file':
+        from googleapiclient.http import MediaIoBaseUpload
+        return MediaIoBaseUpload(ThrottledReader(open(path, 'rb')), mimetype='video/mp4',
+                                 chunksize=chunksize, resumable=True)
+    import mmap_media
+    return mmap_media.MmapMediaUpload(path, 'video/mp4', chunksize=chunksize, resumable=True)
+
+def drain(sock):
+    buffer = bytearray(1024 * 1024)
+    while sock.recv_into(buffer):
+        pass
+
+def run_source(source, path, chunksize, retry_rate, seed):
+    """Send the file once (plus retried chunks) and return the measurements."""
+    from googleapiclient.http import _StreamSlice
+
+    sender, receiver = socket.socketpair()
+    reader = threading.Thread(target=drain, args=(receiver,), daemon=True)
+    reader.start()
+    rng = random.Random(seed)
+
+    media = open_media(source, path, chunksize)
+    size = media.size()
+    sent = 0
+    started = time.monotonic()
+    cpu_started = time.process_time()
+    for begin in range(0, size, chunksize):
+        attempts = 2 if rng.random() < retry_rate else 1
+        for _ in range(attempts):
+            # The same split googleapiclient's next_chunk() makes
+            if not media.has_stream():
+                body = media.getbytes(begin, chunksize)
+                sender.sendall(body)
+                sent += len(body)
+                continue
+            body = _StreamSlice(media.stream(), begin, chunksize)
+            while True:
+                block = body.read(SEND_BLOCK_SIZE)
+                if not block:
+                    break
+                sender.sendall(block)
+                sent += len(block)
+    cpu_seconds = time.process_time() - cpu_started
+    elapsed = time.monotonic() - started
+    sender.close()
+    reader.join()
+    if media.has_stream():
+        media.stream().close()
+    else:
+        media.close()
+
+    return {
+        'source': source,
+        'bytes': size,
+        'sent_bytes': sent,
+        'cpu_seconds': cpu_seconds,
+        'elapsed_seconds': elapsed,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+def make_test_file(size_mb):
+    f = tempfile.NamedTemporaryFile(prefix='media_bench_', suffix='.bin', delete=False)
+    block = os.urandom(1024 * 1024)
+    with f:
+        for _ in range(size_mb):
+            f.write(block)
+    return f.name
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark file-backed vs mmap-backed upload media bodies.')
+    parser.add_argument('--file', help='Video to send (default: a generated file of --size-mb)')
+    parser.add_argument('--size-mb', type=int, default=1024, help='Size of the generated file (default 1024)')
+    parser.add_argument('--chunk-size', type=int, default=1024 * 1024,
+                        help='Resumable chunk size in bytes (default 1 MiB, as upload_video_to_youtube)')
+    parser.add_argument('--retry-rate', type=float, default=0.0, help='Fraction of chunks sent twice (default 0)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per source; the best is reported (default 3)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--source', choices=SOURCES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.source:
+        # Child process: one measurement, as JSON on stdout
+        print(json.dumps(run_source(args.source, args.file, args.chunk_size, args.retry_rate, args.seed)))
+        return
+
+    path = args.file or make_test_file(args.size_mb)
+    try:
+        results = {}
+        for source in SOURCES:
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), '--source', source, '--file', path,
+                     '--chunk-size', str(args.chunk_size), '--retry-rate', str(args.retry_rate),
+                     '--seed', str(args.seed)],
+                    check=True, capture_output=True, text=True
+                ).stdout
+                runs.append(json.loads(output))
+            results[source] = min(runs, key=lambda run: run['cpu_seconds'])
+    finally:
+        if not args.file:
+            os.remove(path)
+
+    print(f"{'source':<6} {'sent MB':>9} {'CPU s/GB':>9} {'MB/s':>8} {'peak RSS MB':>12}")
+    for source, run in results.items():
+        gigabytes = run['sent_bytes'] / 1024 ** 3
+        print(f"{source:<6} {run['sent_bytes'] / 1024 ** 2:>9.0f} {run['cpu_seconds'] / gigabytes:>9.3f} "
+              f"{run['sent_bytes'] / 1024 ** 2 / run['elapsed_seconds']:>8.0f} {run['max_rss_kb'] / 1024:>12.1f}")
+
+if __name__ == '__main__':
+    main()
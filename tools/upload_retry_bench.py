@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""Benchmark retry policies for resumable uploads against injected faults.
+
+Each trial uploads a file through the real client path (MmapMediaUpload,
+videos.insert, next_chunk under retry_policy.call) to the fake endpoint in
+tools/fake_youtube_server.py, with a seeded fault schedule. Every policy sees
+the same seeds. Backoff sleeps run on a virtual clock (scaled by --time-scale,
+0 by default), so minutes of modelled backoff take no real time; transfer time
+and 'slow' faults are real. Per policy the report gives the success rate,
+modelled time to completion, goodput, bytes sent again and time spent backing off.
+
+    python tools/upload_retry_bench.py --faults "503=0.03,reset=0.02,partial=0.05" --trials 20
+    python tools/upload_retry_bench.py --policy upload --policy patient=20:2:300 --fault-at "2:503,3:503,4:503"
+"""
+
+import io
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+import contextlib
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from googleapiclient.errors import HttpError
+
+import retry_policy
+import mmap_media
+from fake_youtube_server import (FaultSchedule, start_server, build_fake_youtube_service,
+                                 parse_fault_rates, parse_fault_at)
+
+class ExponentialPolicy(retry_policy.RetryPolicy):
+    """Plain doubling backoff without jitter, for comparison with decorrelated jitter."""
+
+    def next_delay(self, previous_delay):
+        return min(self.max_delay, max(self.base_delay, previous_delay) * 2)
+
+BUILTIN_POLICIES = {
+    'upload': retry_policy.UPLOAD_POLICY,
+    'default': retry_policy.DEFAULT_POLICY,
+    'exponential': ExponentialPolicy(max_attempts=11, base_delay=1.0, max_delay=1024.0)
+}
+
+class VirtualClock:
+    """Stands in for the time module inside retry_policy: sleeps are recorded and scaled."""
+
+    def __init__(self, scale=0.0):
+        self.scale = scale
+        self.skipped = 0.0
+        self.slept = 0.0
+
+    def monotonic(self):
+        return time.monotonic() + self.skipped
+
+    def time(self):
+        return time.time() + self.skipped
+
+    def sleep(self, seconds):
+        self.slept += seconds
+        real = seconds * self.scale
+        time.sleep(real)
+        self.skipped += seconds - real
+
+def parse_policy(value):
+    """Parse 'upload' or 'NAME=ATTEMPTS:BASE:MAX[:exp]' into (name, RetryPolicy)."""
+    if value in BUILTIN_POLICIES:
+        return value, BUILTIN_POLICIES[value]
+    name, sep, spec = value.partition('=')
+    parts = spec.split(':')
+    if not sep or len(parts) not in (3, 4) or (len(parts) == 4 and parts[3] != 'exp'):
+        raise ValueError(f"Invalid policy '{value}', expected one of {', '.join(BUILTIN_POLICIES)} "
+                         f"or NAME=ATTEMPTS:BASE:MAX[:exp]")
+    policy_class = ExponentialPolicy if len(parts) == 4 else retry_policy.RetryPolicy
+    return name, policy_class(max_attempts=int(parts[0]), base_delay=float(parts[1]), max_delay=float(parts[2]))
+
+def run_trial(policy, path, size, md5, args, rates, fault_at, seed):
+    """Upload the file once under policy and return the trial's measurements."""
+    schedule = FaultSchedule(rates, fault_at, seed, args.slow_seconds, args.retry_after)
+    server, endpoint = start_server(schedule)
+    youtube = build_fake_youtube_service(endpoint, timeout=args.timeout)
+
+    clock = VirtualClock(args.time_scale)
+    saved_time = retry_policy.time
+    retry_policy.time = clock
+    retry_policy._breakers.clear()
+    log = io.StringIO()
+    started = clock.monotonic()
+    response = None
+    error = None
+    try:
+        with mmap_media.MmapMediaUpload(path, 'video/mp4', chunksize=args.chunk_size, resumable=True) as media, \
+                contextlib.redirect_stdout(sys.stdout if args.verbose else log):
+            request = youtube.videos().insert(part='snippet,status', media_body=media, body={
+                'snippet': {'title': 'retry bench'}, 'status': {'privacyStatus': 'private'}})
+            while response is None:
+                _, response = retry_policy.call('youtube.upload', request.next_chunk, policy=policy)
+    except (retry_policy.RetryError, HttpError) as e:
+        error = e
+    finally:
+        retry_policy.time = saved_time
+        server.shutdown()
+        server.server_close()
+
+    elapsed = clock.monotonic() - started
+    state = server.state
+    complete = bool(response and response.get('fileDetails', {}).get('md5') == md5)
+    return {
+        'complete': complete,
+        'error': str(error) if error else None,
+        'seconds': elapsed,
+        'goodput': size / elapsed if complete and elapsed > 0 else 0.0,
+        'resent_bytes': max(0, state.bytes_received - size),
+        'backoff_seconds': clock.slept,
+        'chunk_requests': state.chunk_requests,
+        'faults': sum(state.faults.values())
+    }
+
+def percentile(values, fraction):
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+def make_test_file(size_mb):
+    f = tempfile.NamedTemporaryFile(prefix='retry_bench_', suffix='.mp4', delete=False)
+    with f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+    return f.name
+
+def file_md5(path):
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark resumable upload retry policies against injected faults.')
+    parser.add_argument('--policy', action='append', metavar='NAME|NAME=ATTEMPTS:BASE:MAX[:exp]',
+                        help=f"Policy to compare (repeatable; default: {', '.join(BUILTIN_POLICIES)})")
+    parser.add_argument('--faults', default='503=0.03,500=0.01,429=0.01,reset=0.02,partial=0.05,slow=0.01',
+                        help='Fault probabilities per chunk request (see tools/fake_youtube_server.py)')
+    parser.add_argument('--fault-at', help="Faults at fixed chunk request numbers, e.g. '3:503,4:503,5:reset'")
+    parser.add_argument('--slow-seconds', type=float, default=2.0, help="Delay of a 'slow' fault (default 2)")
+    parser.add_argument('--retry-after', type=float, help='Retry-After seconds sent with 429 faults')
+    parser.add_argument('--timeout', type=float, default=60.0, help='Client socket timeout in seconds (default 60)')
+    parser.add_argument('--file', help='File to upload (default: a generated file of --size-mb)')
+    parser.add_argument('--size-mb', type=int, default=32, help='Size of the generated file (default 32)')
+    parser.add_argument('--chunk-size', type=int, default=mmap_media.DEFAULT_CHUNK_SIZE,
+                        help='Resumable chunk size in bytes (default 1 MiB)')
+    parser.add_argument('--trials', type=int, default=10, help='Uploads per policy (default 10)')
+    parser.add_argument('--time-scale', type=float, default=0.0,
+                        help='Fraction of each backoff sleep actually slept (default 0)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help='Show the retry log of every trial')
+    args = parser.parse_args()
+
+    try:
+        policies = [parse_policy(value) for value in (args.policy or list(BUILTIN_POLICIES))]
+        rates = parse_fault_rates(args.faults)
+        fault_at = parse_fault_at(args.fault_at)
+    except ValueError as e:
+        parser.error(str(e))
+
+    path = args.file or make_test_file(args.size_mb)
+    try:
+        size = os.path.getsize(path)
+        md5 = file_md5(path)
+        print(f"Uploading {size / 1024 ** 2:.0f} MB in {args.chunk_size // 1024} KB chunks, "
+              f"{args.trials} trial(s) per policy, faults: {args.faults or 'none'}"
+              f"{', at ' + args.fault_at if args.fault_at else ''}")
+        print(f"{'policy':<14} {'success':>8} {'p50 s':>8} {'p90 s':>8} {'MB/s':>7} "
+              f"{'resent MB':>10} {'backoff s':>10} {'faults':>7}")
+        for name, policy in policies:
+            trials = [run_trial(policy, path, size, md5, args, rates, fault_at, args.seed + trial)
+                      for trial in range(args.trials)]
+            done = [t for t in trials if t['complete']]
+            times = [t['seconds'] for t in done]
+            mean = lambda key: sum(t[key] for t in trials) / len(trials)
+            print(f"{name:<14} {len(done) / len(trials):>8.0%} {percentile(times, 0.5):>8.1f} "
+                  f"{percentile(times, 0.9):>8.1f} {mean('goodput') / 1024 ** 2:>7.2f} "
+                  f"{mean('resent_bytes') / 1024 ** 2:>10.1f} {mean('backoff_seconds'):>10.1f} {mean('faults'):>7.1f}")
+            for trial in trials:
+                if trial['error']:
+                    print(f"  gave up: {trial['error'][:160]}")
+    finally:
+        if not args.file:
+            os.remove(path)
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,8 @@ import io
 import requests  # Added for Telegram API calls
 import shutil  # Added for file cleanup operations
 import random  # Added for random video selection
+import queue
+import threading
 
 # Set console encoding for proper emoji display
 if sys.stdout.encoding != 'utf-8':
@@ -23,16 +25,32 @@ if sys.stdout.encoding != 'utf-8':
 # Google Drive and Sheets APIs
 from googleapiclient.discovery import build
 from google.oauth2 import service_account
-from googleapiclient.http import MediaIoBaseDownload
 
 # YouTube upload related imports
 import google.oauth2.credentials
 import googleapiclient.discovery
-from googleapiclient.http import MediaFileUpload
 from googleapiclient.errors import HttpError
-import httplib2
-import random
-import http.client
+
+import upload_plan
+import row_lease
+import bandwidth
+import drive_download
+import retry_policy
+import share_link_fetcher
+import credential_pool
+import mp4_probe
+import folder_metadata
+import folder_facts
+import deadline_planner
+import sheet_snapshot
+import sheet_reader
+import publish_schedule
+import events
+import mmap_media
+import service_account_pool
+import rate_limits
+import scan_pipeline
+import failure_cooldown
 
 # Constants from Google Drive script
 DRIVE_SHEETS_SCOPES = ['https://www.googleapis.com/auth/drive', 
@@ -41,13 +59,10 @@ EXISTING_SHEET_ID = '15QuEt5e2LrrZljaDSp-YbY96nzMmD7MH6TEVsdyrXyw'
 TARGET_FOLDER_NAME = 'GeminiStories'
 TEMP_DIR = 'temp_download'
 
+# Only these are downloaded to disk; title/description/tags are read into memory
+MEDIA_FILES = ('video.mp4', 'thumbnail.jpg')
+
 # YouTube upload constants
-RETRIABLE_STATUS_CODES = [500, 502, 503, 504]
-RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, IOError, http.client.NotConnected,
-                        http.client.IncompleteRead, http.client.ImproperConnectionState,
-                        http.client.CannotSendRequest, http.client.CannotSendHeader,
-                        http.client.ResponseNotReady, http.client.BadStatusLine)
-MAX_RETRIES = 10
 YOUTUBE_API_SERVICE_NAME = "youtube"
 YOUTUBE_API_VERSION = "v3"
 VALID_PRIVACY_STATUSES = ("public", "private", "unlisted")
@@ -67,43 +82,33 @@ UPLOAD_TRACKING_COLUMNS = [
     'YouTube URL',      # Full video URL
     'YouTube Channel',  # Channel name used
     'YouTube Video ID', # Video ID
-    'Error Message'     # Only populated if failed
+    'Error Message',    # Only populated if failed
+    'Lease Owner',      # Runner currently uploading this row
+    'Lease Expires',    # When that runner's claim lapses (UTC)
+    'Publish At',       # Scheduled public release (burst mode), UTC
+    'Failure Count',    # Failed attempts since the last successful upload
+    'Last Error Class', # What the last attempt failed with
+    'Next Eligible At'  # When a failed row may be tried again (UTC), or Quarantined
 ]
 
+# Columns that selection and --upload-history read; the rest of each row is never fetched
+SELECTION_COLUMNS = ['Folder ID', 'Subfolder Name'] + UPLOAD_TRACKING_COLUMNS + ['Ready', 'Video Size']
+
 def get_google_drive_credentials():
     """Get credentials for Google Drive and Sheets API."""
     # Google Drive link for credentials.json
     CREDENTIALS_DRIVE_LINK = "https://drive.google.com/file/d/10geScM7zk-QMCNG-WBXMQpoFVQOoFILL/view?usp=sharing"
     credentials_file = os.path.join('gd', 'credentials.json')
     
-    # Try to download from Google Drive first
+    # Try to download from Google Drive first (cached, revalidated with a conditional request)
     try:
         print("Downloading Google Drive credentials from Google Drive...")
+        downloaded_file = share_link_fetcher.fetch(CREDENTIALS_DRIVE_LINK)
         
-        # Convert view URL to direct download URL
-        file_id = CREDENTIALS_DRIVE_LINK.split('/d/')[1].split('/view')[0]
-        download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-        
-        # Create temp directory if it doesn't exist
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        temp_credentials_file = os.path.join(TEMP_DIR, 'temp_credentials.json')
-        
-        # Download the file
-        response = requests.get(download_url)
-        if response.status_code == 200:
-            with open(temp_credentials_file, 'wb') as f:
-                f.write(response.content)
-            
-            # Load the credentials from the downloaded file
-            credentials = service_account.Credentials.from_service_account_file(
-                temp_credentials_file, scopes=DRIVE_SHEETS_SCOPES)
-            
-            # Clean up the temporary file
-            os.remove(temp_credentials_file)
-            return credentials
-        else:
-            print(f"Failed to download credentials from Google Drive: {response.status_code}")
-            # Fall back to local file
+        # Load the credentials from the downloaded file
+        credentials = service_account.Credentials.from_service_account_file(
+            downloaded_file, scopes=DRIVE_SHEETS_SCOPES)
+        return service_account_pool.pooled(credentials, DRIVE_SHEETS_SCOPES)
     except Exception as e:
         print(f"Error downloading credentials from Google Drive: {e}")
         # Fall back to local file
@@ -113,7 +118,7 @@ def get_google_drive_credentials():
         print("Using local credentials file...")
         credentials = service_account.Credentials.from_service_account_file(
             credentials_file, scopes=DRIVE_SHEETS_SCOPES)
-        return credentials
+        return service_account_pool.pooled(credentials, DRIVE_SHEETS_SCOPES)
     else:
         raise FileNotFoundError(f"Google Drive credentials file not found: {credentials_file}")
 
@@ -133,29 +138,11 @@ def get_youtube_credentials(channel_id=None, channel_name=None):
     mappings = None
     try:
         print("Downloading channel mappings from Google Drive...")
+        downloaded_file = share_link_fetcher.fetch(MAPPINGS_DRIVE_LINK)
         
-        # Convert view URL to direct download URL
-        file_id = MAPPINGS_DRIVE_LINK.split('/d/')[1].split('/view')[0]
-        download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-        
-        # Create temp directory if it doesn't exist
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        temp_mappings_file = os.path.join(TEMP_DIR, 'temp_channel_mappings.json')
-        
-        # Download the file
-        response = requests.get(download_url)
-        if response.status_code == 200:
-            with open(temp_mappings_file, 'wb') as f:
-                f.write(response.content)
-            
-            # Load the mappings from the downloaded file
-            with open(temp_mappings_file, 'r') as f:
-                mappings = json.load(f)
-            
-            # Clean up the temporary file
-            os.remove(temp_mappings_file)
-        else:
-            print(f"Failed to download channel mappings from Google Drive: {response.status_code}")
+        # Load the mappings from the downloaded file
+        with open(downloaded_file, 'r') as f:
+            mappings = json.load(f)
     except Exception as e:
         print(f"Error downloading channel mappings from Google Drive: {e}")
     
@@ -200,43 +187,26 @@ def get_youtube_credentials(channel_id=None, channel_name=None):
     if not channel_title:
         raise ValueError("No matching YouTube channel found.")
     
-    # Download credentials from Google Drive instead of using local file
-    if drive_link:
-        print(f"Downloading credentials for {channel_title} from Google Drive...")
-        
-        # Convert view URL to direct download URL
-        file_id = drive_link.split('/d/')[1].split('/view')[0]
-        download_url = f"https://drive.google.com/uc?export=download&id={file_id}"
-        
-        # Create temp directory if it doesn't exist
-        os.makedirs(TEMP_DIR, exist_ok=True)
-        temp_token_file = os.path.join(TEMP_DIR, f"{channel_title.replace(' ', '_').lower()}_token.json")
-        
-        # Download the file
-        response = requests.get(download_url)
-        if response.status_code == 200:
-            with open(temp_token_file, 'wb') as f:
-                f.write(response.content)
-            
-            # Load the credentials from the downloaded file
-            with open(temp_token_file, 'r') as f:
-                creds_data = json.load(f)
-                credentials = google.oauth2.credentials.Credentials.from_authorized_user_info(creds_data)
-                
-            # Clean up the temporary file
-            os.remove(temp_token_file)
-            return credentials, channel_id, channel_title
-        else:
-            raise RuntimeError(f"Failed to download credentials from Google Drive: {response.status_code}")
-    elif os.path.exists(token_file):
-        # Fallback to local file if it exists
-        print(f"Using local credentials for {channel_title}...")
-        with open(token_file, 'r') as f:
-            creds_data = json.load(f)
-            credentials = google.oauth2.credentials.Credentials.from_authorized_user_info(creds_data)
-        return credentials, channel_id, channel_title
-    else:
+    if not drive_link and not os.path.exists(token_file):
         raise FileNotFoundError(f"Could not find credentials for channel: {channel_title}")
+    
+    def load_token_info():
+        # Only called when no live token is cached for this channel
+        if drive_link:
+            print(f"Downloading credentials for {channel_title} from Google Drive...")
+            try:
+                downloaded_file = share_link_fetcher.fetch(drive_link)
+            except Exception as e:
+                raise RuntimeError(f"Failed to download credentials from Google Drive: {e}")
+        else:
+            print(f"Using local credentials for {channel_title}...")
+            downloaded_file = token_file
+        with open(downloaded_file, 'r') as f:
+            return json.load(f)
+    
+    # The pool keeps one refreshed token per channel for the whole run
+    credentials = credential_pool.get_pool().get(channel_id, load_token_info)
+    return credentials, channel_id, channel_title
 
 def list_available_youtube_channels():
     """List all channels that have saved authentication tokens."""
@@ -287,59 +257,54 @@ def select_channel_interactive():
     print("Invalid selection.")
     return None, None
 
-def get_spreadsheet_data():
-    """Get all data from the Google Spreadsheet."""
+def get_spreadsheet_data(columns=None):
+    """Get the given columns (all if None) of every row, from the local snapshot if the sheet is unchanged.
+
+    'data' holds dict-like rows; 'headers' is always the sheet's full header row.
+    """
     credentials = get_google_drive_credentials()
     sheets_service = build('sheets', 'v4', credentials=credentials)
+    drive_service = build('drive', 'v3', credentials=credentials)
     
-    # Get spreadsheet headers
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=EXISTING_SHEET_ID,
-        range='Sheet1!1:1'  # Headers
-    ).execute()
-    
-    headers = result.get('values', [[]])[0]
-    
-    # Get all spreadsheet data
-    result = sheets_service.spreadsheets().values().get(
-        spreadsheetId=EXISTING_SHEET_ID,
-        range='Sheet1!A2:Z1000'  # All data (adjust range as needed)
-    ).execute()
-    
-    rows = result.get('values', [])
+    def fetch_sheet():
+        # Pages through the sheet's real size, fetching only the requested columns
+        return sheet_reader.read_columns(sheets_service, EXISTING_SHEET_ID, columns).to_json()
     
-    # Convert to list of dictionaries with column headers as keys
-    data = []
-    for row in rows:
-        # Pad row with empty strings if it's shorter than headers
-        row_padded = row + [''] * (len(headers) - len(row))
-        row_dict = {headers[i]: row_padded[i] for i in range(len(headers))}
-        data.append(row_dict)
+    # A cheap Drive revision check decides whether the full read is needed
+    variant = '\x1f'.join(columns) if columns else ''
+    data = sheet_reader.SheetRows.from_json(
+        sheet_snapshot.load(drive_service, EXISTING_SHEET_ID, fetch_sheet, variant))
     
     # Also return headers for easy reference
     return {
-        'headers': headers,
+        'headers': data.headers,
         'data': data,
         'row_count': len(data)
     }
 
-def update_spreadsheet_structure():
-    """Update the spreadsheet to include upload tracking columns if they don't exist."""
+def read_spreadsheet_row(row_index, headers):
+    """Read a single data row (0-based, header excluded) as a dict keyed by headers."""
+    credentials = get_google_drive_credentials()
+    sheets_service = build('sheets', 'v4', credentials=credentials)
+    return sheet_reader.read_row(sheets_service, EXISTING_SHEET_ID, row_index, headers)
+
+def update_spreadsheet_structure(required_columns=UPLOAD_TRACKING_COLUMNS):
+    """Update the spreadsheet to include upload tracking columns (or required_columns) if they don't exist."""
     credentials = get_google_drive_credentials()
     sheets_service = build('sheets', 'v4', credentials=credentials)
     
     try:
         # Get the current headers
-        result = sheets_service.spreadsheets().values().get(
+        result = retry_policy.execute(sheets_service.spreadsheets().values().get(
             spreadsheetId=EXISTING_SHEET_ID,
             range='Sheet1!1:1'  # First row (headers)
-        ).execute()
+        ), 'sheets.read')
         
         headers = result.get('values', [[]])[0]
         
         # Check which columns we need to add
         columns_to_add = []
-        for col in UPLOAD_TRACKING_COLUMNS:
+        for col in required_columns:
             if col not in headers:
                 columns_to_add.append(col)
         
@@ -354,12 +319,12 @@ def update_spreadsheet_structure():
             'values': [new_headers]
         }
         
-        response = sheets_service.spreadsheets().values().update(
+        response = retry_policy.execute(sheets_service.spreadsheets().values().update(
             spreadsheetId=EXISTING_SHEET_ID,
             range='Sheet1!1:1',  # First row
             valueInputOption='RAW',
             body=body
-        ).execute()
+        ), 'sheets.write')
         
         print(f"Updated spreadsheet structure, added columns: {', '.join(columns_to_add)}")
         return True
@@ -368,8 +333,45 @@ def update_spreadsheet_structure():
         print(f"Error updating spreadsheet structure: {e}")
         return False
 
-def download_files_from_folder(folder_id, folder_name):
-    """Download all files from a Google Drive folder."""
+def preflight_video(session, file, file_path, channel=None):
+    """Check that video.mp4 is a sound MP4 before it is downloaded or uploaded.
+
+    Raises mp4_probe.Mp4ProbeError for empty, truncated or non-MP4 files.
+    """
+    if drive_download.is_complete(file_path, file.get('size')):
+        probe_fn = lambda: mp4_probe.probe_local(file_path)
+    else:
+        # Only the head and tail of the file travel over the network
+        probe_fn = lambda: mp4_probe.probe_drive(session, file['id'], file.get('size'), channel)
+    try:
+        info = mp4_probe.cached_probe(file['id'], file.get('md5Checksum'), probe_fn)
+    except mp4_probe.Mp4ProbeError:
+        raise
+    except Exception as e:
+        # The probe could not reach Drive; the download itself will retry and verify
+        print(f"Warning: Could not preflight {file['name']}: {e}")
+        return None
+    print(f"Preflight OK for {file['name']}: {mp4_probe.describe(info)}")
+    return info
+
+def prefetch_folder_metadata(folder_ids):
+    """List the selected folders and read their title/description/tags in one go."""
+    try:
+        credentials = get_google_drive_credentials()
+        drive_service = build('drive', 'v3', credentials=credentials)
+        folder_metadata.prefetch(drive_service, drive_download.create_session(credentials), folder_ids)
+    except Exception as e:
+        # Each folder is fetched on its own when it is processed instead
+        print(f"Warning: Could not prefetch folder metadata: {e}")
+
+def download_files_from_folder(folder_id, folder_name, channel=None, transfer=None):
+    """Download a folder's video and thumbnail, paced by the shared download budget.
+
+    Returns (files, texts): local paths by file name, and the metadata text files
+    by name, read into memory. Returns (None, None) on failure. If transfer is a
+    dict, the bytes fetched in this run and the time spent fetching them are
+    added to its 'bytes' and 'seconds' (files already on disk count for neither).
+    """
     credentials = get_google_drive_credentials()
     drive_service = build('drive', 'v3', credentials=credentials)
     
@@ -378,69 +380,69 @@ def download_files_from_folder(folder_id, folder_name):
     os.makedirs(folder_path, exist_ok=True)
     
     try:
-        # Get all files in the folder
-        query = f"'{folder_id}' in parents and trashed=false"
-        results = drive_service.files().list(
-            q=query,
-            spaces='drive',
-            fields='files(id, name, mimeType, size)'
-        ).execute()
-        
-        files = results.get('files', [])
+        # Listing and metadata text usually arrive with the batch prefetch
+        session = drive_download.create_session(credentials)
+        folder = folder_metadata.get(drive_service, session, folder_id)
+        files = folder['files']
         
         if not files:
             print(f"No files found in folder {folder_name}")
-            return None
+            return None, None
             
         downloaded_files = {}
         
+        # Reject a broken video, or one that cannot finish in time, before spending bandwidth on the folder
+        for file in files:
+            if file['name'] == 'video.mp4':
+                deadline_planner.check(file.get('size'), folder_name)
+                preflight_video(session, file, os.path.join(folder_path, file['name']), channel)
+        
         for file in files:
             file_id = file['id']
             file_name = file['name']
             file_path = os.path.join(folder_path, file_name)
             
-            # Skip if file already exists
-            if os.path.exists(file_path):
+            if file_name not in MEDIA_FILES:
+                continue
+            
+            # Skip if a verified copy already exists (partial downloads live in .part files)
+            if drive_download.is_complete(file_path, file.get('size')):
                 print(f"File already exists: {file_path}")
                 downloaded_files[file_name] = file_path
                 continue
                 
+            transfer_started = time.monotonic()
             try:
-                request = drive_service.files().get_media(fileId=file_id)
-                
-                with open(file_path, 'wb') as f:
-                    downloader = MediaIoBaseDownload(f, request)
-                    done = False
-                    while not done:
-                        status, done = downloader.next_chunk()
-                        print(f"Downloading {file_name}: {int(status.progress() * 100)}%")
+                drive_download.download_drive_file(
+                    session, file_id, file_path,
+                    expected_size=file.get('size'),
+                    expected_md5=file.get('md5Checksum'),
+                    channel=channel,
+                    transfer=transfer
+                )
                 
                 downloaded_files[file_name] = file_path
                 
             except Exception as e:
                 print(f"Error downloading {file_name}: {e}")
+            finally:
+                if transfer is not None:
+                    transfer['seconds'] = transfer.get('seconds', 0.0) + time.monotonic() - transfer_started
         
-        return downloaded_files
+        return downloaded_files, folder['text']
         
+    except (mp4_probe.Mp4ProbeError, deadline_planner.DeadlineError):
+        raise
     except Exception as e:
         print(f"Error downloading files from folder {folder_name}: {e}")
-        return None
-
-def read_text_file(file_path, default=""):
-    """Read text content from a file, with a default if file doesn't exist."""
-    if not os.path.exists(file_path):
-        return default
-        
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return default
+        return None, None
 
 def upload_video_to_youtube(video_path, title, description, tags, category="22", 
-                          privacy_status="unlisted", credentials=None, channel_title=None):
-    """Upload a video to YouTube using the provided credentials."""
+                          privacy_status="unlisted", credentials=None, channel_title=None, publish_at=None):
+    """Upload a video to YouTube using the provided credentials.
+    
+    With publish_at (RFC 3339, UTC) the video is uploaded private and YouTube makes it public then.
+    """
     if not os.path.exists(video_path):
         raise FileNotFoundError(f"Video file not found: {video_path}")
         
@@ -467,21 +469,24 @@ def upload_video_to_youtube(video_path, title, description, tags, category="22",
         }
     }
     
-    # Prepare the media upload
-    media = MediaFileUpload(video_path, resumable=True,
-                           chunksize=1024*1024, mimetype='video/mp4')
-    
-    # Create the video insert request
-    insert_request = youtube.videos().insert(
-        part=",".join(body.keys()),
-        body=body,
-        media_body=media
-    )
-    
-    video_id = resumable_upload(insert_request, channel_title)
+    # Scheduled videos must be private until YouTube publishes them
+    if publish_at:
+        body['status'] = {'privacyStatus': 'private', 'publishAt': publish_at}
+    
+    # Prepare the media upload from a memory map, paced by the shared upload budget
+    with mmap_media.MmapMediaUpload(video_path, 'video/mp4', chunksize=1024*1024,
+                                    resumable=True, channel=channel_title) as media:
+        # Create the video insert request
+        insert_request = youtube.videos().insert(
+            part=",".join(body.keys()),
+            body=body,
+            media_body=media
+        )
+        
+        video_id = resumable_upload(insert_request, channel_title)
     return video_id
 
-def set_thumbnail(youtube, video_id, thumbnail_path):
+def set_thumbnail(youtube, video_id, thumbnail_path, channel=None):
     """Set a custom thumbnail for a YouTube video."""
     if not os.path.exists(thumbnail_path):
         print(f"Thumbnail file not found: {thumbnail_path}")
@@ -489,13 +494,12 @@ def set_thumbnail(youtube, video_id, thumbnail_path):
     
     try:
         # Upload the thumbnail
-        media = MediaFileUpload(thumbnail_path, mimetype='image/jpeg')
-        
-        # Set as video thumbnail
-        youtube.thumbnails().set(
-            videoId=video_id,
-            media_body=media
-        ).execute()
+        with mmap_media.MmapMediaUpload(thumbnail_path, 'image/jpeg', channel=channel) as media:
+            # Set as video thumbnail
+            retry_policy.execute(youtube.thumbnails().set(
+                videoId=video_id,
+                media_body=media
+            ), 'youtube.thumbnails')
         
         print(f"Custom thumbnail set for video ID: {video_id}")
         return True
@@ -505,10 +509,8 @@ def set_thumbnail(youtube, video_id, thumbnail_path):
         return False
 
 def resumable_upload(insert_request, channel_title=None):
-    """Execute the resumable upload with retry logic."""
+    """Execute the resumable upload; transient chunk failures are retried by retry_policy."""
     response = None
-    error = None
-    retry = 0
     
     # Identify which channel is being used for the upload
     channel_msg = f" to {channel_title}" if channel_title else ""
@@ -516,7 +518,8 @@ def resumable_upload(insert_request, channel_title=None):
     while response is None:
         try:
             print(f"Uploading video{channel_msg}...")
-            status, response = insert_request.next_chunk()
+            status, response = retry_policy.call('youtube.upload', insert_request.next_chunk,
+                                                 policy=retry_policy.UPLOAD_POLICY)
             if response is not None:
                 if 'id' in response:
                     video_id = response['id']
@@ -527,39 +530,27 @@ def resumable_upload(insert_request, channel_title=None):
                     print(f"Upload failed with unexpected response: {response}")
                     return None
         except HttpError as e:
-            if e.resp.status in RETRIABLE_STATUS_CODES:
-                error = f"A retriable HTTP error {e.resp.status} occurred:\n{e.content}"
-            else:
-                print(f"HTTP error {e.resp.status} occurred:\n{e.content}")
-                raise
-        except RETRIABLE_EXCEPTIONS as e:
-            error = f"A retriable error occurred: {e}"
-            
-        if error is not None:
-            print(error)
-            retry += 1
-            if retry > MAX_RETRIES:
-                print("No longer attempting to retry.")
-                return None
-                
-            max_sleep = 2 ** retry
-            sleep_seconds = random.random() * max_sleep
-            print(f"Sleeping {sleep_seconds:.1f} seconds and then retrying...")
-            time.sleep(sleep_seconds)
-            error = None
+            print(f"HTTP error {e.resp.status} occurred:\n{e.content}")
+            raise
+        except retry_policy.RetryError as e:
+            print(f"Upload failed: {e}")
+            # The caller records what actually went wrong, not that retries ran out
+            raise e.last_error or e
     
     return None
 
-def update_spreadsheet_row(row_index, video_id, channel_title, status="Yes", error_message=""):
-    """Update a specific row in the spreadsheet with upload details."""
+def update_spreadsheet_row(row_index, video_id, channel_title, status="Yes", error_message="", publish_at=None,
+                           failure=None):
+    """Update a specific row in the spreadsheet with upload details.
+    failure holds the failure_cooldown column values to write; None leaves them as they are."""
     credentials = get_google_drive_credentials()
     sheets_service = build('sheets', 'v4', credentials=credentials)
     
     # First get current headers to know which columns to update
-    result = sheets_service.spreadsheets().values().get(
+    result = retry_policy.execute(sheets_service.spreadsheets().values().get(
         spreadsheetId=EXISTING_SHEET_ID,
         range='Sheet1!1:1'  # Headers
-    ).execute()
+    ), 'sheets.read')
     
     headers = result.get('values', [[]])[0]
     
@@ -577,7 +568,7 @@ def update_spreadsheet_row(row_index, video_id, channel_title, status="Yes", err
     updates = []
     for col, idx in column_indices.items():
         # Calculate the cell reference (A1 notation)
-        col_letter = chr(65 + idx)  # A=65, B=66, etc.
+        col_letter = sheet_reader.column_letter(idx)
         cell_ref = f"Sheet1!{col_letter}{row_index+2}"  # +2 because row_index is 0-based and we skip header
         
         # Determine the value based on column
@@ -593,6 +584,10 @@ def update_spreadsheet_row(row_index, video_id, channel_title, status="Yes", err
             value = video_id or ""
         elif col == 'Error Message':
             value = error_message
+        elif col == 'Publish At':
+            value = publish_at or ""
+        elif col in failure_cooldown.FAILURE_COLUMNS and failure is not None:
+            value = failure[col]
         else:
             continue
         
@@ -608,10 +603,10 @@ def update_spreadsheet_row(row_index, video_id, channel_title, status="Yes", err
     }
     
     try:
-        response = sheets_service.spreadsheets().values().batchUpdate(
+        response = retry_policy.execute(sheets_service.spreadsheets().values().batchUpdate(
             spreadsheetId=EXISTING_SHEET_ID,
             body=body
-        ).execute()
+        ), 'sheets.write')
         
         print(f"Updated spreadsheet row {row_index+2} with upload status.")
         return True
@@ -619,13 +614,14 @@ def update_spreadsheet_row(row_index, video_id, channel_title, status="Yes", err
         print(f"Error updating spreadsheet: {e}")
         return False
 
-def send_telegram_notification(video_id, title, channel_title, folder_name):
+def send_telegram_notification(video_id, title, channel_title, folder_name, publish_at=None):
     """Send a notification to Telegram when a video is uploaded."""
     if not TELEGRAM_NOTIFICATIONS_ENABLED:
         return
         
     try:
         video_url = f"https://www.youtube.com/watch?v={video_id}"
+        schedule_line = f"\n🕒 Goes public: {publish_at}" if publish_at else ""
         
         # Create notification message with simplified format to avoid Markdown parsing errors
         message = f"""🚨 Hey Boss! 🍇🌾
@@ -635,7 +631,7 @@ Just spotted some fresh fruits 🍉 — check out this new video we just harvest
 
 📝 Title: {title}
 📂 Folder: {folder_name}
-📺 Channel: {channel_title}
+📺 Channel: {channel_title}{schedule_line}
 🔗 Watch here: {video_url}
 
 Your pipeline is working like magic 🪄 — smooth, steady, and strong 💪.  
@@ -653,7 +649,9 @@ Stay tuned for the next harvest 🌟
             "parse_mode": "Markdown"
         }
         
-        response = requests.post(url, json=payload, timeout=10)
+        response = retry_policy.call(
+            'telegram', lambda: retry_policy.check_response(requests.post(url, json=payload, timeout=10)),
+            rate_key=TELEGRAM_CHAT_ID)
         
         if response.status_code == 200:
             print(f"✅ Telegram notification sent successfully")
@@ -677,7 +675,8 @@ def cleanup_downloaded_files(folder_path):
         print(f"⚠️ Error cleaning up files: {e}")
 
 def process_folder_for_upload(folder_data, row_index, channel_id=None, channel_name=None):
-    """Process a single folder for upload to YouTube."""
+    """Process a single folder for upload to YouTube.
+    Returns None when the video was left alone because it would miss the deadline."""
     folder_id = folder_data.get('Folder ID', '')
     folder_name = folder_data.get('Subfolder Name', '')
     
@@ -692,38 +691,77 @@ def process_folder_for_upload(folder_data, row_index, channel_id=None, channel_n
     
     print(f"\nProcessing folder: {folder_name} (ID: {folder_id})")
     
+    def fail(stage, error_msg, channel_title=None, error=None):
+        """Record a failed row in the sheet and the event stream, and start the row's cool-down."""
+        # Missing channel credentials are not the folder's fault and do not count against it
+        failure = None
+        if stage != 'credentials':
+            failure = failure_cooldown.record_failure(folder_data, type(error).__name__ if error else stage)
+        update_spreadsheet_row(row_index, None, channel_title, "Failed", error_msg, failure=failure)
+        events.emit('failed', row=row_index + 2, folder_id=folder_id, folder_name=folder_name,
+                    channel=channel_title, stage=stage, error=error_msg,
+                    error_class=type(error).__name__ if error else None,
+                    next_eligible_at=failure[failure_cooldown.NEXT_ELIGIBLE_COLUMN] if failure else None)
+        return False
+    
+    # Get YouTube credentials first so the token is refreshed before the transfer, not during it
+    try:
+        credentials, actual_channel_id, channel_title = get_youtube_credentials(channel_id, channel_name)
+    except Exception as e:
+        return fail('credentials', f"Failed to get YouTube credentials: {str(e)}", error=e)
+    
     # Download files from the folder
-    files = download_files_from_folder(folder_id, folder_name)
+    folder_started = download_started = time.monotonic()
+    # Only bytes actually fetched, and the time spent fetching them, feed the throughput estimate
+    transfer = {'bytes': 0, 'seconds': 0.0}
+    try:
+        files, texts = download_files_from_folder(folder_id, folder_name, channel=channel_title, transfer=transfer)
+    except deadline_planner.DeadlineError as e:
+        print(f"Skipping {folder_name}: {e}")
+        events.emit('skipped', row=row_index + 2, folder_id=folder_id, reason='deadline', error=str(e))
+        return None
+    except mp4_probe.Mp4ProbeError as e:
+        error_msg = f"video.mp4 failed preflight: {e}"
+        print(f"❌ {error_msg}")
+        return fail('preflight', error_msg, error=e)
     
     if not files:
-        error_msg = "Failed to download files from folder."
-        update_spreadsheet_row(row_index, None, None, "Failed", error_msg)
-        return False
+        return fail('download', "Failed to download files from folder.")
     
     # Check if we have the required files
     if 'video.mp4' not in files:
-        error_msg = "No video.mp4 file found in folder."
-        update_spreadsheet_row(row_index, None, None, "Failed", error_msg)
-        return False
+        return fail('download', "No video.mp4 file found in folder.")
     
-    # Extract metadata from text files
     video_path = files.get('video.mp4')
-    title = read_text_file(files.get('title.txt', ''), folder_name)
-    description = read_text_file(files.get('description.txt', ''), f"Video from {folder_name}")
-    tags = read_text_file(files.get('tags.txt', ''), folder_name)
+    video_bytes = os.path.getsize(video_path)
+    download_bytes = sum(os.path.getsize(path) for path in files.values())
+    download_seconds = time.monotonic() - download_started
+    events.emit('downloaded', row=row_index + 2, folder_id=folder_id, files=sorted(files),
+                bytes=download_bytes, seconds=round(download_seconds, 3))
     
-    # Get YouTube credentials
-    try:
-        credentials, actual_channel_id, channel_title = get_youtube_credentials(channel_id, channel_name)
-    except Exception as e:
-        error_msg = f"Failed to get YouTube credentials: {str(e)}"
-        update_spreadsheet_row(row_index, None, None, "Failed", error_msg)
-        return False
+    # Metadata text was read into memory with the folder listing
+    title = texts.get('title.txt') or folder_name
+    description = texts.get('description.txt') or f"Video from {folder_name}"
+    tags = texts.get('tags.txt') or folder_name
     
     # Create YouTube API service
     youtube = build(YOUTUBE_API_SERVICE_NAME, YOUTUBE_API_VERSION, credentials=credentials)
     
+    # In burst mode the video goes up private and becomes public at the channel's next slot
+    publish_at = slot = None
+    if publish_schedule.is_enabled():
+        slot = publish_schedule.next_slot(channel_title)
+        publish_at = publish_schedule.format_publish_at(slot)
+        print(f"Scheduling {folder_name} to go public at {publish_at}")
+    
+    def release_slot():
+        # No video was created, so the next upload can have this publish time
+        if slot is not None:
+            publish_schedule.release(channel_title, slot)
+    
     # Upload the video
+    upload_started = time.monotonic()
+    video_id = None
     try:
         video_id = upload_video_to_youtube(
             video_path=video_path,
@@ -732,18 +770,28 @@ def process_folder_for_upload(folder_data, row_index, channel_id=None, channel_n
             tags=tags,
             privacy_status="public",  # Default to unlisted
             credentials=credentials,
-            channel_title=channel_title
+            channel_title=channel_title,
+            publish_at=publish_at
         )
+        upload_seconds = time.monotonic() - upload_started
         
         if video_id:
             # Set thumbnail if available
             if 'thumbnail.jpg' in files:
                 thumbnail_path = files.get('thumbnail.jpg')
-                set_thumbnail(youtube, video_id, thumbnail_path)
+                set_thumbnail(youtube, video_id, thumbnail_path, channel=channel_title)
             
             # Update spreadsheet with success
-            update_spreadsheet_row(row_index, video_id, channel_title, "Yes")
-            send_telegram_notification(video_id, title, channel_title, folder_name)
+            update_spreadsheet_row(row_index, video_id, channel_title, "Yes", publish_at=publish_at,
+                                   failure=failure_cooldown.cleared())
+            send_telegram_notification(video_id, title, channel_title, folder_name, publish_at=publish_at)
+            events.emit('uploaded', row=row_index + 2, folder_id=folder_id, folder_name=folder_name,
+                        channel=channel_title, video_id=video_id, bytes=video_bytes, publish_at=publish_at,
+                        seconds=round(time.monotonic() - upload_started, 3))
+            
+            # Measured rates let later deadline checks predict transfer times
+            deadline_planner.record(transfer['bytes'], transfer['seconds'], video_bytes, upload_seconds,
+                                    time.monotonic() - folder_started)
             
             # Clean up downloaded files
             folder_path = os.path.join(TEMP_DIR, folder_name)
@@ -751,64 +799,139 @@ def process_folder_for_upload(folder_data, row_index, channel_id=None, channel_n
             
             return True
         else:
-            error_msg = "Upload failed with unknown error."
-            update_spreadsheet_row(row_index, None, channel_title, "Failed", error_msg)
-            return False
+            release_slot()
+            return fail('upload', "Upload failed with unknown error.", channel_title)
             
     except Exception as e:
+        if not video_id:
+            release_slot()
         error_msg = f"Upload failed: {str(e)}"
-        update_spreadsheet_row(row_index, None, channel_title, "Failed", error_msg)
-        return False
+        reason = retry_policy.http_error_reason(e) if isinstance(e, HttpError) else ''
+        if reason in events.QUOTA_REASONS:
+            # Not this video's fault: end the run instead of moving on to the next video
+            update_spreadsheet_row(row_index, None, channel_title, "Failed", error_msg)
+            events.emit('quota_exhausted', row=row_index + 2, folder_id=folder_id,
+                        channel=channel_title, reason=reason)
+            return False
+        return fail('upload', error_msg, channel_title, error=e)
+
+def eligible_rows(candidates):
+    """Leave out (row_index, row) candidates that are cooling down or quarantined after failed uploads."""
+    now = time.time()
+    eligible = [candidate for candidate in candidates if failure_cooldown.is_eligible(candidate[1], now)]
+    held = [data for _, data in candidates if not failure_cooldown.is_eligible(data, now)]
+    if held:
+        quarantined = sum(1 for data in held if failure_cooldown.is_quarantined(data))
+        print(f"Leaving out {len(held) - quarantined} rows cooling down after failed uploads "
+              f"and {quarantined} quarantined rows.")
+    return eligible
+
+def process_leased_row(headers, row_index, folder_data, channel_id=None, channel_name=None):
+    """Lease a sheet row, upload its folder and release the lease.
+    Returns None when the row was not attempted (another runner holds it, or it would miss the deadline)."""
+    credentials = get_google_drive_credentials()
+    sheets_service = build('sheets', 'v4', credentials=credentials)
+    
+    folder_id = folder_data.get('Folder ID', '')
+    if not row_lease.try_claim(sheets_service, EXISTING_SHEET_ID, row_index, headers, folder_id=folder_id):
+        print(f"Skipping {folder_data.get('Subfolder Name', '')}: claimed by another uploader.")
+        events.emit('skipped', row=row_index + 2, folder_id=folder_id, reason='claimed')
+        return None
+    
+    events.emit('selected', row=row_index + 2, folder_id=folder_id,
+                folder_name=folder_data.get('Subfolder Name', ''), channel=channel_name or channel_id)
+    try:
+        # A slow or rate-limited transfer can outlast one lease, so keep pushing it forward meanwhile
+        with row_lease.LeaseRenewer(build('sheets', 'v4', credentials=credentials), EXISTING_SHEET_ID,
+                                    row_index, headers):
+            return process_folder_for_upload(folder_data, row_index, channel_id, channel_name)
+    finally:
+        row_lease.release(sheets_service, EXISTING_SHEET_ID, row_index, headers)
 
 def process_unuploaded_videos(channel_id=None, channel_name=None, limit=None, random_selection=False):
     """Process all unuploaded videos from the spreadsheet."""
     # First ensure the spreadsheet has the necessary columns
     if not update_spreadsheet_structure():
         print("Failed to update spreadsheet structure. Aborting.")
+        events.emit('error', stage='sheet_structure', error="Failed to update spreadsheet structure")
         return False
     
-    # Get all spreadsheet data
-    spreadsheet_data = get_spreadsheet_data()
-    
-    if not spreadsheet_data:
-        print("Failed to get spreadsheet data. Aborting.")
+    # Get the columns selection needs
+    try:
+        spreadsheet_data = get_spreadsheet_data(SELECTION_COLUMNS)
+    except Exception as e:
+        print(f"Failed to get spreadsheet data: {e}. Aborting.")
+        events.emit('error', stage='sheet_read', error=str(e))
         return False
     
-    # Filter for unuploaded videos only
+    # Filter for unuploaded videos only, leaving out rows another runner is uploading right now,
+    # rows the Drive scan found not ready and rows cooling down after failed attempts
+    runner_id = row_lease.get_runner_id()
     unuploaded_videos = [
         (i, data) for i, data in enumerate(spreadsheet_data['data'])
-        if data.get('Upload Status', '') != 'Yes'
+        if data.get('Upload Status', '') != 'Yes' and row_lease.is_claimable(data, runner_id)
+        and folder_facts.is_selectable(data)
     ]
+    unuploaded_videos = eligible_rows(unuploaded_videos)
     
     print(f"Found {len(unuploaded_videos)} unuploaded videos.")
     
     # Apply limit and random selection if specified
     if unuploaded_videos:
         if random_selection and limit:
-            # Randomly select videos up to the limit
+            # Walk the rows in random order until enough of them have been claimed
             if limit > len(unuploaded_videos):
                 limit = len(unuploaded_videos)
             
             print(f"Randomly selecting {limit} videos for upload.")
-            selected_videos = random.sample(unuploaded_videos, limit)
-            selected_videos.sort(key=lambda x: x[0])  # Sort by row index for consistent processing
+            candidates = random.sample(unuploaded_videos, len(unuploaded_videos))
         else:
             # Take the first N videos based on limit
-            selected_videos = unuploaded_videos[:limit] if limit else unuploaded_videos
+            candidates = unuploaded_videos
+        
+        # Videos the scan already checked go first; the sort keeps the order within each group
+        candidates = sorted(candidates, key=lambda candidate: folder_facts.readiness_rank(candidate[1]))
+        
+        # With a deadline, keep only the videos whose predicted transfer times add up before it
+        if deadline_planner.is_enabled():
+            packed = deadline_planner.pack(candidates, lambda candidate: candidate[1].get('Video Size'))
+            print(f"{len(packed)} of {len(candidates)} videos fit in the "
+                  f"{deadline_planner.remaining() / 60:.0f} minutes before the deadline.")
+            candidates = packed
+            if not candidates:
+                events.emit('nothing_to_do', reason='deadline')
+                return False
+        
+        target = min(limit, len(candidates)) if limit else len(candidates)
+        print(f"Processing {target} videos{' (limited by --limit)' if limit else ''}.")
         
-        print(f"Processing {len(selected_videos)} videos{' (limited by --limit)' if limit else ''}.")
+        # One batched listing for the folders we expect to upload; replacements are fetched on demand
+        prefetch_folder_metadata([data.get('Folder ID', '') for _, data in candidates[:target]])
         
+        headers = spreadsheet_data['headers']
         success_count = 0
         fail_count = 0
         
-        for idx, (row_index, folder_data) in enumerate(selected_videos):
+        for row_index, folder_data in candidates:
+            if success_count + fail_count >= target:
+                break
+            if not deadline_planner.fits(folder_data.get('Video Size')):
+                print(f"Skipping {folder_data.get('Subfolder Name', '')}: would not finish before the deadline.")
+                continue
+            if events.quota_exhausted():
+                print("YouTube quota exhausted, not starting another upload.")
+                break
+            
             print(f"\n============================================================")
-            print(f"Processing {idx+1}/{len(selected_videos)}: {folder_data.get('Subfolder Name', '')}")
+            print(f"Processing {success_count+fail_count+1}/{target}: {folder_data.get('Subfolder Name', '')}")
             print(f"============================================================\n")
             
-            result = process_folder_for_upload(folder_data, row_index, channel_id, channel_name)
+            result = process_leased_row(headers, row_index, folder_data, channel_id, channel_name)
             
-            if result:
+            if result is None:
+                # Another runner claimed this row first, try the next candidate
+                continue
+            elif result:
                 success_count += 1
             else:
                 fail_count += 1
@@ -824,14 +947,262 @@ def process_unuploaded_videos(channel_id=None, channel_name=None, limit=None, ra
         return success_count > 0
     else:
         print("No unuploaded videos found.")
+        events.emit('nothing_to_do', reason='no_unuploaded_rows')
+        return False
+
+def scan_and_upload(channel_id=None, channel_name=None, limit=None):
+    """Scan Drive for new folders and upload them as they are found, along with the sheet's unuploaded rows.
+    New folders are appended to the sheet in the background; existing rows are not rewritten or re-sorted."""
+    columns = scan_pipeline.BASIC_COLUMNS + UPLOAD_TRACKING_COLUMNS + folder_facts.FACT_COLUMNS
+    if not update_spreadsheet_structure(columns):
+        print("Failed to update spreadsheet structure. Aborting.")
+        events.emit('error', stage='sheet_structure', error="Failed to update spreadsheet structure")
+        return False
+
+    try:
+        spreadsheet_data = get_spreadsheet_data(SELECTION_COLUMNS)
+    except Exception as e:
+        print(f"Failed to get spreadsheet data: {e}. Aborting.")
+        events.emit('error', stage='sheet_read', error=str(e))
+        return False
+    
+    headers = spreadsheet_data['headers']
+
+    credentials = get_google_drive_credentials()
+    parent_id = scan_pipeline.find_folder(build('drive', 'v3', credentials=credentials), TARGET_FOLDER_NAME)
+    if not parent_id:
+        print(f"{TARGET_FOLDER_NAME} folder not found. Aborting.")
+        events.emit('error', stage='scan', error=f"{TARGET_FOLDER_NAME} folder not found")
         return False
 
+    runner_id = row_lease.get_runner_id()
+    known_folder_ids = [data.get('Folder ID', '') for data in spreadsheet_data['data']]
+    existing = [
+        (i, data) for i, data in enumerate(spreadsheet_data['data'])
+        if data.get('Upload Status', '') != 'Yes' and row_lease.is_claimable(data, runner_id)
+        and folder_facts.is_selectable(data)
+    ]
+    existing = eligible_rows(existing)
+    existing.sort(key=lambda candidate: folder_facts.readiness_rank(candidate[1]))
+    print(f"Found {len(existing)} unuploaded videos in the spreadsheet; scanning {TARGET_FOLDER_NAME} for new ones.")
+
+    # The scanner and the appender each get their own services: an httplib2 connection is not thread-safe
+    appender = scan_pipeline.SheetAppender(build('sheets', 'v4', credentials=credentials), EXISTING_SHEET_ID,
+                                           headers, TARGET_FOLDER_NAME)
+    found = queue.Queue()
+
+    def scan():
+        try:
+            drive_service = build('drive', 'v3', credentials=credentials)
+            session = drive_download.create_session(credentials)
+            for folder in scan_pipeline.iter_new_folders(drive_service, session, parent_id, known_folder_ids):
+                facts = folder['facts']
+                print(f"New folder {folder['name']}: {len(folder['files'])} files, ready: {facts.get('Ready') or 'unknown'}")
+                found.put((folder, appender.add(folder)))
+        except Exception as e:
+            print(f"Error scanning {TARGET_FOLDER_NAME}: {e}")
+            events.emit('error', stage='scan', error=str(e))
+        finally:
+            found.put(None)
+
+    scanner = threading.Thread(target=scan, daemon=True)
+    scanner.start()
+
+    def next_candidate():
+        """The next new folder if the scan has one waiting, else the next existing row, else wait for the scan."""
+        nonlocal scanning
+        while scanning:
+            try:
+                item = found.get(block=not existing)
+            except queue.Empty:
+                break
+            if item is None:
+                scanning = False
+                break
+            folder, row_future = item
+            folder_data = dict(zip(headers, scan_pipeline.folder_row(headers, folder, TARGET_FOLDER_NAME)))
+            if not folder_facts.is_selectable(folder_data):
+                continue
+            try:
+                row_index = row_future.result()
+            except Exception:
+                # Not in the sheet, so it cannot be leased; the next scan adds it again
+                events.emit('skipped', folder_id=folder['id'], reason='sheet_append')
+                continue
+            return row_index, folder_data
+        return existing.pop(0) if existing else None
+
+    scanning = True
+    success_count = 0
+    fail_count = 0
+
+    while not limit or success_count + fail_count < limit:
+        candidate = next_candidate()
+        if candidate is None:
+            break
+        row_index, folder_data = candidate
+        if not deadline_planner.fits(folder_data.get('Video Size')):
+            print(f"Skipping {folder_data.get('Subfolder Name', '')}: would not finish before the deadline.")
+            continue
+        if events.quota_exhausted():
+            print("YouTube quota exhausted, not starting another upload.")
+            break
+
+        print(f"\n============================================================")
+        print(f"Processing {success_count+fail_count+1}{f'/{limit}' if limit else ''}: {folder_data.get('Subfolder Name', '')}")
+        print(f"============================================================\n")
+
+        result = process_leased_row(headers, row_index, folder_data, channel_id, channel_name)
+
+        if result is None:
+            continue
+        elif result:
+            success_count += 1
+        else:
+            fail_count += 1
+
+    # Let the scan finish so every new folder is in the sheet for the next run
+    scanner.join()
+    appender.close()
+
+    print(f"\n============================================================")
+    print(f"Scan and Upload Summary")
+    print(f"============================================================")
+    print(f"New folders added to the spreadsheet: {appender.appended}")
+    print(f"Total processed: {success_count + fail_count}")
+    print(f"Successful: {success_count}")
+    print(f"Failed: {fail_count}")
+    print(f"============================================================\n")
+
+    if not success_count and not fail_count:
+        events.emit('nothing_to_do', reason='no_unuploaded_rows')
+    return success_count > 0
+
+def plan_daily_uploads(channel_counts_str, replan=False):
+    """Shuffle the unuploaded rows once and assign them to channels for today."""
+    plan_path = upload_plan.plan_path_for_day()
+    
+    if os.path.exists(plan_path) and not replan:
+        print(f"Today's upload plan already exists: {plan_path} (use --replan to rebuild it)")
+        return True
+    
+    try:
+        channel_counts = upload_plan.parse_channel_counts(channel_counts_str)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    
+    if not update_spreadsheet_structure():
+        print("Failed to update spreadsheet structure. Aborting.")
+        events.emit('error', stage='sheet_structure', error="Failed to update spreadsheet structure")
+        return False
+    
+    try:
+        spreadsheet_data = get_spreadsheet_data()
+    except Exception as e:
+        print(f"Failed to get spreadsheet data: {e}. Aborting.")
+        events.emit('error', stage='sheet_read', error=str(e))
+        return False
+    
+    unuploaded_videos = [
+        (i, data) for i, data in enumerate(spreadsheet_data['data'])
+        if data.get('Upload Status', '') != 'Yes' and folder_facts.is_selectable(data)
+    ]
+    unuploaded_videos = eligible_rows(unuploaded_videos)
+    
+    plan = upload_plan.create_plan(spreadsheet_data['headers'], unuploaded_videos, channel_counts, plan_path)
+    
+    # Read every planned folder's metadata text now, in bulk, so upload runs skip those fetches
+    planned_folder_ids = [item['folder_id'] for entry in plan['channels'].values() for item in entry['queue']]
+    prefetch_folder_metadata(planned_folder_ids)
+    upload_plan.attach_metadata({folder_id: folder_metadata.get_text(folder_id) for folder_id in planned_folder_ids},
+                                plan_path)
+    
+    print(f"Planned uploads from {len(unuploaded_videos)} unuploaded videos ({plan_path}):")
+    for name, counts in upload_plan.summarize_plan(plan).items():
+        print(f"  - {name}: {counts['planned']} videos (requested {channel_counts[name]})")
+    
+    return True
+
+def process_planned_videos(channel_id=None, channel_name=None, limit=None):
+    """Upload the next videos assigned to a channel in today's plan."""
+    plan = upload_plan.load_plan()
+    
+    if not plan:
+        print("No upload plan for today. Run with --plan-day first.")
+        events.emit('error', stage='plan', error="No upload plan for today")
+        return False
+    
+    plan_channel = channel_name
+    if not plan_channel and channel_id:
+        _, _, plan_channel = get_youtube_credentials(channel_id=channel_id)
+    
+    headers = plan['headers']
+    owner = row_lease.get_runner_id()
+    success_count = 0
+    fail_count = 0
+    
+    for _ in range(limit or 1):
+        if events.quota_exhausted():
+            print("YouTube quota exhausted, not starting another upload.")
+            break
+        
+        if not deadline_planner.fits(0):
+            print("Not enough time left before the deadline to upload another video.")
+            events.emit('nothing_to_do', reason='deadline', channel=plan_channel)
+            break
+        
+        item = upload_plan.pop_next(plan_channel, owner)
+        
+        if item is None:
+            print(f"No planned videos left for {plan_channel}.")
+            events.emit('nothing_to_do', reason='plan_empty', channel=plan_channel)
+            break
+        
+        # Re-read only this row and make sure nobody touched it since planning
+        folder_data = read_spreadsheet_row(item['row_index'], headers)
+        if upload_plan.row_fingerprint(headers, folder_data) != item['fingerprint']:
+            print(f"Skipping {item['folder_name']}: row changed since the plan was made.")
+            upload_plan.complete(plan_channel, item, 'changed')
+            events.emit('skipped', row=item['row_index'] + 2, folder_id=item['folder_id'], reason='changed')
+            continue
+        
+        if not deadline_planner.fits(folder_data.get('Video Size')):
+            print(f"Skipping {item['folder_name']}: would not finish before the deadline.")
+            upload_plan.complete(plan_channel, item, 'deadline')
+            events.emit('skipped', row=item['row_index'] + 2, folder_id=item['folder_id'], reason='deadline')
+            continue
+        
+        if item.get('metadata') is not None:
+            folder_metadata.remember_text(item['folder_id'], item['metadata'])
+        
+        print(f"\n============================================================")
+        print(f"Processing planned video: {item['folder_name']}")
+        print(f"============================================================\n")
+        
+        result = process_leased_row(headers, item['row_index'], folder_data, channel_id, channel_name)
+        
+        if result is None:
+            upload_plan.complete(plan_channel, item, 'skipped')
+            continue
+        
+        upload_plan.complete(plan_channel, item, 'uploaded' if result else 'failed')
+        
+        if result:
+            success_count += 1
+        else:
+            fail_count += 1
+    
+    print(f"Planned uploads for {plan_channel}: {success_count} successful, {fail_count} failed.")
+    return success_count > 0
+
 def print_upload_history():
     """Print a summary of all previously uploaded videos."""
-    spreadsheet_data = get_spreadsheet_data()
-    
-    if not spreadsheet_data:
-        print("Failed to get spreadsheet data.")
+    try:
+        spreadsheet_data = get_spreadsheet_data(SELECTION_COLUMNS)
+    except Exception as e:
+        print(f"Failed to get spreadsheet data: {e}")
+        events.emit('error', stage='sheet_read', error=str(e))
         return
     
     # Filter for uploaded videos
@@ -876,10 +1247,102 @@ def main():
     upload_group.add_argument("--privacy-status", choices=VALID_PRIVACY_STATUSES, default="unlisted",
                             help="Privacy status for uploaded videos")
     upload_group.add_argument("--random", action="store_true", help="Randomly select videos for upload")
+    upload_group.add_argument("--scan-and-upload", action="store_true",
+                              help=f"Scan {TARGET_FOLDER_NAME} for new folders and upload them as they are found")
     upload_group.add_argument("--upload-history", action="store_true", help="Print upload history and exit")
+    upload_group.add_argument("--deadline", metavar="TIME",
+                              help="Only start videos predicted to finish by TIME (ISO UTC like "
+                                   "2026-10-18T23:30:00Z, or a duration from now like 140m)")
+    
+    # Daily plan options
+    plan_group = parser.add_argument_group("Daily Plan")
+    plan_group.add_argument("--plan-day", metavar="COUNTS",
+                            help="Plan today's uploads, e.g. 'MagicMap Tales:8,Tiny Trailblazers:7', and exit")
+    plan_group.add_argument("--replan", action="store_true", help="Rebuild today's plan even if it already exists")
+    plan_group.add_argument("--from-plan", action="store_true",
+                            help="Upload the next videos assigned to the channel in today's plan")
+    
+    # Transfer limits
+    transfer_group = parser.add_argument_group("Transfer Limits")
+    transfer_group.add_argument("--max-download-rate", metavar="RATE",
+                                help="Total Drive download budget in bytes/s, e.g. 20M (default: unlimited)")
+    transfer_group.add_argument("--max-upload-rate", metavar="RATE",
+                                help="Total YouTube upload budget in bytes/s, e.g. 10M (default: unlimited)")
+    transfer_group.add_argument("--channel-share", action="append", metavar="CHANNEL=FRACTION",
+                                help="Cap a channel at a fraction of each budget, e.g. 'MagicMap Tales=0.5' (repeatable)")
+    
+    transfer_group.add_argument("--request-limit", action="append", metavar="API=REQUESTS/SECONDS",
+                                help="Override an API's published request limit, e.g. 'sheets.read=200/60' (repeatable)")
+    transfer_group.add_argument("--account-request-limit", action="append", metavar="API=REQUESTS/SECONDS",
+                                help="Override a per-account request limit, e.g. 'sheets.write=30/60' (repeatable)")
+    
+    # Several service accounts for Drive and Sheets
+    account_group = parser.add_argument_group("Service Accounts")
+    account_group.add_argument("--service-account", action="append", metavar="FILE",
+                               help=f"Extra service account key to spread Drive and Sheets requests over (repeatable; "
+                                    f"default: ${service_account_pool.SERVICE_ACCOUNT_FILES_ENV} or "
+                                    f"{service_account_pool.SERVICE_ACCOUNT_DIR}/*.json)")
+    account_group.add_argument("--service-account-strategy", choices=service_account_pool.STRATEGIES,
+                               help="How requests pick an account (default: round-robin)")
+    
+    # Burst mode
+    burst_group = parser.add_argument_group("Burst Mode")
+    burst_group.add_argument("--burst", action="store_true",
+                             help="Upload as private with a scheduled publish time instead of pacing uploads")
+    burst_group.add_argument("--publish-interval", action="append", metavar="[CHANNEL=]MINUTES",
+                             help=f"Minutes between a channel's scheduled videos (default "
+                                  f"{publish_schedule.DEFAULT_INTERVAL_MINUTES}), e.g. 30 or 'MagicMap Tales=45' (repeatable)")
+    burst_group.add_argument("--publish-delay", type=float, default=publish_schedule.DEFAULT_DELAY_MINUTES,
+                             metavar="MINUTES", help=f"Earliest publish time after upload (default "
+                                                     f"{publish_schedule.DEFAULT_DELAY_MINUTES} minutes)")
+    
+    # Machine-readable output
+    events_group = parser.add_argument_group("Event Output")
+    events_group.add_argument("--events", choices=events.EVENT_FORMATS,
+                              help="Also write one JSON object per run event (selected, uploaded, failed, ...)")
+    events_group.add_argument("--events-file", default="-", metavar="PATH",
+                              help="Where to append events (default: '-' for stdout)")
     
     args = parser.parse_args()
     
+    if args.events:
+        try:
+            events.configure(args.events, args.events_file, runner=row_lease.get_runner_id())
+        except (ValueError, OSError) as e:
+            parser.error(str(e))
+    
+    # Install the shared bandwidth budget before any transfer starts
+    try:
+        bandwidth.configure(
+            ingress_rate=bandwidth.parse_rate(args.max_download_rate),
+            egress_rate=bandwidth.parse_rate(args.max_upload_rate),
+            channel_shares=bandwidth.parse_channel_shares(args.channel_share)
+        )
+    except ValueError as e:
+        parser.error(str(e))
+    
+    if args.request_limit or args.account_request_limit:
+        try:
+            rate_limits.configure(rate_limits.parse_limits(args.request_limit),
+                                  rate_limits.parse_limits(args.account_request_limit))
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.service_account or args.service_account_strategy:
+        service_account_pool.configure(args.service_account, args.service_account_strategy)
+    
+    if args.deadline:
+        try:
+            deadline_planner.configure(deadline_planner.parse_deadline(args.deadline))
+        except ValueError as e:
+            parser.error(str(e))
+    
+    if args.burst:
+        try:
+            publish_schedule.configure(publish_schedule.parse_intervals(args.publish_interval), args.publish_delay)
+        except ValueError as e:
+            parser.error(str(e))
+    
     # Create temp directory if it doesn't exist
     os.makedirs(TEMP_DIR, exist_ok=True)
     
@@ -893,13 +1356,37 @@ def main():
         print_upload_history()
         return
     
-    # Process unuploaded videos
-    process_unuploaded_videos(
-        channel_id=args.channel_id,
-        channel_name=args.channel_name,
-        limit=args.limit,
-        random_selection=args.random
-    )
+    # Build today's plan if requested
+    if args.plan_day:
+        if not plan_daily_uploads(args.plan_day, replan=args.replan):
+            sys.exit(events.EXIT_ERROR)
+        return
+    
+    # Work from today's plan instead of re-reading the whole sheet
+    if args.from_plan:
+        process_planned_videos(
+            channel_id=args.channel_id,
+            channel_name=args.channel_name,
+            limit=args.limit
+        )
+    elif args.scan_and_upload:
+        # Find new folders and upload them in the same run, without waiting for a separate scan
+        scan_and_upload(
+            channel_id=args.channel_id,
+            channel_name=args.channel_name,
+            limit=args.limit
+        )
+    else:
+        # Process unuploaded videos
+        process_unuploaded_videos(
+            channel_id=args.channel_id,
+            channel_name=args.channel_name,
+            limit=args.limit,
+            random_selection=args.random
+        )
+    
+    # The exit code tells the workflow whether to go on, move to the next channel or stop
+    sys.exit(events.finish())
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Daily upload plan: shuffle unuploaded sheet rows once and hand them out to workers."""
+
+import os
+import json
+import time
+import random
+import hashlib
+import datetime
+
+import state_file
+
+PLANS_DIR = os.path.join(state_file.STATE_DIR, 'plans')
+
+# How long a popped item stays reserved before another worker may take it
+DEFAULT_LEASE_SECONDS = 45 * 60
+
+def parse_channel_counts(counts_str):
+    """Parse 'Channel A:8,Channel B:7' (the workflow's channel_counts output) into a dict."""
+    counts = {}
+    for pair in counts_str.split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        name, _, count = pair.rpartition(':')
+        if not name:
+            raise ValueError(f"Invalid channel count '{pair}', expected 'Channel Name:count'")
+        counts[name.strip()] = int(count)
+    return counts
+
+def row_fingerprint(headers, row_dict):
+    """Hash a sheet row so workers can detect rows that changed since planning."""
+    values = [str(row_dict.get(h, '')) for h in headers]
+    return hashlib.sha1(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+def plan_path_for_day(day=None):
+    """Return the plan file path for a given date (defaults to today, UTC)."""
+    day = day or datetime.datetime.utcnow().strftime('%Y-%m-%d')
+    return os.path.join(PLANS_DIR, f"plan-{day}.json")
+
+def create_plan(headers, rows, channel_counts, plan_path=None, seed=None):
+    """Shuffle unuploaded rows once and assign them to channels by their daily counts.
+
+    rows is a list of (row_index, row_dict) pairs for rows that still need uploading.
+    """
+    plan_path = plan_path or plan_path_for_day()
+    rng = random.Random(seed)
+    shuffled = list(rows)
+    rng.shuffle(shuffled)
+
+    channels = {}
+    position = 0
+    for channel_name, count in channel_counts.items():
+        queue = []
+        for row_index, row_dict in shuffled[position:position + count]:
+            queue.append({
+                'row_index': row_index,
+                'folder_id': row_dict.get('Folder ID', ''),
+                'folder_name': row_dict.get('Subfolder Name', ''),
+                'fingerprint': row_fingerprint(headers, row_dict)
+            })
+        position += len(queue)
+        channels[channel_name] = {'queue': queue, 'cursor': 0, 'leases': {}, 'done': {}}
+
+    plan = {
+        'created_at': time.time(),
+        'headers': headers,
+        'channels': channels
+    }
+
+    with state_file.locked(plan_path):
+        state_file.save(plan_path, plan, ensure_ascii=False)
+
+    return plan
+
+def load_plan(plan_path=None):
+    """Load a plan, returning None if it does not exist."""
+    plan_path = plan_path or plan_path_for_day()
+    if not os.path.exists(plan_path):
+        return None
+    with state_file.locked(plan_path):
+        return state_file.load(plan_path)
+
+def _find_channel(plan, channel_name):
+    """Match a channel in the plan case-insensitively."""
+    for name, entry in plan['channels'].items():
+        if name.lower() == (channel_name or '').lower():
+            return name, entry
+    return None, None
+
+def pop_next(channel_name, owner, plan_path=None, lease_seconds=DEFAULT_LEASE_SECONDS):
+    """Lease the next planned item for a channel, or return None when its queue is empty.
+
+    Items whose lease expired (the worker died before completing them) are handed out
+    again before new ones. Each call touches only the channel's cursor and lease table.
+    """
+    plan_path = plan_path or plan_path_for_day()
+    if not os.path.exists(plan_path):
+        return None
+
+    with state_file.locked(plan_path):
+        plan = state_file.load(plan_path)
+        name, entry = _find_channel(plan, channel_name)
+        if entry is None:
+            return None
+
+        now = time.time()
+        item = None
+
+        # Reclaim an item left behind by a worker that never completed it
+        for key, lease in entry['leases'].items():
+            if lease['expires'] <= now:
+                item = lease['item']
+                del entry['leases'][key]
+                break
+
+        if item is None and entry['cursor'] < len(entry['queue']):
+            item = entry['queue'][entry['cursor']]
+            entry['cursor'] += 1
+
+        if item is None:
+            return None
+
+        entry['leases'][str(item['row_index'])] = {
+            'owner': owner,
+            'expires': now + lease_seconds,
+            'item': item
+        }
+        state_file.save(plan_path, plan, ensure_ascii=False)
+
+    return item
+
+def complete(channel_name, item, outcome, plan_path=None):
+    """Release an item's lease and record how it ended (uploaded, failed, changed)."""
+    plan_path = plan_path or plan_path_for_day()
+    if not os.path.exists(plan_path):
+        return
+
+    with state_file.locked(plan_path):
+        plan = state_file.load(plan_path)
+        name, entry = _find_channel(plan, channel_name)
+        if entry is None:
+            return
+        key = str(item['row_index'])
+        entry['leases'].pop(key, None)
+        entry['done'][key] = outcome
+        state_file.save(plan_path, plan, ensure_ascii=False)
+
+def attach_metadata(metadata_by_folder_id, plan_path=None):
+    """Store prefetched title/description/tags text on queued items, keyed by folder ID."""
+    plan_path = plan_path or plan_path_for_day()
+    if not os.path.exists(plan_path):
+        return
+
+    with state_file.locked(plan_path):
+        plan = state_file.load(plan_path)
+        for entry in plan['channels'].values():
+            for item in entry['queue']:
+                metadata = metadata_by_folder_id.get(item['folder_id'])
+                if metadata is not None:
+                    item['metadata'] = metadata
+        state_file.save(plan_path, plan, ensure_ascii=False)
+
+def summarize_plan(plan):
+    """Return per-channel (planned, handed out, leased, done) counts."""
+    summary = {}
+    for name, entry in plan['channels'].items():
+        summary[name] = {
+            'planned': len(entry['queue']),
+            'handed_out': entry['cursor'],
+            'leased': len(entry['leases']),
+            'done': len(entry['done'])
+        }
+    return summary
@@ -3,17 +3,25 @@
 import os
 import sys
 import json
-import random
-import time
-import http.client
-import httplib2
+import queue
 import argparse
+import threading
+import mimetypes
+from collections import Counter
 from typing import Any, Dict, List, Optional, Tuple
 
+import google_auth_httplib2
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from googleapiclient.http import MediaFileUpload
-from google.oauth2.credentials import Credentials
+from googleapiclient.http import build_http
+
+import retry_policy
+import credential_pool
+import mmap_media
+import mp4_probe
+import events
+import local_batch
+import watch_folder
 
 # Constants
 API_SERVICE_NAME = "youtube"
@@ -21,20 +29,12 @@ API_VERSION = "v3"
 MAPPINGS_FILE = "channel_mappings.json"
 TOKENS_DIR = "channel_tokens"
 
-# Maximum number of times to retry before giving up
-MAX_RETRIES = 10
+VALID_PRIVACY_STATUSES = ("public", "private", "unlisted")
 
-# Always retry when these exceptions are raised
-RETRIABLE_EXCEPTIONS = (httplib2.HttpLib2Error, IOError, http.client.NotConnected,
-                        http.client.IncompleteRead, http.client.ImproperConnectionState,
-                        http.client.CannotSendRequest, http.client.CannotSendHeader,
-                        http.client.ResponseNotReady, http.client.BadStatusLine)
+DEFAULT_TITLE = "Test Title"
 
-# Always retry when an apiclient.errors.HttpError with one of these status
-# codes is raised
-RETRIABLE_STATUS_CODES = [500, 502, 503, 504]
-
-VALID_PRIVACY_STATUSES = ("public", "private", "unlisted")
+# Containers mp4_probe can check before upload
+PROBED_EXTENSIONS = ('.mp4', '.m4v', '.mov')
 
 def get_channel_mappings():
     """Load channel mappings from file."""
@@ -72,22 +72,34 @@ def list_available_channels():
         print(f"Error listing channels: {e}")
         return {}
 
-def get_youtube_service(token_file):
-    """Build a YouTube service object from a token file."""
+def get_youtube_credentials(token_file):
+    """Load the channel's OAuth credentials from a token file."""
     if not os.path.exists(token_file):
         print(f"Error: Token file {token_file} not found.")
         return None
         
-    try:
+    def load_token_info():
         with open(token_file, 'r') as f:
-            creds_data = json.load(f)
-            credentials = Credentials.from_authorized_user_info(creds_data)
-            
-        return build(API_SERVICE_NAME, API_VERSION, credentials=credentials)
+            return json.load(f)
+    
+    try:
+        # Refreshed before use and kept fresh in the background while the upload runs
+        return credential_pool.get_pool().get(os.path.basename(token_file), load_token_info)
     except Exception as e:
         print(f"Error loading credentials: {e}")
         return None
 
+def get_youtube_service(token_file):
+    """Build a YouTube service object from a token file."""
+    credentials = get_youtube_credentials(token_file)
+    if not credentials:
+        return None
+    return build(API_SERVICE_NAME, API_VERSION, credentials=credentials)
+
+def thread_http(credentials):
+    """An authorized transport for one thread; service objects are shared, httplib2 connections are not."""
+    return google_auth_httplib2.AuthorizedHttp(credentials, http=build_http())
+
 def get_channel_info(youtube):
     """Get information about the authenticated channel."""
     try:
@@ -95,7 +107,7 @@ def get_channel_info(youtube):
             part="snippet,statistics",
             mine=True
         )
-        response = request.execute()
+        response = retry_policy.execute(request, 'youtube.channels')
         
         if not response.get('items'):
             return None
@@ -111,7 +123,7 @@ def get_channel_info(youtube):
         print(f"Error getting channel info: {e}")
         return None
 
-def initialize_upload(youtube, options):
+def initialize_upload(youtube, options, http=None):
     """Initialize the video upload and start the upload process."""
     tags = None
     if options.keywords:
@@ -130,24 +142,25 @@ def initialize_upload(youtube, options):
     }
 
     # Call the API's videos.insert method to create and upload the video
-    insert_request = youtube.videos().insert(
-        part=",".join(body.keys()),
-        body=body,
-        media_body=MediaFileUpload(options.file, chunksize=-1, resumable=True)
-    )
+    with mmap_media.MmapMediaUpload(options.file, mimetypes.guess_type(options.file)[0] or 'application/octet-stream',
+                                    chunksize=mmap_media.DEFAULT_CHUNK_SIZE, resumable=True) as media:
+        insert_request = youtube.videos().insert(
+            part=",".join(body.keys()),
+            body=body,
+            media_body=media
+        )
 
-    return resumable_upload(insert_request)
+        return resumable_upload(insert_request, http=http)
 
-def resumable_upload(insert_request):
-    """Implement an exponential backoff strategy to resume a failed upload."""
+def resumable_upload(insert_request, http=None):
+    """Send the upload chunk by chunk; transient failures are retried by retry_policy."""
     response = None
-    error = None
-    retry = 0
+    print("Uploading file...")
     
     while response is None:
         try:
-            print("Uploading file...")
-            status, response = insert_request.next_chunk()
+            status, response = retry_policy.call('youtube.upload', insert_request.next_chunk, http=http,
+                                                 policy=retry_policy.UPLOAD_POLICY)
             
             if response is not None:
                 if 'id' in response:
@@ -160,37 +173,39 @@ def resumable_upload(insert_request):
                     return None
                     
         except HttpError as e:
-            if e.resp.status in RETRIABLE_STATUS_CODES:
-                error = f"A retriable HTTP error {e.resp.status} occurred:\n{e.content}"
-            else:
-                print(f"An HTTP error {e.resp.status} occurred:\n{e.content}")
-                raise
+            print(f"An HTTP error {e.resp.status} occurred:\n{e.content}")
+            raise
                 
-        except RETRIABLE_EXCEPTIONS as e:
-            error = f"A retriable error occurred: {e}"
+        except retry_policy.RetryError as e:
+            print(f"Upload failed: {e}")
+            # The caller records what actually went wrong, not that retries ran out
+            raise e.last_error or e
 
-        if error is not None:
-            print(error)
-            retry += 1
-            
-            if retry > MAX_RETRIES:
-                print("No longer attempting to retry.")
-                return None
+def set_thumbnail(youtube, video_id, thumbnail_path, http=None):
+    """Set a custom thumbnail for an uploaded video."""
+    try:
+        mimetype = mimetypes.guess_type(thumbnail_path)[0] or 'image/jpeg'
+        with mmap_media.MmapMediaUpload(thumbnail_path, mimetype) as media:
+            request = youtube.thumbnails().set(videoId=video_id, media_body=media)
+            retry_policy.call('youtube.thumbnails', request.execute, http=http)
+        print(f"Custom thumbnail set for video ID: {video_id}")
+        return True
+    except Exception as e:
+        print(f"Error setting thumbnail: {e}")
+        return False
 
-            max_sleep = 2 ** retry
-            sleep_seconds = random.random() * max_sleep
-            print(f"Sleeping {sleep_seconds:.1f} seconds and then retrying...")
-            time.sleep(sleep_seconds)
-            error = None
+def connect_to_channel(channel_id, interactive=True):
+    """Return (youtube, credentials, channel info) for a channel, after checking the token belongs to it.
 
-def upload_video_to_channel(channel_id, args):
-    """Upload a video to a specific channel using its saved token."""
+    When the token is for another channel, interactive runs ask whether to go
+    on; unattended runs (batch and watch) fail instead.
+    """
     # Get channel mappings
     mappings = get_channel_mappings()
     
     if channel_id not in mappings:
         print(f"Error: Channel ID {channel_id} not found in mappings.")
-        return False
+        return None
         
     channel_info = mappings[channel_id]
     token_file = channel_info['token_file']
@@ -199,22 +214,35 @@ def upload_video_to_channel(channel_id, args):
     print(f"Using token file: {token_file}")
     
     # Get YouTube service for this channel
-    youtube = get_youtube_service(token_file)
-    if not youtube:
-        return False
+    credentials = get_youtube_credentials(token_file)
+    if not credentials:
+        return None
+    youtube = build(API_SERVICE_NAME, API_VERSION, credentials=credentials)
         
     # Verify we're using the correct channel
     current_channel = get_channel_info(youtube)
     if not current_channel:
         print("Error: Could not verify channel information.")
-        return False
+        return None
         
     if current_channel['id'] != channel_id:
         print(f"Warning: Token is for channel '{current_channel['title']}' (ID: {current_channel['id']})")
         print(f"         Expected channel '{channel_info['title']}' (ID: {channel_id})")
+        if not interactive:
+            print("Error: Refusing to upload to a different channel without confirmation.")
+            return None
         confirm = input("Continue anyway? (y/n): ")
         if confirm.lower() != 'y':
-            return False
+            return None
+    
+    return youtube, credentials, channel_info
+
+def upload_video_to_channel(channel_id, args):
+    """Upload a video to a specific channel using its saved token."""
+    connection = connect_to_channel(channel_id)
+    if not connection:
+        return False
+    youtube, credentials, channel_info = connection
     
     # Upload the video
     try:
@@ -227,6 +255,155 @@ def upload_video_to_channel(channel_id, args):
     
     return False
 
+def batch_options(item, args):
+    """Upload options for one batch item: its sidecars or manifest entry, then the command-line defaults."""
+    stem = os.path.splitext(os.path.basename(item['file']))[0]
+    return argparse.Namespace(
+        file=item['file'],
+        title=item.get('title') or (stem if args.title == DEFAULT_TITLE else args.title),
+        description=item.get('description') or args.description,
+        category=str(item.get('category') or args.category),
+        keywords=item.get('tags') or args.keywords,
+        privacyStatus=item.get('privacyStatus') or args.privacyStatus,
+        thumbnail=item.get('thumbnail')
+    )
+
+def prepare_batch_item(options):
+    """Check the video before it reaches an upload slot and start reading it into the page cache.
+
+    Raises mp4_probe.Mp4ProbeError for a damaged MP4.
+    """
+    if options.file.lower().endswith(PROBED_EXTENSIONS):
+        info = mp4_probe.probe_local(options.file)
+        print(f"Preflight OK for {options.file}: {mp4_probe.describe(info)}")
+    if hasattr(os, 'posix_fadvise'):
+        fd = os.open(options.file, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        finally:
+            os.close(fd)
+
+class ChannelUploader:
+    """One channel's client, shared by upload threads, and the upload-and-record step for each video."""
+
+    def __init__(self, youtube, credentials, channel_info, progress):
+        self.youtube = youtube
+        self.credentials = credentials
+        self.channel_info = channel_info
+        self.progress = progress
+        self.results = Counter()
+        self.stopped = threading.Event()
+        self._local = threading.local()
+
+    def http(self):
+        if not hasattr(self._local, 'http'):
+            self._local.http = thread_http(self.credentials)
+        return self._local.http
+
+    def fail(self, options, stage, error):
+        print(f"❌ {options.file}: {error}")
+        self.progress.record(options.file, error=error)
+        self.results['failed'] += 1
+        events.emit('failed', file=options.file, stage=stage, error=str(error))
+
+    def upload(self, options):
+        """Upload one video (and its thumbnail) and record the outcome; returns the video ID or None.
+
+        A channel upload limit or exhausted quota sets self.stopped.
+        """
+        http = self.http()
+        try:
+            video_id = initialize_upload(self.youtube, options, http=http)
+        except HttpError as e:
+            reason = retry_policy.http_error_reason(e)
+            self.fail(options, 'upload', e)
+            if reason in events.QUOTA_REASONS:
+                print(f"Stopping uploads to {self.channel_info['title']}: {reason}")
+                events.emit('quota_exhausted', reason=reason, channel=self.channel_info['title'])
+                self.stopped.set()
+            return None
+        except Exception as e:
+            self.fail(options, 'upload', e)
+            return None
+        if not video_id:
+            self.fail(options, 'upload', 'the upload did not return a video ID')
+            return None
+        if options.thumbnail:
+            set_thumbnail(self.youtube, video_id, options.thumbnail, http=http)
+        self.progress.record(options.file, video_id=video_id)
+        self.results['uploaded'] += 1
+        events.emit('uploaded', file=options.file, video_id=video_id, channel=self.channel_info['title'])
+        return video_id
+
+def channel_uploader(channel_id, progress):
+    """Connect to a channel once and return a ChannelUploader for it (None if that fails)."""
+    # Batch and watch runs are unattended, so nothing may wait on a prompt
+    connection = connect_to_channel(channel_id, interactive=False)
+    if not connection:
+        events.emit('error', stage='channel', channel_id=channel_id)
+        return None
+    youtube, credentials, channel_info = connection
+    return ChannelUploader(youtube, credentials, channel_info, progress)
+
+def upload_batch(channel_id, items, args, progress):
+    """Upload items to one channel through one authenticated client.
+
+    A preparation thread checks and pre-reads the next videos, at most
+    args.prefetch ahead of args.workers upload threads. Each result is
+    written to progress as it happens, so an interrupted batch resumes where
+    it stopped. A channel upload limit or exhausted quota ends the batch.
+    """
+    pending = [item for item in items if not progress.is_done(item['file'])]
+    print(f"{len(items)} video(s) found, {len(items) - len(pending)} already uploaded")
+    if args.limit:
+        pending = pending[:args.limit]
+    if not pending:
+        events.emit('nothing_to_do', reason='all_uploaded')
+        return True
+    
+    uploader = channel_uploader(channel_id, progress)
+    if not uploader:
+        return False
+    
+    ready = queue.Queue(maxsize=max(1, args.prefetch))
+    workers = max(1, args.workers)
+    
+    def prepare():
+        for item in pending:
+            if uploader.stopped.is_set():
+                break
+            options = batch_options(item, args)
+            try:
+                prepare_batch_item(options)
+            except (mp4_probe.Mp4ProbeError, OSError) as e:
+                uploader.fail(options, 'preflight', e)
+                continue
+            events.emit('selected', file=options.file, title=options.title)
+            ready.put(options)
+        for _ in range(workers):
+            ready.put(None)
+    
+    def upload_worker():
+        while True:
+            options = ready.get()
+            if options is None:
+                return
+            if not uploader.stopped.is_set():
+                uploader.upload(options)
+            # Once stopped, keep draining so the preparation thread is never left blocked
+    
+    threads = [threading.Thread(target=prepare, daemon=True)]
+    threads += [threading.Thread(target=upload_worker, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    results = uploader.results
+    print(f"\nBatch finished: {results['uploaded']} uploaded, {results['failed']} failed, "
+          f"{len(pending) - results['uploaded'] - results['failed']} not attempted")
+    return results['failed'] == 0 and not uploader.stopped.is_set()
+
 def select_channel_interactive():
     """Allow user to select a channel interactively."""
     mappings = list_available_channels()
@@ -251,8 +428,27 @@ def select_channel_interactive():
 def main():
     parser = argparse.ArgumentParser(description="Upload videos to specific YouTube channels")
     
-    # Required file argument
-    parser.add_argument("--file", required=True, help="Video file to upload")
+    # What to upload: one file, or a batch
+    parser.add_argument("--file", help="Video file to upload")
+    batch_group = parser.add_argument_group("Batch Upload")
+    batch_group.add_argument("--dir", help="Upload every video in this directory, with its sidecar files")
+    batch_group.add_argument("--manifest", help="Upload the videos listed in this JSON manifest")
+    batch_group.add_argument("--progress", metavar="FILE",
+                             help=f"Where uploaded videos are recorded (default: {local_batch.PROGRESS_FILE_NAME} "
+                                  f"in --dir, or <manifest>.progress.json)")
+    batch_group.add_argument("--workers", type=int, default=1, help="Videos uploaded at the same time (default 1)")
+    batch_group.add_argument("--prefetch", type=int, default=2,
+                             help="Videos checked and read ahead of the uploads (default 2)")
+    batch_group.add_argument("--limit", type=int, help="Upload at most this many videos")
+    
+    # Keep running and upload videos as they appear
+    watch_group = parser.add_argument_group("Watch Mode")
+    watch_group.add_argument("--watch", metavar="DIR", help="Watch this directory and upload each new video once it is stable")
+    watch_group.add_argument("--poll-interval", type=float, default=watch_folder.POLL_SECONDS,
+                             help=f"Seconds between directory scans (default {watch_folder.POLL_SECONDS})")
+    watch_group.add_argument("--settle", type=float, default=watch_folder.SETTLE_SECONDS,
+                             help=f"Seconds a video's size and mtime must stay unchanged before it is uploaded "
+                                  f"(default {watch_folder.SETTLE_SECONDS})")
     
     # Channel selection
     channel_group = parser.add_argument_group("Channel Selection")
@@ -262,7 +458,7 @@ def main():
     
     # Video details
     video_group = parser.add_argument_group("Video Details")
-    video_group.add_argument("--title", help="Video title", default="Test Title")
+    video_group.add_argument("--title", help="Video title (batch default: the file name)", default=DEFAULT_TITLE)
     video_group.add_argument("--description", help="Video description", default="Test Description")
     video_group.add_argument("--category", default="22", help="Numeric video category. See https://developers.google.com/youtube/v3/docs/videoCategories/list")
     video_group.add_argument("--keywords", help="Video keywords, comma separated", default="")
@@ -275,8 +471,26 @@ def main():
         list_available_channels()
         return
     
+    if sum(1 for source in (args.file, args.dir, args.manifest, args.watch) if source) != 1:
+        parser.error("give exactly one of --file, --dir, --manifest or --watch")
+    
+    if (args.dir or args.manifest or args.watch) and not (args.channel_id or args.channel_name):
+        parser.error("--dir, --manifest and --watch need --channel-id or --channel-name")
+    
+    if args.watch:
+        if not os.path.isdir(args.watch):
+            parser.error(f"--watch: '{args.watch}' is not a directory")
+        progress = local_batch.Progress(args.progress or local_batch.default_progress_path(args.watch))
+    
+    elif args.dir or args.manifest:
+        try:
+            items = local_batch.discover(args.dir) if args.dir else local_batch.load_manifest(args.manifest)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        progress = local_batch.Progress(args.progress or local_batch.default_progress_path(args.dir, args.manifest))
+    
     # Check if the video file exists
-    if not os.path.exists(args.file):
+    elif not os.path.exists(args.file):
         print(f"Error: The file '{args.file}' does not exist.")
         sys.exit(1)
     
@@ -305,6 +519,18 @@ def main():
         print("No channel selected. Exiting.")
         return
     
+    if args.watch:
+        uploader = channel_uploader(channel_id, progress)
+        if not uploader:
+            sys.exit(events.exit_code())
+        watch_folder.run(args.watch, uploader, lambda item: batch_options(item, args), prepare_batch_item,
+                         workers=args.workers, poll_seconds=args.poll_interval, settle_seconds=args.settle)
+        return
+    
+    if args.dir or args.manifest:
+        upload_batch(channel_id, items, args, progress)
+        sys.exit(events.exit_code())
+    
     # Upload the video
     upload_video_to_channel(channel_id, args)
 
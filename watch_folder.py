@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""Watch a directory and upload each video as soon as it has finished rendering.
+
+Every poll lists the directory with os.scandir and compares each video's size
+and mtime with the index kept in .watch_index.json. A video is queued once
+both have stayed the same for the settle time. Video folders (Drive layout,
+see local_batch) whose mtime has not changed since the last poll are not
+listed again, and loose videos use the stat of their scandir entry, so a
+large tree costs one scandir per poll plus a stat per video in a changed
+folder. Videos and folders that disappear are dropped from the index. The
+index and the batch progress file persist across restarts: uploaded videos
+are never sent again, and videos that were queued but not finished are
+picked up at once.
+"""
+
+import os
+import stat as statlib
+import time
+import queue
+import signal
+import datetime
+import threading
+
+import events
+import local_batch
+import state_file
+
+INDEX_FILE_NAME = '.watch_index.json'
+
+POLL_SECONDS = 10
+SETTLE_SECONDS = 30
+
+# A failed upload is tried again after this long, or as soon as the file changes
+RETRY_FAILED_SECONDS = 30 * 60
+
+# Files still being written by common tools
+TEMP_SUFFIXES = ('.part', '.partial', '.tmp', '.crdownload', '.download')
+
+# YouTube's daily quota and upload limits reset at midnight Pacific time
+QUOTA_TIMEZONE = 'America/Los_Angeles'
+QUOTA_FALLBACK_PAUSE_SECONDS = 60 * 60
+
+PENDING, QUEUED, DONE, FAILED = 'pending', 'queued', 'done', 'failed'
+
+def next_quota_reset(now=None):
+    """Epoch seconds shortly after the next YouTube quota reset."""
+    now = now or time.time()
+    try:
+        from zoneinfo import ZoneInfo
+        local = datetime.datetime.fromtimestamp(now, ZoneInfo(QUOTA_TIMEZONE))
+    except Exception:
+        return now + QUOTA_FALLBACK_PAUSE_SECONDS
+    midnight = (local + datetime.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return midnight.timestamp() + 60
+
+class FolderIndex:
+    """Size, mtime and upload state of the watched videos, and mtimes of video folders."""
+
+    def __init__(self, directory, path=None):
+        self.directory = os.path.normpath(directory)
+        self.path = path or os.path.join(directory, INDEX_FILE_NAME)
+        self.lock = threading.Lock()
+        state = state_file.load(self.path, {})
+        self.dirs = state.get('dirs', {})
+        self.files = state.get('files', {})
+        # Queued when the last run stopped: nothing changed since, so it can go straight back in the queue
+        for record in self.files.values():
+            if record.get('state') == QUEUED:
+                record.update(state=PENDING, stable_since=0)
+
+    def save(self):
+        with self.lock:
+            state_file.save(self.path, {'dirs': self.dirs, 'files': self.files}, indent=2)
+
+    def set_state(self, path, state, retry_at=None):
+        with self.lock:
+            record = self.files.get(path)
+            if record is None:
+                return
+            record['state'] = state
+            if state == PENDING:
+                record['stable_since'] = 0
+            record.pop('retry_at', None)
+            if retry_at:
+                record['retry_at'] = retry_at
+        self.save()
+
+    def _candidates(self, skipped):
+        """Yield (video path, stat, item loader) for videos to look at this poll.
+
+        Videos of unchanged folders are not statted; their paths are added to skipped.
+        """
+        seen_dirs = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.startswith('.') or name.lower().endswith(TEMP_SUFFIXES):
+                    continue
+                try:
+                    if entry.is_dir():
+                        seen_dirs.add(entry.path)
+                        video = os.path.join(entry.path, 'video.mp4')
+                        mtime = entry.stat().st_mtime_ns
+                        record = self.files.get(video)
+                        # Unchanged folder whose video is absent, uploaded or waiting: nothing to look at
+                        if self.dirs.get(entry.path) == mtime and (record is None or record['state'] in (QUEUED, DONE)):
+                            if record is not None:
+                                skipped.add(video)
+                            continue
+                        self.dirs[entry.path] = mtime
+                        stat = os.stat(video)
+                        if not statlib.S_ISREG(stat.st_mode):
+                            continue
+                        load_item = lambda folder=entry.path: local_batch.item_for_folder(folder)
+                    elif entry.is_file() and local_batch.is_video_name(name):
+                        video = entry.path
+                        # scandir already has (or fetches once) the stat of each entry
+                        stat = entry.stat()
+                        load_item = lambda path=entry.path: local_batch.item_for_video(path)
+                    else:
+                        continue
+                except OSError:
+                    continue
+                yield video, stat, load_item
+        for path in [path for path in self.dirs if path not in seen_dirs]:
+            del self.dirs[path]
+
+    def scan(self, progress, settle=SETTLE_SECONDS, now=None):
+        """Return upload items for videos that just became stable, marking them queued."""
+        now = now or time.time()
+        ready = []
+        seen = set()
+        skipped = set()
+        with self.lock:
+            for path, stat, load_item in self._candidates(skipped):
+                seen.add(path)
+                record = self.files.get(path)
+                if record is None or record['size'] != stat.st_size or record['mtime_ns'] != stat.st_mtime_ns:
+                    # New or still being written: start (or restart) the settle clock
+                    self.files[path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                                        'stable_since': now, 'state': PENDING}
+                    continue
+                if record['state'] == DONE:
+                    continue  # Uploaded and unchanged since
+                if record['state'] == FAILED and now >= record.get('retry_at', 0):
+                    record.update(state=PENDING, stable_since=0)
+                if record['state'] != PENDING or not stat.st_size or now - record['stable_since'] < settle:
+                    continue
+                if progress.is_done(path):
+                    record['state'] = DONE
+                    continue
+                item = load_item()
+                if item:
+                    record['state'] = QUEUED
+                    ready.append(item)
+            # Forget videos (and folders) that are gone; those in folders skipped this poll were not looked at
+            for path in list(self.files):
+                if path not in seen and path not in skipped:
+                    del self.files[path]
+        self.save()
+        return ready
+
+def run(directory, uploader, make_options, prepare, workers=1, poll_seconds=POLL_SECONDS,
+        settle_seconds=SETTLE_SECONDS):
+    """Poll directory and upload stable videos with uploader until SIGTERM or Ctrl-C.
+
+    make_options(item) turns an item into upload options and prepare(options)
+    checks the video before upload (see upload_to_channel). When the channel
+    hits its upload limit or the quota runs out, uploads pause until the
+    quota resets and the daemon keeps watching.
+    """
+    index = FolderIndex(directory)
+    ready = queue.Queue()
+    shutdown = threading.Event()
+
+    def request_shutdown(signum, frame):
+        if shutdown.is_set():
+            raise KeyboardInterrupt  # Second signal: abandon the uploads in progress
+        print("Stopping after the uploads in progress (again to abort them)...")
+        shutdown.set()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    def upload_worker():
+        while not shutdown.is_set():
+            if uploader.stopped.is_set():
+                shutdown.wait(poll_seconds)
+                continue
+            try:
+                item = ready.get(timeout=1)
+            except queue.Empty:
+                continue
+            options = make_options(item)
+            try:
+                prepare(options)
+            except Exception as e:
+                uploader.fail(options, 'preflight', e)
+                index.set_state(item['file'], FAILED, retry_at=time.time() + RETRY_FAILED_SECONDS)
+                continue
+            events.emit('selected', file=options.file, title=options.title)
+            if uploader.upload(options):
+                index.set_state(item['file'], DONE)
+            elif uploader.stopped.is_set():
+                # Not the video's fault: try it again after the quota resets
+                index.set_state(item['file'], PENDING)
+            else:
+                index.set_state(item['file'], FAILED, retry_at=time.time() + RETRY_FAILED_SECONDS)
+
+    threads = [threading.Thread(target=upload_worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+
+    print(f"Watching {directory} every {poll_seconds:g}s (videos settle for {settle_seconds:g}s)")
+    resume_at = None
+    while not shutdown.is_set():
+        if uploader.stopped.is_set():
+            resume_at = resume_at or next_quota_reset()
+            if time.time() >= resume_at:
+                print("Quota reset, resuming uploads")
+                uploader.stopped.clear()
+                resume_at = None
+        try:
+            for item in index.scan(uploader.progress, settle_seconds):
+                print(f"Queued {item['file']}")
+                ready.put(item)
+        except OSError as e:
+            print(f"Error scanning {directory}: {e}")
+        shutdown.wait(poll_seconds)
+
+    for thread in threads:
+        thread.join()
+    index.save()
+    results = uploader.results
+    print(f"Watch stopped: {results['uploaded']} uploaded, {results['failed']} failed")